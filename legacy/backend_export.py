@@ -4,13 +4,32 @@ Refactored from export_mangapark_follows_to_mal_xml.py
 """
 
 import requests
-from bs4 import BeautifulSoup
 import json
+import os
+import sys
 import time
 from pathlib import Path
 from typing import Callable, Dict, List, Optional
 from datetime import datetime
 
+# Shared components live in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from mal_cache import MALCache
+from rate_limiter import jikan_limiter
+from retry_policy import RetryPolicy, ThrottledError
+from jikan_client import shared_session
+from single_flight import SingleFlight
+from page_ready import PageReady
+from driver_pool import chrome_options
+from follows_parser import default_backend
+from mirror_selector import MirrorSelector
+from session_bootstrap import cookie_domain
+
+# Follows entries: item containers and the title anchor read from each
+# (only its first match, chapter links in the same item are ignored)
+ITEM_SELECTOR = '.item, .manga-item, [class*="manga"]'
+ITEM_LINK_SELECTOR = 'a[href*="/manga/"], .title a, h3 a'
+
 class MangaParkExporter:
     def __init__(self, cookies: Dict[str, str], progress_callback: Optional[Callable] = None):
         """
@@ -23,19 +42,24 @@ class MangaParkExporter:
         self.cookies = cookies
         self.progress_callback = progress_callback or (lambda p, s, m: None)
         self.session = requests.Session()
+        self.mal_cache = MALCache()
+        self.retry_policy = RetryPolicy(max_retries=3, timeout=10, limiter=jikan_limiter())
+        self.flight = SingleFlight()
+        # Fastest answering MangaPark domain, switched if it stops responding
+        self.mirrors = MirrorSelector()
         
         # Set up session headers
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
-            'Referer': 'https://mangapark.net/',
         })
         
-        # Set cookies
-        for name, value in cookies.items():
-            if value:
-                self.session.cookies.set(name, value, domain='.mangapark.net')
+        # Set cookies for every mirror, so a failover keeps the session
+        for base_url in self.mirrors.mirrors:
+            for name, value in cookies.items():
+                if value:
+                    self.session.cookies.set(name, value, domain=cookie_domain(base_url))
     
     def log(self, percent: int, step: int, message: str, log_type: str = "info"):
         """Send progress update"""
@@ -54,6 +78,8 @@ class MangaParkExporter:
             List of manga dictionaries with title, url, etc.
         """
         self.log(5, 0, "🔍 Connecting to MangaPark...", "info")
+        site = self.mirrors.select()
+        self.log(8, 0, f"🌐 Using {site}", "info")
         
         manga_list = []
         page = 1
@@ -62,45 +88,42 @@ class MangaParkExporter:
             while True:
                 self.log(10 + (page * 5), 0, f"📄 Scraping page {page}...", "info")
                 
-                url = f"https://mangapark.net/auser/follows?page={page}"
-                response = self.session.get(url, timeout=30)
+                url = f"{site}/auser/follows?page={page}"
+                try:
+                    response = self.session.get(url, timeout=30, headers={'Referer': site + '/'})
+                except (requests.Timeout, requests.ConnectionError):
+                    failed, site = site, self.mirrors.failover(site)
+                    if site == failed:
+                        raise
+                    self.log(10, 0, f"🌐 {failed} is not responding, switching to {site}", "warning")
+                    continue
                 
                 if response.status_code != 200:
                     self.log(15, 0, f"❌ Failed to fetch page {page}: Status {response.status_code}", "error")
                     break
                 
-                soup = BeautifulSoup(response.text, 'lxml')
+                links = default_backend().item_links(response.text, ITEM_SELECTOR, ITEM_LINK_SELECTOR)
                 
-                # Find manga entries (adjust selectors based on actual HTML structure)
-                manga_items = soup.select('.item, .manga-item, [class*="manga"]')
-                
-                if not manga_items:
+                if not links:
                     self.log(20, 0, f"✅ Scraped {len(manga_list)} manga from {page-1} pages", "success")
                     break
                 
-                for item in manga_items:
-                    try:
-                        title_elem = item.select_one('a[href*="/manga/"], .title a, h3 a')
-                        if not title_elem:
-                            continue
-                        
-                        title = title_elem.get_text(strip=True)
-                        url = title_elem.get('href', '')
-                        
-                        if not url.startswith('http'):
-                            url = 'https://mangapark.net' + url
-                        
-                        manga_list.append({
-                            'title': title,
-                            'url': url,
-                            'site': 'mangapark',
-                            'mal_id': None,
-                            'status': 'reading'
-                        })
-                        
-                    except Exception as e:
-                        self.log(20, 0, f"⚠️ Error parsing item: {str(e)}", "warning")
+                seen = set()
+                for title, url in links:
+                    if not url.startswith('http'):
+                        url = site + url
+                    # Nested containers match the same anchor more than once
+                    if (title, url) in seen:
                         continue
+                    seen.add((title, url))
+                    
+                    manga_list.append({
+                        'title': title,
+                        'url': url,
+                        'site': 'mangapark',
+                        'mal_id': None,
+                        'status': 'reading'
+                    })
                 
                 page += 1
                 time.sleep(1)  # Rate limiting
@@ -118,48 +141,81 @@ class MangaParkExporter:
     
     def enrich_with_mal_ids(self, manga_list: List[Dict]) -> List[Dict]:
         """
-        Enrich manga list with MAL IDs using MAL API or Jikan (parallélisé, 1 req/s)
+        Enrich manga list with MAL IDs using MAL API or Jikan (parallélisé, shared Jikan budget)
         """
-        import threading
         from concurrent.futures import ThreadPoolExecutor, as_completed
         self.log(30, 1, "✨ Starting MAL enrichment...", "info")
         total = len(manga_list)
         jikan_base = "https://api.jikan.moe/v4"
-        lock = threading.Lock()
-        last_req_time = [0]
         results = [None] * total
+        self.mal_cache.reset_stats()
+        self.retry_policy.reset_stats()
+        # Workers looking up the same (normalized) title share one request
+        self.flight = SingleFlight()
+
+        def fetch(title):
+            """Jikan candidates for a title, None on API errors"""
+            params = {'q': title, 'limit': 5}
+            response = self.retry_policy.get(f"{jikan_base}/manga", session=shared_session(), params=params)
+            if response.status_code != 200:
+                self.log(30, 1, f"⚠️ MAL API error: {response.status_code}", "warning")
+                return None
+            candidates = response.json().get('data', [])
+            match = {'mal_id': candidates[0].get('mal_id'), 'title': candidates[0].get('title')} if candidates else None
+            self.mal_cache.put(title, candidates, match)
+            return candidates
 
         def worker(idx, manga):
+            """Look up one title, returns the Retry-After wait (seconds) if it is still rate limited, else None"""
             progress = 30 + int((idx / total) * 30)
             self.log(progress, 1, f"🔎 Searching MAL for: {manga['title']}", "info")
             try:
-                with lock:
-                    now = time.time()
-                    wait = max(0, 1 - (now - last_req_time[0]))
-                    if wait > 0:
-                        time.sleep(wait)
-                    last_req_time[0] = time.time()
-                    search_url = f"{jikan_base}/manga?q={manga['title']}&limit=1"
-                    response = requests.get(search_url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('data'):
-                        mal_id = data['data'][0].get('mal_id')
-                        manga['mal_id'] = mal_id
-                        self.log(progress, 1, f"✅ Found MAL ID {mal_id} for {manga['title']}", "success")
-                    else:
-                        self.log(progress, 1, f"⚠️ No MAL match for {manga['title']}", "warning")
+                cached = self.mal_cache.get(manga['title'])
+                if cached is not None:
+                    candidates = cached['candidates']
                 else:
-                    self.log(progress, 1, f"⚠️ MAL API error: {response.status_code}", "warning")
+                    # Only the token reservation is serialized, requests overlap
+                    candidates = self.flight.do(manga['title'], fetch, manga['title'])
+                    if candidates is None:
+                        results[idx] = manga
+                        return None
+                if candidates:
+                    # Jikan orders results by relevance, the first one is the match
+                    mal_id = candidates[0].get('mal_id')
+                    manga['mal_id'] = mal_id
+                    self.log(progress, 1, f"✅ Found MAL ID {mal_id} for {manga['title']}", "success")
+                else:
+                    self.log(progress, 1, f"⚠️ No MAL match for {manga['title']}", "warning")
+            except ThrottledError as e:
+                results[idx] = manga
+                return e.retry_after or 0.0
             except Exception as e:
                 self.log(progress, 1, f"❌ Error enriching {manga['title']}: {str(e)}", "error")
             results[idx] = manga
+            return None
 
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = [executor.submit(worker, idx, manga) for idx, manga in enumerate(manga_list)]
-            for done_idx, fut in enumerate(as_completed(futures), 1):
-                pass  # Just wait for all to finish
+        # Rate-limited titles are requeued for another pass instead of being dropped
+        pending = list(enumerate(manga_list))
+        for requeue_round in range(3):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = {executor.submit(worker, idx, manga): (idx, manga) for idx, manga in pending}
+                throttled = [(futures[fut], fut.result()) for fut in as_completed(futures)]
+            throttled = [(item, wait) for item, wait in throttled if wait is not None]
+            pending = [item for item, _ in throttled]
+            if not pending or requeue_round == 2:
+                break
+            # Like process_with_requeue: wait out the longest Retry-After seen
+            wait = max(wait for _, wait in throttled)
+            self.retry_policy.record_requeue(len(pending))
+            self.log(58, 1, f"⏳ {len(pending)} titles rate-limited, requeued in {wait:.0f}s", "warning")
+            time.sleep(wait)
 
+        cache_stats = self.mal_cache.stats()
+        if cache_stats['cache_hits']:
+            self.log(60, 1, f"⚡ {cache_stats['cache_hits']} MAL lookups served from cache", "info")
+        calls_saved = self.flight.stats()['calls_saved']
+        if calls_saved:
+            self.log(60, 1, f"🔗 {calls_saved} duplicate titles shared a lookup", "info")
         self.log(60, 1, f"✨ Enrichment complete! Found {sum(1 for m in results if m.get('mal_id'))} MAL matches", "success")
         return results
         return manga_list
@@ -351,7 +407,10 @@ class MangaParkExporter:
                 "status": "success",
                 "total_manga": len(manga_list),
                 "matched": sum(1 for m in manga_list if m['mal_id']),
-                "files": file_paths
+                "files": file_paths,
+                "retry_stats": self.retry_policy.stats(),
+                "mal_calls_saved": self.flight.stats()['calls_saved'],
+                **self.mal_cache.stats()
             }
             
         except Exception as e:
@@ -374,31 +433,19 @@ class MangaDexExporter:
 
     def scrape_follows(self):
         from selenium import webdriver
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.chrome.options import Options
-        from bs4 import BeautifulSoup
-        import time
         self.log(0, 0, "🔍 Scraping MangaDex follows...", "info")
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        driver = webdriver.Chrome(options=chrome_options)
+        driver = webdriver.Chrome(options=chrome_options())
         try:
             driver.get("https://mangadex.org/follows")
             for name, value in self.cookies.items():
                 if value:
                     driver.add_cookie({"name": name, "value": value, "domain": ".mangadex.org"})
             driver.refresh()
-            time.sleep(3)
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            manga_cards = soup.select("a.manga_title")
+            ready, _ = PageReady(selector="a.manga_title").wait(driver)
+            if ready is not None:
+                self.log(5, 0, f"Follows page ready in {ready:.2f}s", "info")
             results = []
-            for card in manga_cards:
-                title = card.get_text(strip=True)
-                url = card.get("href")
+            for title, url in default_backend().links(driver.page_source, "a.manga_title"):
                 if url and not url.startswith("http"):
                     url = "https://mangadex.org" + url
                 results.append({"title": title, "url": url})
@@ -413,23 +460,15 @@ class MangaDexExporter:
     def enrich_with_mal_ids(self, manga_list):
         # Réutilise la logique optimisée de MangaPark
         from concurrent.futures import ThreadPoolExecutor, as_completed
-        import threading, time, requests
-        lock = threading.Lock()
-        last_req_time = [0]
+        retry_policy = RetryPolicy(max_retries=3, timeout=10, limiter=jikan_limiter())
         total = len(manga_list)
         results = [None] * total
         def worker(idx, manga):
             progress = 30 + int((idx / total) * 30)
             self.log(progress, 1, f"🔎 Searching MAL for: {manga['title']}", "info")
             try:
-                with lock:
-                    now = time.time()
-                    wait = max(0, 1 - (now - last_req_time[0]))
-                    if wait > 0:
-                        time.sleep(wait)
-                    last_req_time[0] = time.time()
-                    search_url = f"https://api.jikan.moe/v4/manga?q={manga['title']}&limit=1"
-                    response = requests.get(search_url, timeout=10)
+                params = {'q': manga['title'], 'limit': 1}
+                response = retry_policy.get("https://api.jikan.moe/v4/manga", session=shared_session(), params=params)
                 if response.status_code == 200:
                     data = response.json()
                     if data.get('data'):
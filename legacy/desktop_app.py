@@ -21,9 +21,6 @@ from difflib import SequenceMatcher
 
 try:
     from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
     from selenium.webdriver.chrome.options import Options
     SELENIUM_AVAILABLE = True
 except ImportError:
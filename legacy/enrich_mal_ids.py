@@ -1,7 +1,15 @@
 import xml.etree.ElementTree as ET
-import requests
-import time
-from difflib import SequenceMatcher
+import os
+import sys
+
+# Shared components live in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from mal_cache import MALCache
+from rate_limiter import jikan_limiter, shared_limiter
+from retry_policy import RetryPolicy, ThrottledError, process_with_requeue
+from jikan_client import shared_session
+from single_flight import SingleFlight
+from similarity import best_candidate
 
 # --------- CONFIG ---------
 INPUT_XML = "mangapark_follows_mal.xml"
@@ -16,10 +24,12 @@ MAL_CLIENT_ID = "9f53e7f90704b145d964d9c747f3591a"  # Replace with your MAL API
 USE_JIKAN = True  # Set to False to use official MAL API
 # --------------------------
 
+# Search results are cached on disk so re-runs skip the network
+MAL_CACHE = MALCache()
 
-def similar(a, b):
-    """Calculate similarity ratio between two strings"""
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+# Retries honor Retry-After and back off with jitter within each API's budget
+JIKAN_RETRY = RetryPolicy(max_retries=3, timeout=10, limiter=jikan_limiter())
+MAL_API_RETRY = RetryPolicy(max_retries=3, timeout=10, limiter=shared_limiter("mal", per_second=10))
 
 
 def search_mal_via_jikan(title):
@@ -28,57 +38,57 @@ def search_mal_via_jikan(title):
     Returns: (mal_id, mal_title, similarity_score) or (None, None, 0)
     """
     try:
-        url = "https://api.jikan.moe/v4/manga"
-        params = {"q": title, "limit": 5}
-        
-        print(f"  [Jikan] Searching for: {title}")
-        resp = requests.get(url, params=params, timeout=10)
-        
-        if resp.status_code == 429:
-            print("  [WARN] Rate limit hit, waiting 60 seconds...")
-            time.sleep(60)
-            resp = requests.get(url, params=params, timeout=10)
-        
-        if resp.status_code != 200:
-            print(f"  [WARN] API returned status {resp.status_code}")
-            return None, None, 0
+        cached = MAL_CACHE.get(title, source="jikan")
         
-        data = resp.json()
-        results = data.get("data", [])
+        if cached is not None:
+            print(f"  [Cache] Found cached results for: {title}")
+            results = cached["candidates"]
+        else:
+            # Jikan allows 3 requests per second and 60 per minute
+            url = "https://api.jikan.moe/v4/manga"
+            params = {"q": title, "limit": 5}
+            
+            print(f"  [Jikan] Searching for: {title}")
+            resp = JIKAN_RETRY.get(url, session=shared_session(), params=params)
+            
+            if resp.status_code != 200:
+                print(f"  [WARN] API returned status {resp.status_code}")
+                return None, None, 0
+            
+            data = resp.json()
+            results = data.get("data", [])
         
         if not results:
             print(f"  [WARN] No results found")
+            if cached is None:
+                MAL_CACHE.put(title, results, source="jikan")
             return None, None, 0
         
         # Find best match
+        # Check similarity with all title variants, scored in one batch
+        index, best_score = best_candidate(title, [
+            [manga.get("title"), manga.get("title_english"), manga.get("title_japanese")]
+            for manga in results
+        ])
         best_match = None
-        best_score = 0
+        if index is not None:
+            manga = results[index]
+            best_match = (manga.get("mal_id"), manga.get("title", ""), best_score)
         
-        for manga in results:
-            mal_title = manga.get("title", "")
-            mal_title_english = manga.get("title_english", "")
-            mal_title_japanese = manga.get("title_japanese", "")
-            mal_id = manga.get("mal_id")
-            
-            # Check similarity with all title variants
-            scores = [
-                similar(title, mal_title),
-                similar(title, mal_title_english) if mal_title_english else 0,
-                similar(title, mal_title_japanese) if mal_title_japanese else 0
-            ]
-            score = max(scores)
-            
-            if score > best_score:
-                best_score = score
-                best_match = (mal_id, mal_title, score)
+        matched = best_match is not None  # best_candidate applies the 0.6 threshold
+        if cached is None:
+            match = {"mal_id": best_match[0], "title": best_match[1], "score": best_score} if matched else None
+            MAL_CACHE.put(title, results, match, source="jikan")
         
-        if best_match and best_score > 0.6:  # Threshold for accepting a match
+        if matched:
             print(f"  [FOUND] MAL ID {best_match[0]}: {best_match[1]} (confidence: {best_score:.2%})")
             return best_match
         else:
             print(f"  [WARN] Best match too low: {best_score:.2%}")
             return None, None, 0
             
+    except ThrottledError:
+        raise
     except Exception as e:
         print(f"  [ERROR] {e}")
         return None, None, 0
@@ -94,46 +104,58 @@ def search_mal_via_official_api(title):
         return None, None, 0
     
     try:
-        url = "https://api.myanimelist.net/v2/manga"
-        params = {"q": title, "limit": 5}
-        headers = {"X-MAL-CLIENT-ID": MAL_CLIENT_ID}
+        cached = MAL_CACHE.get(title, source="mal")
         
-        print(f"  [MAL API] Searching for: {title}")
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
-        
-        if resp.status_code != 200:
-            print(f"  [WARN] API returned status {resp.status_code}")
-            return None, None, 0
-        
-        data = resp.json()
-        results = data.get("data", [])
+        if cached is not None:
+            print(f"  [Cache] Found cached results for: {title}")
+            results = cached["candidates"]
+        else:
+            # Be nice to MAL API too
+            url = "https://api.myanimelist.net/v2/manga"
+            params = {"q": title, "limit": 5}
+            headers = {"X-MAL-CLIENT-ID": MAL_CLIENT_ID}
+            
+            print(f"  [MAL API] Searching for: {title}")
+            resp = MAL_API_RETRY.get(url, session=shared_session(), params=params, headers=headers)
+            
+            if resp.status_code != 200:
+                print(f"  [WARN] API returned status {resp.status_code}")
+                return None, None, 0
+            
+            data = resp.json()
+            # Flatten {"node": {...}} so cached entries share the Jikan layout
+            results = [
+                {"mal_id": item.get("node", {}).get("id"), "title": item.get("node", {}).get("title", "")}
+                for item in data.get("data", [])
+            ]
         
         if not results:
             print(f"  [WARN] No results found")
+            if cached is None:
+                MAL_CACHE.put(title, results, source="mal")
             return None, None, 0
         
         # Find best match
+        index, best_score = best_candidate(title, [[manga.get("title")] for manga in results])
         best_match = None
-        best_score = 0
+        if index is not None:
+            manga = results[index]
+            best_match = (manga.get("mal_id"), manga.get("title", ""), best_score)
         
-        for item in results:
-            manga = item.get("node", {})
-            mal_title = manga.get("title", "")
-            mal_id = manga.get("id")
-            
-            score = similar(title, mal_title)
-            
-            if score > best_score:
-                best_score = score
-                best_match = (mal_id, mal_title, score)
+        matched = best_match is not None
+        if cached is None:
+            match = {"mal_id": best_match[0], "title": best_match[1], "score": best_score} if matched else None
+            MAL_CACHE.put(title, results, match, source="mal")
         
-        if best_match and best_score > 0.6:
+        if matched:
             print(f"  [FOUND] MAL ID {best_match[0]}: {best_match[1]} (confidence: {best_score:.2%})")
             return best_match
         else:
             print(f"  [WARN] Best match too low: {best_score:.2%}")
             return None, None, 0
             
+    except ThrottledError:
+        raise
     except Exception as e:
         print(f"  [ERROR] {e}")
         return None, None, 0
@@ -157,12 +179,19 @@ def enrich_mal_ids(input_file, output_file):
         "not_found": 0,
         "low_confidence": 0
     }
+    retry = JIKAN_RETRY if USE_JIKAN else MAL_API_RETRY
+    search = search_mal_via_jikan if USE_JIKAN else search_mal_via_official_api
+    flight = SingleFlight()  # duplicate titles share one lookup
+    MAL_CACHE.reset_stats()
+    retry.reset_stats()
     
     # Create report file
     with open("mal_id_report.txt", "w", encoding="utf-8") as report:
         report.write("MAL ID Enrichment Report\n")
         report.write("=" * 80 + "\n\n")
         
+        pending = []
+        
         for idx, manga in enumerate(manga_entries, 1):
             title_elem = manga.find("manga_title")
             mal_id_elem = manga.find("manga_mangadb_id")
@@ -170,25 +199,27 @@ def enrich_mal_ids(input_file, output_file):
             if title_elem is None or mal_id_elem is None:
                 continue
             
-            title = title_elem.text
             current_id = mal_id_elem.text
             
-            print(f"\n[{idx}/{total}] Processing: {title}")
-            report.write(f"[{idx}/{total}] {title}\n")
-            
             # Skip if already has a valid ID
             if current_id and current_id != "0":
+                print(f"\n[{idx}/{total}] Processing: {title_elem.text}")
                 print(f"  [SKIP] Already has MAL ID: {current_id}")
+                report.write(f"[{idx}/{total}] {title_elem.text}\n")
                 report.write(f"  Already has ID: {current_id}\n\n")
                 stats["found"] += 1
                 continue
             
+            pending.append((idx, title_elem.text, mal_id_elem))
+        
+        def lookup(item):
+            idx, title, mal_id_elem = item
+            print(f"\n[{idx}/{total}] Processing: {title}")
+            
             # Search for MAL ID
-            if USE_JIKAN:
-                mal_id, mal_title, score = search_mal_via_jikan(title)
-            else:
-                mal_id, mal_title, score = search_mal_via_official_api(title)
+            mal_id, mal_title, score = flight.do(title, search, title)
             
+            report.write(f"[{idx}/{total}] {title}\n")
             if mal_id:
                 mal_id_elem.text = str(mal_id)
                 stats["found"] += 1
@@ -200,14 +231,19 @@ def enrich_mal_ids(input_file, output_file):
             else:
                 stats["not_found"] += 1
                 report.write(f"  ✗ Not found on MAL\n\n")
-            
-            # Rate limiting (Jikan requires 1 request per second)
-            if USE_JIKAN:
-                time.sleep(1)
-            else:
-                time.sleep(0.1)  # Be nice to MAL API too
+        
+        def requeue(items, wait):
+            print(f"\n[WARN] {len(items)} titles rate-limited, requeued (waiting {wait:.0f}s)")
+        
+        # Throttled titles are retried at the end instead of being dropped
+        throttled = process_with_requeue(pending, lookup, retry, on_requeue=requeue)
+        for idx, title, _ in throttled:
+            stats["not_found"] += 1
+            report.write(f"[{idx}/{total}] {title}\n  ✗ Still rate-limited, not searched\n\n")
         
         # Write summary
+        cache_stats = MAL_CACHE.stats()
+        retry_stats = retry.stats()
         summary = f"""
 Summary:
 --------
@@ -215,6 +251,9 @@ Total manga: {total}
 Found MAL IDs: {stats['found']}
 Not found: {stats['not_found']}
 Low confidence matches: {stats['low_confidence']}
+Cache hits: {cache_stats['cache_hits']} ({cache_stats['cache_hit_rate']:.1%})
+Requests per attempt: {retry_stats['attempts']} (requeued: {retry_stats['requeued']})
+Duplicate titles sharing a lookup: {flight.stats()['calls_saved']}
 
 Success rate: {stats['found']/total*100:.1f}%
 """
@@ -237,7 +276,7 @@ def main():
     
     if USE_JIKAN:
         print("[INFO] Using Jikan API (unofficial, no auth required)")
-        print("[INFO] This will take time due to rate limits (1 request/second)")
+        print("[INFO] This will take time due to rate limits (3 requests/second, 60/minute)")
     else:
         print("[INFO] Using Official MAL API")
         if MAL_CLIENT_ID == "YOUR_CLIENT_ID_HERE":
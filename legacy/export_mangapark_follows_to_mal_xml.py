@@ -1,16 +1,22 @@
 import requests
-from bs4 import BeautifulSoup
 import xml.etree.ElementTree as ET
 from datetime import datetime
-import time
+import os
+import sys
+
+# Shared components live in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from page_ready import PageReady
+from driver_pool import chrome_options
+from http_engine import AuthError, EngineError, MangaParkHTTPEngine
+from auth_probe import AuthProbe
+from session_bootstrap import bootstrap_session
+from page_recorder import PageArchive
+from follows_parser import extract_links, title_links
 
 # For headless browsing (optional, will try if available)
 try:
     from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.webdriver.chrome.options import Options
     SELENIUM_AVAILABLE = True
 except ImportError:
     SELENIUM_AVAILABLE = False
@@ -26,6 +32,10 @@ Your Cookies Here
 # Optional: put your MAL username here (only used in <myinfo>, not for login)
 MAL_USERNAME = "mangapark_export"
 OUTPUT_XML = "mangapark_follows_mal.xml"
+
+# Optional: folder to save every fetched page to, for offline replay and
+# benchmarks with src/page_recorder.py (nothing is saved when empty)
+RECORD_DIR = ""
 # --------------------------
 
 
@@ -48,33 +58,28 @@ def scrape_follows_selenium(cookies_str):
     """
     print("[INFO] Using Selenium to scrape follows...")
     
-    # Setup Chrome options
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Run in background
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
+    cookies = {}
+    for cookie in cookies_str.split("; "):
+        if "=" in cookie:
+            name, value = cookie.split("=", 1)
+            cookies[name.strip()] = value.strip()
+    # Cookies are checked over HTTP while Chrome starts
+    probe = AuthProbe(cookies, base_url=BASE_URL)
+    archive = PageArchive(RECORD_DIR) if RECORD_DIR else None
     
-    # Create driver
-    driver = webdriver.Chrome(options=chrome_options)
+    # Create driver (shared headless options)
+    driver = webdriver.Chrome(options=chrome_options())
     
     try:
-        # Go to MangaPark
-        driver.get(f"{BASE_URL}/my/follows")
-        
-        # Add cookies
-        for cookie in cookies_str.split("; "):
-            if "=" in cookie:
-                name, value = cookie.split("=", 1)
-                driver.add_cookie({
-                    "name": name.strip(),
-                    "value": value.strip(),
-                    "domain": ".mangapark.io"
-                })
-        
-        # Reload with cookies
-        driver.refresh()
+        probe.check()
+    except AuthError:
+        driver.quit()
+        raise
+    
+    try:
+        # Cookies go in before the first load, no unauthenticated page + refresh
+        bootstrap_session(driver, cookies, BASE_URL)
+        page_ready = PageReady()
         
         results = []
         seen = set()
@@ -86,44 +91,26 @@ def scrape_follows_selenium(cookies_str):
             url = f"{BASE_URL}/my/follows?page={page}"
             driver.get(url)
             
-            # Wait for content to load
-            try:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                # Additional wait for dynamic content
-                time.sleep(2)
-            except:
+            # Wait for manga links and a settled DOM instead of a fixed delay
+            ready, link_count = page_ready.wait(driver)
+            if ready is None and not link_count:
                 print(f"[WARN] Timeout waiting for page {page}")
                 break
+            if ready is not None:
+                print(f"[INFO] Page {page} ready in {ready:.2f}s")
             
-            # Parse the rendered HTML
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            
-            # Save first page for debugging
-            if page == 1:
-                with open("debug_selenium_page1.html", "w", encoding="utf-8") as f:
-                    f.write(driver.page_source)
-                print("[DEBUG] Saved Selenium HTML to debug_selenium_page1.html")
+            if archive:
+                archive.record(url, driver.page_source)
             
-            # Look for links to manga titles
-            links = soup.select("a[href*='/title/']")
+            # Links to manga titles, read in the page (no page_source reparse)
+            links = extract_links(driver, BASE_URL)
             print(f"[DEBUG] Found {len(links)} potential manga links")
             
             count_this_page = 0
-            for a in links:
-                href = a.get("href", "")
-                title = a.get_text(strip=True)
-                
-                if not title or "/title/" not in href:
-                    continue
-                
-                full_url = href if href.startswith("http") else BASE_URL + href
-                key = (title, full_url)
-                
+            for key in links:
                 if key not in seen:
                     seen.add(key)
-                    results.append({"title": title, "url": full_url})
+                    results.append({"title": key[0], "url": key[1]})
                     count_this_page += 1
             
             print(f"[INFO] Found {count_this_page} unique titles on page {page}.")
@@ -147,13 +134,35 @@ def scrape_follows_selenium(cookies_str):
 def scrape_follows(session):
     """
     Scrape all followed titles from /my/follows
-    First tries Selenium if available, falls back to requests
+    First tries the GraphQL endpoint (no browser), then Selenium if available,
+    then plain HTML requests
     Returns a list of dicts: { 'title': ..., 'url': ... }
     """
-    # Try Selenium first if available
+    archive = PageArchive(RECORD_DIR) if RECORD_DIR else None
+    
+    # The JSON API the site itself uses is the fastest path
+    try:
+        results = MangaParkHTTPEngine(base_url=BASE_URL, session=session, archive=archive).scrape(
+            on_page=lambda page, count, total: print(f"[INFO] Page {page}: {count} titles")
+        )
+        if results:
+            print(f"[DONE] Total unique follows found: {len(results)}")
+            return results
+        print("[WARN] HTTP engine returned no titles")
+    except AuthError as e:
+        # Selenium would load the same logged-out pages
+        print(f"[ERROR] {e}")
+        return []
+    except EngineError as e:
+        print(f"[WARN] HTTP engine failed: {e}")
+    
+    # Then Selenium if available
     if SELENIUM_AVAILABLE:
         try:
             return scrape_follows_selenium(COOKIE_HEADER)
+        except AuthError as e:
+            print(f"[ERROR] {e}")
+            return []
         except Exception as e:
             print(f"[WARN] Selenium failed: {e}")
             print("[INFO] Falling back to requests-based scraping...")
@@ -172,26 +181,16 @@ def scrape_follows(session):
             print(f"[WARN] Got status {resp.status_code}, stopping.")
             break
         
-        # Save HTML for debugging
-        if page == 1:
-            with open("debug_page1.html", "w", encoding="utf-8") as f:
-                f.write(resp.text)
-            print("[DEBUG] Saved HTML to debug_page1.html")
+        if archive:
+            archive.record(html_url, resp.text)
         
-        # Try to parse HTML
-        soup = BeautifulSoup(resp.text, "html.parser")
-        links = soup.select("a[href*='/title/']")
+        # Try to parse HTML (fastest installed parser)
+        links = title_links(resp.text, BASE_URL)
         print(f"[DEBUG] Found {len(links)} links with '/title/' in HTML")
         
         count_this_page = 0
-        for a in links:
-            href = a.get("href") or ""
-            title = a.get_text(strip=True)
-            if not title or "/title/" not in href:
-                continue
-            
-            full_url = href if href.startswith("http") else BASE_URL + href
-            key = (title, full_url)
+        for key in links:
+            title, full_url = key
             if key not in seen:
                 seen.add(key)
                 results.append({"title": title, "url": full_url})
@@ -23,11 +23,28 @@ import queue
 import webbrowser
 from datetime import datetime
 
-import requests
-from bs4 import BeautifulSoup
 import xml.etree.ElementTree as ET
-import time
-from difflib import SequenceMatcher
+
+# Shared components live in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from rate_limiter import jikan_limiter
+from retry_policy import RetryPolicy, ThrottledError, process_with_requeue
+from jikan_client import shared_session
+from single_flight import SingleFlight
+from page_ready import PageReady
+from driver_pool import DriverPool
+from auth_probe import AuthProbe
+from session_bootstrap import bootstrap_session
+from memory_governor import MemoryGovernor
+from follows_parser import extract_links
+from similarity import best_candidate
+
+# Retries honor Retry-After and back off with jitter, sharing the Jikan budget
+MAL_RETRY = RetryPolicy(max_retries=3, timeout=10, limiter=jikan_limiter())
+
+# Chrome is restarted past this much memory (MB, needs psutil) or this many follows pages
+BROWSER_MEMORY_MB = 1024
+RECYCLE_PAGES = 40
 
 # Optional import for browser cookie fetching
 try:
@@ -38,11 +55,8 @@ except (ImportError, Exception) as e:
     print(f"Warning: browser_cookie3 not available: {e}")
 
 try:
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.webdriver.chrome.options import Options
+    # Availability check only: browsers are started by src/driver_pool
+    import selenium  # noqa: F401
     SELENIUM_AVAILABLE = True
 except ImportError:
     SELENIUM_AVAILABLE = False
@@ -66,6 +80,11 @@ class MangaParkExporterGUI:
         self.enriched_list = []
         self.output_dir = "output"
         
+        # Headless Chrome stays warm between exports
+        self.driver_pool = DriverPool(size=1)
+        if SELENIUM_AVAILABLE:
+            self.driver_pool.warm()
+        
         self.setup_ui()
         self.process_log_queue()
         
@@ -1363,44 +1382,32 @@ class MangaParkExporterGUI:
         self.log("[DEBUG] Starting scrape_mangapark with cookies: True" if cookies else "[DEBUG] Starting scrape_mangapark with cookies: False")
         print(f"[DEBUG] Starting scrape_mangapark with cookies: {cookies is not None}")
         
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--log-level=3")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        self.log("[DEBUG] Creating Chrome WebDriver...")
-        print("[DEBUG] Creating Chrome WebDriver...")
-        driver = webdriver.Chrome(options=chrome_options)
+        warm = self.driver_pool.idle_count() > 0
+        self.log("[DEBUG] Reusing warm Chrome WebDriver..." if warm else "[DEBUG] Creating Chrome WebDriver...")
+        print("[DEBUG] Reusing warm Chrome WebDriver..." if warm else "[DEBUG] Creating Chrome WebDriver...")
+        if cookies:
+            # Cookies are checked over HTTP while Chrome starts; AuthError ends the export
+            probe = AuthProbe(cookies)
+            self.driver_pool.warm()
+            if probe.check():
+                self.log(f"[DEBUG] Session cookies accepted ({probe.seconds:.1f}s)")
+        # Chrome grows page after page; past the budget it is restarted
+        governor = MemoryGovernor(max_rss_mb=BROWSER_MEMORY_MB, max_pages=RECYCLE_PAGES)
+        driver = self.driver_pool.acquire()
+        
+        def login(driver):
+            # Set before the first load: no unauthenticated page and refresh
+            count = bootstrap_session(driver, cookies)
+            self.log(f"[DEBUG] Set {count} cookies through DevTools")
+            print(f"[DEBUG] Set {count} cookies through DevTools")
         
         try:
             if cookies:
                 self.log("[DEBUG] Authenticated mode - using cookies")
                 print("[DEBUG] Authenticated mode - using cookies")
                 # Authenticated mode - scrape /my/follows
-                driver.get("https://mangapark.io/my/follows")
-                self.log("[DEBUG] Navigated to mangapark.io/my/follows")
-                print("[DEBUG] Navigated to mangapark.io/my/follows")
-                
-                for name, value in cookies.items():
-                    if value:
-                        self.log(f"[DEBUG] Adding cookie: {name} = {value[:20]}...")
-                        print(f"[DEBUG] Adding cookie: {name} = {value[:20]}...")
-                        driver.add_cookie({
-                            "name": name,
-                            "value": value,
-                            "domain": ".mangapark.io"
-                        })
-                
-                self.log("[DEBUG] Refreshing page with cookies...")
-                print("[DEBUG] Refreshing page with cookies...")
-                driver.refresh()
-                time.sleep(2)
+                login(driver)
+                page_ready = PageReady()
                 
                 results = []
                 seen = set()
@@ -1412,106 +1419,45 @@ class MangaParkExporterGUI:
                     self.log(f"[DEBUG] Scraping page {page}...")
                     print(f"[DEBUG] Scraping page {page}...")
                     
+                    if governor.needs_recycle(driver):
+                        self.log(f"  ♻️ Restarting Chrome to free memory before page {page}...")
+                        governor.recycled(driver)
+                        self.driver_pool.discard(driver)
+                        driver = None
+                        driver = self.driver_pool.acquire()
+                        login(driver)
+                    
                     url = f"https://mangapark.io/my/follows?page={page}"
                     driver.get(url)
                     self.log(f"[DEBUG] Loaded URL: {url}")
                     print(f"[DEBUG] Loaded URL: {url}")
                     
-                    try:
-                        # Attente dynamique : spinner ou manga cards
-                        self.log("  ⏳ Waiting for page to load (max 30s)...", "#667eea")
-                        self.log("[DEBUG] Waiting for page to fully load (max 30s)...")
-                        print("[DEBUG] Waiting for page to fully load (max 30s)...")
-                        try:
-                            WebDriverWait(driver, 30).until(
-                                lambda d: d.find_elements(By.CSS_SELECTOR, "a[href*='/title/']") or not d.find_elements(By.CLASS_NAME, "loading-spinner")
-                            )
-                        except Exception as e:
-                            self.log(f"[DEBUG] Timeout or error during wait: {e}")
-                            print(f"[DEBUG] Timeout or error during wait: {e}")
-                        
-                        self.log("[DEBUG] Checking for loading spinner...")
-                        print("[DEBUG] Checking for loading spinner...")
-                        # Try to wait for spinner to disappear (but don't fail if it's already gone)
-                        spinner_gone = False
-                        try:
-                            WebDriverWait(driver, 5).until_not(
-                                EC.presence_of_element_located((By.CLASS_NAME, "loading-spinner"))
-                            )
-                            self.log("[DEBUG] Spinner disappeared")
-                            print("[DEBUG] Spinner disappeared")
-                            spinner_gone = True
-                        except:
-                            self.log("[DEBUG] No spinner found or already gone")
-                            print("[DEBUG] No spinner found or already gone")
-                            spinner_gone = True
-                        
-                        # Additional wait after spinner (only if spinner was there)
-                        if spinner_gone:
-                            self.log("  ⏳ Waiting for content to render (5 seconds)...", "#667eea")
-                            self.log("[DEBUG] Waiting additional 5 seconds for content to render...")
-                            print("[DEBUG] Waiting additional 5 seconds for content to render...")
-                            time.sleep(5)
-                        
-                        self.log("[DEBUG] Looking for manga cards...")
-                        print("[DEBUG] Looking for manga cards...")
-                        # Check if manga cards appeared
-                        soup_check = BeautifulSoup(driver.page_source, "html.parser")
-                        links_check = soup_check.select("a[href*='/title/']")
-                        self.log(f"[DEBUG] Found {len(links_check)} potential manga links after waiting")
-                        print(f"[DEBUG] Found {len(links_check)} potential manga links after waiting")
-                        
-                        if len(links_check) == 0:
-                            self.log("  ⏳ Content still loading, waiting up to 30s for manga cards...", "#667eea")
-                            self.log("[DEBUG] Still no manga cards found, waiting up to 30s...")
-                            print("[DEBUG] Still no manga cards found, waiting up to 30s...")
-                            try:
-                                WebDriverWait(driver, 30).until(
-                                    lambda d: d.find_elements(By.CSS_SELECTOR, "a[href*='/title/']")
-                                )
-                            except Exception as e:
-                                self.log(f"[DEBUG] Timeout or error during wait for manga cards: {e}")
-                                print(f"[DEBUG] Timeout or error during wait for manga cards: {e}")
-                    except Exception as e:
-                        self.log(f"[DEBUG] Exception during wait: {e}")
-                        print(f"[DEBUG] Exception during wait: {e}")
-                        self.log("  ⏳ Finalizing page load (15 seconds)...", "#667eea")
-                        self.log("[DEBUG] Continuing anyway...")
-                        print("[DEBUG] Continuing anyway...")
-                        time.sleep(15)
-                    
-                    # Save page source for debugging
-                    if page == 1:
-                        page_source = driver.page_source
-                        self.log(f"[DEBUG] Page source length: {len(page_source)}")
-                        print(f"[DEBUG] Page source length: {len(page_source)}")
-                        with open("debug_scrape_page1.html", "w", encoding="utf-8") as f:
-                            f.write(page_source)
-                        self.log("[DEBUG] Saved page source to debug_scrape_page1.html")
-                        print("[DEBUG] Saved page source to debug_scrape_page1.html")
+                    # Wait for manga cards and a settled DOM (timeout adapts to recent pages)
+                    self.log(f"  ⏳ Waiting for page to load (max {page_ready.timeout:.0f}s)...", "#667eea")
+                    ready, link_count = page_ready.wait(driver)
+                    if ready is None:
+                        self.log(f"[DEBUG] Page not ready after {page_ready.timeout:.0f}s, {link_count} links so far")
+                        print(f"[DEBUG] Page not ready after {page_ready.timeout:.0f}s, {link_count} links so far")
+                    else:
+                        self.log(f"[DEBUG] Page {page} ready in {ready:.2f}s ({link_count} links)")
+                        print(f"[DEBUG] Page {page} ready in {ready:.2f}s ({link_count} links)")
                     
-                    soup = BeautifulSoup(driver.page_source, "html.parser")
-                    links = soup.select("a[href*='/title/']")
+                    # Single in-page pass, no page_source serialization or reparse
+                    links = extract_links(driver)
+                    rss = governor.page_loaded(driver)
+                    if rss is not None:
+                        print(f"[DEBUG] Chrome memory: {rss / 1024 / 1024:.0f} MB")
                     self.log(f"[DEBUG] Found {len(links)} links with '/title/'")
                     print(f"[DEBUG] Found {len(links)} links with '/title/'")
                     
                     count = 0
-                    for a in links:
-                        href = a.get("href", "")
-                        title = a.get_text(strip=True)
-                        
-                        if not title or "/title/" not in href:
-                            continue
-                        
-                        full_url = href if href.startswith("http") else "https://mangapark.io" + href
-                        key = (title, full_url)
-                        
+                    for key in links:
                         if key not in seen:
                             seen.add(key)
-                            results.append({"title": title, "url": full_url})
+                            results.append({"title": key[0], "url": key[1]})
                             count += 1
                             if count <= 5:  # Show first 5 for debugging
-                                print(f"[DEBUG] Found manga: {title}")
+                                print(f"[DEBUG] Found manga: {key[0]}")
                     
                     self.log(f"  Found {count} titles on page {page}")
                     self.log(f"[DEBUG] Total unique manga so far: {len(results)}")
@@ -1531,7 +1477,8 @@ class MangaParkExporterGUI:
                 
                 driver.get("https://mangapark.io/latest")
                 print("[DEBUG] Loaded latest page")
-                time.sleep(3)
+                page_ready = PageReady()
+                page_ready.wait(driver)
                 
                 results = []
                 seen = set()
@@ -1540,29 +1487,27 @@ class MangaParkExporterGUI:
                 for i in range(5):
                     driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
                     print(f"[DEBUG] Scroll {i+1}/5")
-                    time.sleep(2)
+                    page_ready.wait(driver)
+                    governor.page_loaded(driver)
+                    if governor.over_memory(driver):
+                        # Restarting would lose the scrolled-in cards
+                        self.log("  ⚠️ Chrome memory limit reached, keeping what is loaded")
+                        break
                 
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-                links = soup.select("a[href*='/title/']")
+                links = extract_links(driver)
                 print(f"[DEBUG] Found {len(links)} links")
                 
-                for a in links:
-                    href = a.get("href", "")
-                    title = a.get_text(strip=True)
-                    
-                    if not title or "/title/" not in href:
-                        continue
-                    
-                    full_url = href if href.startswith("http") else "https://mangapark.io" + href
-                    key = (title, full_url)
-                    
+                for key in links:
                     if key not in seen:
                         seen.add(key)
-                        results.append({"title": title, "url": full_url})
+                        results.append({"title": key[0], "url": key[1]})
                 
                 self.log(f"  Found {len(results)} manga")
                 print(f"[DEBUG] Total public manga: {len(results)}")
             
+            memory = governor.stats()
+            if memory["peak_rss_mb"] is not None:
+                self.log(f"  Chrome memory peaked at {memory['peak_rss_mb']:.0f} MB ({memory['recycles']} restarts)")
             self.log(f"\n✓ Total manga found: {len(results)}", "#10b981")
             self.log(f"[DEBUG] Scraping complete: {len(results)} manga")
             print(f"[DEBUG] Scraping complete: {len(results)} manga")
@@ -1575,47 +1520,62 @@ class MangaParkExporterGUI:
             traceback.print_exc()
             raise
         finally:
-            self.log("[DEBUG] Closing WebDriver")
-            print("[DEBUG] Closing WebDriver")
-            driver.quit()
+            self.log("[DEBUG] Returning WebDriver to the pool")
+            print("[DEBUG] Returning WebDriver to the pool")
+            if driver is not None and governor.over_memory(driver):
+                governor.recycled(driver)
+                self.driver_pool.discard(driver)
+            elif driver is not None:
+                self.driver_pool.release(driver)
     
     def enrich_with_mal_ids(self, manga_list):
         """Enrich with MAL IDs"""
         total = len(manga_list)
-        found_count = 0
-        enriched = []
+        enriched = [{**manga, "mal_id": "0", "confidence": 0} for manga in manga_list]
+        pending = []
+        done = [0, 0]  # processed, found
+        flight = SingleFlight()  # duplicate titles share one lookup
         
-        self.log(f"  Processing {total} manga (1 req/sec)...")
+        self.log(f"  Processing {total} manga (3 req/sec, 60 req/min)...")
+        MAL_RETRY.reset_stats()
         
         for idx, manga in enumerate(manga_list, 1):
-            title = manga["title"]
-            
             # Skip chapter titles
-            if title.lower().startswith(("chapter", "ch.", "vol.")):
-                self.log(f"  [{idx}/{total}] ⏭️  Skipping: {title[:50]}")
-                enriched.append({**manga, "mal_id": "0", "confidence": 0})
-                continue
-            
+            if manga["title"].lower().startswith(("chapter", "ch.", "vol.")):
+                self.log(f"  [{idx}/{total}] ⏭️  Skipping: {manga['title'][:50]}")
+                done[0] += 1
+            else:
+                pending.append(idx)
+        
+        def lookup(idx):
+            title = manga_list[idx - 1]["title"]
             self.progress_label.config(text=f"Finding MAL IDs: {idx}/{total}")
             self.log(f"  [{idx}/{total}] 🔍 {title[:50]}{'...' if len(title) > 50 else ''}")
             
-            mal_id, mal_title, score = self.search_mal_id(title)
+            mal_id, mal_title, score = flight.do(title, self.search_mal_id, title)
+            done[0] += 1
             
             if mal_id:
-                found_count += 1
+                done[1] += 1
                 conf = "High" if score >= 0.9 else "Med" if score >= 0.7 else "Low"
                 self.log(f"            ✓ MAL ID {mal_id} ({conf}: {score:.0%})", "#10b981")
-                enriched.append({**manga, "mal_id": str(mal_id), "mal_title": mal_title, "confidence": score})
+                enriched[idx - 1].update({"mal_id": str(mal_id), "mal_title": mal_title, "confidence": score})
             else:
                 self.log(f"            ✗ Not found", "#ef4444")
-                enriched.append({**manga, "mal_id": "0", "confidence": 0})
             
             # Update stats in real-time
-            self.update_stats(idx, found_count, idx - found_count)
-            
-            time.sleep(1)
+            self.update_stats(done[0], done[1], done[0] - done[1])
+        
+        def requeue(items, wait):
+            self.log(f"  ⏳ {len(items)} titles rate-limited, retrying in {wait:.0f}s...", "#667eea")
+        
+        # Throttled titles are retried at the end instead of being marked not found
+        process_with_requeue(pending, lookup, MAL_RETRY, on_requeue=requeue)
         
+        found_count = done[1]
         self.log(f"\n✓ Found {found_count}/{total} ({found_count/total*100:.1f}%)", "#10b981")
+        self.log(f"  Requests per attempt: {MAL_RETRY.stats()['attempts']}")
+        self.log(f"  Duplicate titles sharing a lookup: {flight.stats()['calls_saved']}")
         return enriched
     
     def search_mal_id(self, title):
@@ -1624,11 +1584,7 @@ class MangaParkExporterGUI:
             url = "https://api.jikan.moe/v4/manga"
             params = {"q": title, "limit": 5}
             
-            resp = requests.get(url, params=params, timeout=10)
-            
-            if resp.status_code == 429:
-                time.sleep(60)
-                resp = requests.get(url, params=params, timeout=10)
+            resp = MAL_RETRY.get(url, session=shared_session(), params=params)
             
             if resp.status_code != 200:
                 return None, None, 0
@@ -1639,28 +1595,17 @@ class MangaParkExporterGUI:
             if not results:
                 return None, None, 0
             
-            best_match = None
-            best_score = 0
-            
-            for manga in results:
-                mal_title = manga.get("title", "")
-                mal_title_english = manga.get("title_english", "")
-                mal_id = manga.get("mal_id")
-                
-                score = max(
-                    SequenceMatcher(None, title.lower(), mal_title.lower()).ratio(),
-                    SequenceMatcher(None, title.lower(), mal_title_english.lower()).ratio() if mal_title_english else 0
-                )
-                
-                if score > best_score:
-                    best_score = score
-                    best_match = (mal_id, mal_title, score)
-            
-            if best_match and best_score > 0.6:
-                return best_match
+            index, score = best_candidate(
+                title, [[manga.get("title"), manga.get("title_english")] for manga in results]
+            )
+            if index is None:
+                return None, None, 0
             
-            return None, None, 0
+            manga = results[index]
+            return manga.get("mal_id"), manga.get("title", ""), score
             
+        except ThrottledError:
+            raise
         except:
             return None, None, 0
     
@@ -1845,6 +1790,7 @@ def main():
     root = tk.Tk()
     app = MangaParkExporterGUI(root)
     root.mainloop()
+    app.driver_pool.close()
 
 
 if __name__ == "__main__":
@@ -7,21 +7,32 @@ Complete MangaPark to MAL Exporter
 4. Creates HTML viewing page
 """
 
-import requests
-from bs4 import BeautifulSoup
 import xml.etree.ElementTree as ET
 from datetime import datetime
-import time
-from difflib import SequenceMatcher
 import os
+import sys
+
+# Shared components live in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from mal_cache import MALCache
+from rate_limiter import jikan_limiter
+from retry_policy import RetryPolicy, ThrottledError, process_with_requeue
+from jikan_client import shared_session
+from single_flight import SingleFlight
+from driver_pool import DriverPool
+from follows_parser import extract_links
+from sharded_scraper import ShardedScraper
+from http_engine import AuthError
+from auth_probe import AuthProbe
+from session_bootstrap import bootstrap_session
+from mirror_selector import MIRRORS, MirrorSelector, is_network_error, site_of
+from memory_governor import MemoryGovernor
+from similarity import best_candidate
 
 # Selenium imports
 try:
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.webdriver.chrome.options import Options
+    # Availability check only: browsers are started by src/driver_pool
+    import selenium  # noqa: F401
     SELENIUM_AVAILABLE = True
 except ImportError:
     SELENIUM_AVAILABLE = False
@@ -32,6 +43,9 @@ except ImportError:
 
 BASE_URL = "https://mangapark.io"
 
+# Use the fastest answering MangaPark mirror (always BASE_URL when False)
+PICK_FASTEST_MIRROR = True
+
 # IMPORTANT: Get your cookies from browser after logging in
 # 1. Open MangaPark in your browser and log in
 # 2. Press F12 -> Application/Storage -> Cookies
@@ -46,12 +60,20 @@ COOKIES = {
 MAL_USERNAME = "mangapark_export"
 OUTPUT_DIR = "output"
 
-# =======================================================
+# Browsers scraping follows pages in parallel
+SCRAPE_SHARDS = 3
 
+# Browsers are restarted past this much memory (MB, needs psutil) or this many pages
+BROWSER_MEMORY_MB = 1024
+RECYCLE_PAGES = 40
 
-def similar(a, b):
-    """Calculate similarity ratio between two strings"""
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+# Jikan results are cached on disk so re-exports skip the network
+MAL_CACHE = MALCache()
+
+# Retries honor Retry-After and back off with jitter, sharing the Jikan budget
+MAL_RETRY = RetryPolicy(max_retries=3, timeout=10, limiter=jikan_limiter())
+
+# =======================================================
 
 
 def print_step(step_num, total_steps, message):
@@ -65,130 +87,110 @@ def scrape_mangapark_follows():
     """Step 1: Scrape follows from MangaPark using Selenium"""
     print_step(1, 4, "Scraping MangaPark Follows")
     
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
+    mirrors = MirrorSelector((BASE_URL,) + MIRRORS)
+    mirrors.pin(None if PICK_FASTEST_MIRROR else BASE_URL)
+    print(f"  [INFO] Using {mirrors.select()}")
     
-    driver = webdriver.Chrome(options=chrome_options)
+    def prepare(driver):
+        # Cookies go in through DevTools (for every mirror, in case of a failover),
+        # so the first follows page is already logged in
+        bootstrap_session(driver, COOKIES, mirrors.current, mirrors=mirrors.mirrors)
+        driver.set_page_load_timeout(30)
     
-    try:
-        driver.get(f"{BASE_URL}/my/follows")
-        
-        # Add cookies
-        for name, value in COOKIES.items():
-            driver.add_cookie({
-                "name": name,
-                "value": value,
-                "domain": ".mangapark.io"
-            })
-        
-        driver.refresh()
-        time.sleep(2)
-        
-        results = []
-        seen = set()
-        page = 1
-        
-        while True:
-            print(f"  [INFO] Scraping page {page}...")
-            
-            url = f"{BASE_URL}/my/follows?page={page}"
-            driver.get(url)
-            
-            try:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                time.sleep(2)
-            except:
-                print(f"  [WARN] Timeout on page {page}")
-                break
-            
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            links = soup.select("a[href*='/title/']")
-            
-            count_this_page = 0
-            for a in links:
-                href = a.get("href", "")
-                title = a.get_text(strip=True)
-                
-                if not title or "/title/" not in href:
-                    continue
-                
-                full_url = href if href.startswith("http") else BASE_URL + href
-                key = (title, full_url)
-                
-                if key not in seen:
-                    seen.add(key)
-                    results.append({"title": title, "url": full_url})
-                    count_this_page += 1
-            
-            print(f"  [INFO] Found {count_this_page} unique titles on page {page}")
-            
-            if count_this_page == 0:
-                break
-            
-            page += 1
-            
-            if page > 100:
-                print("  [WARN] Reached page limit")
-                break
-        
-        print(f"\n  ✓ Total manga found: {len(results)}")
-        return results
+    def on_page(page, count, elapsed, shard):
+        print(f"  [INFO] Page {page}: {count} links in {elapsed:.2f}s (browser {shard + 1})")
+    
+    def on_error(url, error):
+        failed = site_of(url)
+        if not is_network_error(error) or mirrors.failover(failed) == failed:
+            return False
+        print(f"  [WARN] {failed} is not responding, switching to {mirrors.current}")
+        return True
     
+    # Cookies are checked over HTTP while the browsers start
+    probe = AuthProbe(COOKIES, base_url=mirrors.current)
+    
+    # Pages are spread over SCRAPE_SHARDS browsers and merged back in order
+    pool = DriverPool(size=SCRAPE_SHARDS)
+    try:
+        pool.warm()
+        try:
+            probe.check()
+        except AuthError as e:
+            print(f"  [ERROR] {e}")
+            return []
+        scraper = ShardedScraper(
+            pool,
+            prepare,
+            lambda driver: extract_links(driver, mirrors.current),
+            lambda page: f"{mirrors.current}/my/follows?page={page}",
+            shards=SCRAPE_SHARDS,
+            max_pages=100,
+            on_page=on_page,
+            governor=MemoryGovernor(max_rss_mb=BROWSER_MEMORY_MB, max_pages=RECYCLE_PAGES),
+            on_error=on_error
+        )
+        results, stats = scraper.scrape()
     finally:
-        driver.quit()
+        pool.close()
+    
+    for shard in stats["per_shard"]:
+        print(f"  [INFO] Browser {shard['shard'] + 1}: {shard['pages']} pages in {shard['seconds']:.1f}s")
+    print(f"  [INFO] {stats['pages']} pages in {stats['wall_seconds']:.1f}s "
+          f"(serial would take ~{stats['serial_seconds']:.1f}s, {stats['speedup']:.1f}x)")
+    memory = stats["memory"]
+    if memory["peak_rss_mb"] is not None:
+        print(f"  [INFO] Chrome memory peaked at {memory['peak_rss_mb']:.0f} MB ({memory['recycles']} restarts)")
+    print(f"\n  ✓ Total manga found: {len(results)}")
+    return results
 
 
 def search_mal_id(title):
     """Search for manga on MAL using Jikan API"""
     try:
-        url = "https://api.jikan.moe/v4/manga"
-        params = {"q": title, "limit": 5}
-        
-        resp = requests.get(url, params=params, timeout=10)
-        
-        if resp.status_code == 429:
-            print("    [WARN] Rate limit, waiting 60s...")
-            time.sleep(60)
-            resp = requests.get(url, params=params, timeout=10)
+        cached = MAL_CACHE.get(title)
         
-        if resp.status_code != 200:
-            return None, None, 0
-        
-        data = resp.json()
-        results = data.get("data", [])
+        if cached is not None:
+            results = cached["candidates"]
+        else:
+            # Retries and the shared Jikan budget, only for cache misses
+            url = "https://api.jikan.moe/v4/manga"
+            params = {"q": title, "limit": 5}
+            
+            resp = MAL_RETRY.get(url, session=shared_session(), params=params)
+            
+            if resp.status_code != 200:
+                return None, None, 0
+            
+            data = resp.json()
+            results = data.get("data", [])
         
         if not results:
+            if cached is None:
+                MAL_CACHE.put(title, results)
             return None, None, 0
         
+        # Score every title variant of every result in one batch
+        index, best_score = best_candidate(
+            title, [[manga.get("title"), manga.get("title_english")] for manga in results]
+        )
         best_match = None
-        best_score = 0
+        if index is not None:
+            manga = results[index]
+            best_match = (manga.get("mal_id"), manga.get("title", ""), best_score)
         
-        for manga in results:
-            mal_title = manga.get("title", "")
-            mal_title_english = manga.get("title_english", "")
-            mal_id = manga.get("mal_id")
-            
-            scores = [
-                similar(title, mal_title),
-                similar(title, mal_title_english) if mal_title_english else 0,
-            ]
-            score = max(scores)
-            
-            if score > best_score:
-                best_score = score
-                best_match = (mal_id, mal_title, score)
+        matched = best_match is not None
+        if cached is None:
+            match = {"mal_id": best_match[0], "title": best_match[1], "score": best_score} if matched else None
+            MAL_CACHE.put(title, results, match)
         
-        if best_match and best_score > 0.6:
+        if matched:
             return best_match
         else:
             return None, None, 0
             
+    except ThrottledError:
+        raise
     except Exception as e:
         return None, None, 0
 
@@ -198,58 +200,59 @@ def enrich_with_mal_ids(manga_list):
     print_step(2, 4, "Finding MAL IDs")
     
     total = len(manga_list)
-    found_count = 0
-    low_confidence = 0
     
-    print(f"  [INFO] Processing {total} manga (this will take ~{total} seconds)")
-    print("  [INFO] Rate limit: 1 request/second\n")
+    print(f"  [INFO] Processing {total} manga (this will take ~{total // 3} seconds)")
+    print("  [INFO] Rate limit: 3 requests/second, 60/minute (cached titles are instant)\n")
     
-    enriched_list = []
+    MAL_CACHE.reset_stats()
+    MAL_RETRY.reset_stats()
+    unmatched = {"mal_id": "0", "mal_title": None, "confidence": 0}
+    enriched_list = [{**manga, **unmatched} for manga in manga_list]
+    pending = []
+    # The same series followed twice (or spelled differently) is looked up once
+    flight = SingleFlight()
     
     for idx, manga in enumerate(manga_list, 1):
-        title = manga["title"]
-        
         # Skip obvious chapter titles
-        if title.lower().startswith(("chapter", "ch.", "vol.")):
-            print(f"  [{idx}/{total}] ⏭️  Skipping '{title}' (chapter title)")
-            enriched_list.append({
-                **manga,
-                "mal_id": "0",
-                "mal_title": None,
-                "confidence": 0
-            })
-            continue
-        
+        if manga["title"].lower().startswith(("chapter", "ch.", "vol.")):
+            print(f"  [{idx}/{total}] ⏭️  Skipping '{manga['title']}' (chapter title)")
+        else:
+            pending.append(idx)
+    
+    def lookup(idx):
+        title = manga_list[idx - 1]["title"]
         print(f"  [{idx}/{total}] 🔍 {title[:60]}{'...' if len(title) > 60 else ''}")
         
-        mal_id, mal_title, score = search_mal_id(title)
+        mal_id, mal_title, score = flight.do(title, search_mal_id, title)
         
         if mal_id:
-            found_count += 1
             if score < 0.8:
-                low_confidence += 1
                 print(f"            ⚠️  MAL ID {mal_id} (confidence: {score:.1%})")
             else:
                 print(f"            ✓ MAL ID {mal_id} (confidence: {score:.1%})")
             
-            enriched_list.append({
-                **manga,
+            enriched_list[idx - 1].update({
                 "mal_id": str(mal_id),
                 "mal_title": mal_title,
                 "confidence": score
             })
         else:
             print(f"            ✗ Not found")
-            enriched_list.append({
-                **manga,
-                "mal_id": "0",
-                "mal_title": None,
-                "confidence": 0
-            })
-        
-        time.sleep(1)  # Rate limiting
     
+    def requeue(items, wait):
+        print(f"\n  [WARN] {len(items)} titles rate-limited, requeued (waiting {wait:.0f}s)\n")
+    
+    # Throttled titles are retried at the end instead of being marked unmatched
+    process_with_requeue(pending, lookup, MAL_RETRY, on_requeue=requeue)
+    
+    found_count = sum(1 for m in enriched_list if m["mal_id"] != "0")
+    low_confidence = sum(1 for m in enriched_list if m["mal_id"] != "0" and m["confidence"] < 0.8)
+    cache_stats = MAL_CACHE.stats()
+    retry_stats = MAL_RETRY.stats()
     print(f"\n  ✓ Found: {found_count}/{total} ({found_count/total*100:.1f}%)")
+    print(f"  ⚡ Cache hits: {cache_stats['cache_hits']} ({cache_stats['cache_hit_rate']:.1%})")
+    print(f"  🔁 Requests per attempt: {retry_stats['attempts']} (requeued: {retry_stats['requeued']})")
+    print(f"  🔗 Duplicate titles sharing a lookup: {flight.stats()['calls_saved']}")
     if low_confidence > 0:
         print(f"  ⚠️  Low confidence matches: {low_confidence}")
     
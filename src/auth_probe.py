@@ -0,0 +1,97 @@
+"""
+Authentication probe
+Checks the skey/tfv cookies with one small request while the browser starts
+"""
+
+import threading
+import time
+
+from http_engine import DEFAULT_BASE_URL, AuthError, EngineError, MangaParkHTTPEngine
+
+
+# Paging info of the first follows page only
+PROBE_QUERY = """
+query get_user_libList($select: UserLibList_Select) {
+  get_user_libList(select: $select) { paging { total pages } }
+}
+"""
+
+
+def probe_session(cookies, base_url=DEFAULT_BASE_URL, timeout=5, session=None):
+    """
+    Check that MangaPark considers the cookies logged in
+
+    Only a clear logged-out answer fails: missing cookies, or MangaPark
+    saying so in a GraphQL error. A refused request (bot checks answer 403
+    to non-browser clients), a network error or an empty response proves
+    nothing about the cookies, so the browser is left to try.
+
+    Args:
+        cookies: Dict of cookie name -> value (skey, tfv...)
+        timeout: Request timeout in seconds
+        session: Optional requests.Session to reuse
+
+    Returns:
+        True when logged in, None when the probe could not tell: the
+        caller should carry on
+
+    Raises:
+        AuthError: The cookies are missing, expired or rejected
+    """
+    if not cookies.get("skey") or not cookies.get("tfv"):
+        raise AuthError("Missing skey/tfv cookies")
+
+    # Same session, headers and error classification as the follows engine
+    engine = MangaParkHTTPEngine(cookies, base_url=base_url, session=session, timeout=timeout)
+    try:
+        engine.query(PROBE_QUERY, {"select": {"type": "follow", "page": 1}})
+    except AuthError:
+        raise
+    except EngineError:
+        return None
+    return True
+
+
+class AuthProbe:
+    """
+    probe_session() on a background thread
+
+    Start it before launching Chrome; check() before the first page is
+    loaded then costs nothing when the cookies are good and aborts the
+    scrape right away when they are not.
+    """
+
+    def __init__(self, cookies, base_url=DEFAULT_BASE_URL, timeout=5):
+        self.result = None
+        self.error = None
+        self.seconds = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(cookies, base_url, timeout), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, cookies, base_url, timeout):
+        started = time.monotonic()
+        try:
+            self.result = probe_session(cookies, base_url, timeout)
+        except AuthError as e:
+            self.error = e
+        finally:
+            self.seconds = time.monotonic() - started
+            self._done.set()
+
+    def check(self, timeout=None):
+        """
+        Wait for the probe
+
+        Returns:
+            True (logged in) or None (inconclusive, or still running after timeout)
+
+        Raises:
+            AuthError: The cookies were rejected
+        """
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.result
@@ -0,0 +1,270 @@
+"""
+Persistent browser profiles
+Chrome user-data-dirs kept between runs, one set per account, so MangaPark's scripts and styles come from the disk cache
+
+Layout: ROOT/<account>/slot-N. Chrome locks a user-data-dir while it
+runs, so parallel browsers of one account each get their own slot. A slot
+is claimed through an OS lock on a file inside it, which also keeps other
+app instances and the legacy scripts out (released even if the process
+dies).
+Profiles are size-capped: Chrome evicts its own disk cache past
+--disk-cache-size, and prune() drops the caches of the least recently
+used profiles when the whole store is still over its budget.
+
+Compare time to the first page with a throwaway and a reused profile:
+
+    python src/browser_profile.py [URL] [rounds]
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+try:
+    from selenium import webdriver
+    SELENIUM_AVAILABLE = True
+except ImportError:
+    SELENIUM_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt  # Windows
+
+from driver_pool import chrome_options
+
+
+DEFAULT_PROFILE_ROOT = os.path.join(os.path.expanduser("~"), ".mangapark_exporter", "chrome_profiles")
+
+# Held by the process using a slot
+LOCK_NAME = "exporter.lock"
+
+# Regenerated by Chrome on demand, dropped first when over budget
+_CACHE_DIRS = ("Cache", "Code Cache", "GPUCache", "GrShaderCache", "ShaderCache", "DawnCache",
+               os.path.join("Service Worker", "CacheStorage"))
+
+
+def account_id(cookies):
+    """
+    Profile name of an account
+
+    tfv is set on the first visit and kept across logins, skey changes
+    with every session. The name is a hash, so the cookie value itself is
+    not written to disk. Anonymous sessions share one profile.
+    """
+    key = (cookies.get("tfv") or cookies.get("skey")) if cookies else None
+    if not key:
+        return "anonymous"
+    return hashlib.sha1(str(key).encode("utf-8")).hexdigest()[:12]
+
+
+def lock_slot(path):
+    """
+    Claim a profile slot for this process
+
+    Returns:
+        Open lock file (close it to release the slot), None when another
+        process or browser of this one holds the slot
+    """
+    os.makedirs(path, exist_ok=True)
+    handle = open(os.path.join(path, LOCK_NAME), "a+")
+    try:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def unlock_slot(handle):
+    """Release a slot claimed with lock_slot()"""
+    try:
+        if not fcntl:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+    handle.close()  # also drops a flock
+
+
+def dir_size(path):
+    """Bytes used by the files under a directory"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass  # removed while walking
+    return total
+
+
+class ProfileStore:
+    """Slots of persistent user-data-dirs, checked out by the browsers using them"""
+
+    def __init__(self, root=DEFAULT_PROFILE_ROOT, max_mb=300):
+        """
+        Args:
+            root: Folder holding every account's profiles
+            max_mb: Budget of the whole store; each browser's disk cache gets a share
+        """
+        self.root = root
+        self.max_bytes = int(max_mb) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._in_use = {}  # slot path -> lock file
+
+    def cache_bytes(self, slots=3):
+        """--disk-cache-size for one browser when `slots` of them share the budget"""
+        return max(16 * 1024 * 1024, self.max_bytes // max(1, slots) // 2)
+
+    def checkout(self, account):
+        """Path of a slot of the account no browser uses (in any process), created if needed"""
+        with self._lock:
+            slot = 0
+            while True:
+                path = os.path.join(self.root, account, f"slot-{slot}")
+                if path not in self._in_use:
+                    handle = lock_slot(path)
+                    if handle is not None:
+                        break
+                slot += 1
+            self._in_use[path] = handle
+        # Last use, read by prune()
+        os.utime(path)
+        return path
+
+    def checkin(self, path):
+        with self._lock:
+            handle = self._in_use.pop(path, None)
+        if handle is not None:
+            unlock_slot(handle)
+
+    def size(self):
+        return dir_size(self.root) if os.path.isdir(self.root) else 0
+
+    def prune(self):
+        """
+        Bring the store under budget, least recently used profiles first
+
+        Caches go before whole profiles; slots in use, here or in another
+        process, are never touched.
+
+        Returns:
+            Bytes freed
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        with self._lock:
+            in_use = set(self._in_use)
+        # Slots are locked while pruning so no browser starts on them meanwhile
+        slots = []
+        for account in os.listdir(self.root):
+            account_dir = os.path.join(self.root, account)
+            if not os.path.isdir(account_dir):
+                continue
+            for slot in os.listdir(account_dir):
+                path = os.path.join(account_dir, slot)
+                if os.path.isdir(path) and path not in in_use:
+                    mtime = os.path.getmtime(path)
+                    handle = lock_slot(path)
+                    if handle is not None:
+                        slots.append((mtime, path, handle))
+        slots.sort(key=lambda slot: slot[0])
+
+        try:
+            before = size = self.size()
+            for _, path, _ in slots:
+                if size <= self.max_bytes:
+                    break
+                for profile in (path, os.path.join(path, "Default")):
+                    for name in _CACHE_DIRS:
+                        shutil.rmtree(os.path.join(profile, name), ignore_errors=True)
+                size = self.size()
+            removed = []
+            for _, path, _ in slots:
+                if size <= self.max_bytes:
+                    break
+                # Windows keeps the lock file while it is held, it goes below
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(path)
+                size = self.size()
+        finally:
+            for _, path, handle in slots:
+                unlock_slot(handle)
+        for path in removed:
+            shutil.rmtree(path, ignore_errors=True)
+        return before - size
+
+
+def launch_with_profile(store, account, network_log=False, slots=3):
+    """
+    Start a headless Chrome on a persistent profile slot
+
+    The slot is checked back in when the driver quits.
+
+    Args:
+        store: ProfileStore
+        account: account_id() of the cookies the browser will carry
+        slots: Browsers expected to run at once (splits the cache budget)
+    """
+    path = store.checkout(account)
+    try:
+        options = chrome_options(network_log=network_log)
+        options.add_argument(f"--user-data-dir={path}")
+        options.add_argument(f"--disk-cache-size={store.cache_bytes(slots)}")
+        driver = webdriver.Chrome(options=options)
+    except Exception:
+        store.checkin(path)
+        raise
+
+    quit_browser = driver.quit
+
+    def quit_and_checkin():
+        try:
+            quit_browser()
+        finally:
+            store.checkin(path)
+
+    driver.quit = quit_and_checkin
+    driver.profile_path = path
+    return driver
+
+
+def _benchmark(url, rounds=3):
+    """Time to the first page on a throwaway profile and on a reused one"""
+    import tempfile
+    from driver_pool import launch_chrome
+    from page_ready import PageReady
+
+    def first_page(launch):
+        started = time.perf_counter()
+        driver = launch()
+        try:
+            driver.get(url)
+            PageReady().wait(driver)
+            return time.perf_counter() - started
+        finally:
+            driver.quit()
+
+    cold = [first_page(launch_chrome) for _ in range(rounds)]
+    with tempfile.TemporaryDirectory() as root:
+        store = ProfileStore(root)
+        first_page(lambda: launch_with_profile(store, "benchmark"))  # fills the cache
+        warm = [first_page(lambda: launch_with_profile(store, "benchmark")) for _ in range(rounds)]
+        print(f"  profile size {store.size() / 1e6:.1f} MB")
+    print(f"  cold {min(cold):6.2f}s best / {sum(cold) / rounds:6.2f}s mean of {rounds} (launch + first page)")
+    print(f"  warm {min(warm):6.2f}s best / {sum(warm) / rounds:6.2f}s mean of {rounds}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(sys.argv[1] if len(sys.argv) > 1 else "https://mangapark.io/latest",
+               int(sys.argv[2]) if len(sys.argv) > 2 else 3)
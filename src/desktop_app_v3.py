@@ -5,27 +5,39 @@ Complete rewrite with perfect functionality
 
 import sys
 import json
+import asyncio
 import threading
 import time
 import os
 import webbrowser
-import requests
 from pathlib import Path
 from PyQt6.QtWidgets import QApplication, QMainWindow
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWebChannel import QWebChannel
 from PyQt6.QtCore import QObject, pyqtSlot, pyqtSignal, QUrl
-from bs4 import BeautifulSoup
-import xml.etree.ElementTree as ET
-from difflib import SequenceMatcher
 from datetime import datetime
 
-try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
-    SELENIUM_AVAILABLE = True
-except ImportError:
-    SELENIUM_AVAILABLE = False
+from mal_cache import MALCache
+from rate_limiter import jikan_limiter
+from retry_policy import RetryPolicy
+from jikan_client import JikanClient
+from offline_index import load_index
+from page_ready import PageReady
+from driver_pool import DriverPool, SELENIUM_AVAILABLE, launch_chrome
+from browser_profile import ProfileStore, account_id, launch_with_profile
+from follows_parser import extract_links
+from sharded_scraper import ShardedScraper
+from http_engine import AuthError, EngineError, MangaParkHTTPEngine
+from auth_probe import AuthProbe
+from memory_governor import MemoryGovernor
+from network_filter import NetworkFilter, parse_rules
+from session_bootstrap import bootstrap_session
+from mirror_selector import MirrorSelector, is_network_error, site_of
+from page_recorder import PageArchive, ReplayServer, ReplaySession, recording_extract
+from pipeline import Pipeline
+from mal_xml import MALXMLWriter
+from export_journal import ExportJournal
+from library_snapshot import DeltaSync, LibrarySnapshot, session_account, title_key
 
 
 class BackendAPI(QObject):
@@ -52,8 +64,48 @@ class BackendAPI(QObject):
             'exportFormat': 'MAL XML + HTML',
             'requestTimeout': 30,
             'maxRetries': 3,
-            'rateLimit': 2
+            'rateLimit': 2,
+            'malCacheDays': 30,
+            'malDumpPath': '',
+            'scrapeShards': 3,
+            'maxPages': 100,
+            'scrapeEngine': 'auto',  # auto (HTTP, Selenium fallback), http or selenium
+            'linkExtraction': 'script',  # script (in-browser) or soup (page_source + BeautifulSoup)
+            'pipelineDepth': 4,  # pages buffered between scraping, MAL lookups and writing
+            'deltaSync': True,  # stop paging the follows list once it only shows known titles
+            'deltaStopAfter': 40,  # known titles in a row that end paging
+            'fullSyncDays': 7,  # page through the whole list (and spot unfollows) at least this often
+            'deltaXml': True,  # also write a MAL XML with only the titles new since last export
+            'recordPages': '',  # folder to save every fetched page to (off when empty)
+            'replayPages': '',  # folder of recorded pages to scrape instead of MangaPark
+            'browserMemoryMB': 1024,  # restart a browser whose processes use more than this (0 = no limit)
+            'recyclePages': 40,  # restart a browser after this many follows pages (0 = never)
+            'blockResources': 'images,media,fonts,third_party',  # not loaded by the browser (empty = full page loads)
+            'persistentProfile': False,  # keep a Chrome profile per account so scripts and styles are cached on disk
+            'profileMaxMB': 300,  # disk budget of the persistent profiles
+            'mirror': 'auto'  # MangaPark domain: auto (fastest answering mirror) or a base URL to always use
         }
+        
+        # MAL lookups persist across exports
+        self.mal_cache = MALCache(ttl_days=self.export_settings['malCacheDays'])
+        self.mal_limiter = jikan_limiter(self.export_settings['rateLimit'])
+        self.retry_policy = RetryPolicy.from_settings(self.export_settings, self.mal_limiter)
+        self.mal_calls_saved = 0
+        
+        # Page load times are learned across exports
+        self.page_ready = PageReady()
+        self.scrape_stats = {}
+        self.pipeline_counts = {"scraped": 0, "enriched": 0}
+        
+        # Mirror probes are reused for a few minutes
+        self.mirrors = MirrorSelector()
+        
+        # Browsers run on a throwaway profile until an export picks an account's
+        self.profile_store = ProfileStore()
+        self.profile_account = None
+        # Headless Chrome is launched by the first export that needs a browser
+        # (the HTTP engine usually doesn't) and reused until it idles out
+        self.driver_pool = DriverPool(size=1, factory=self._launch_browser)
     
     @pyqtSlot(str, result=str)
     def start_export(self, config_json):
@@ -61,18 +113,22 @@ class BackendAPI(QObject):
         if self.is_running:
             return json.dumps({"status": "error", "message": "Export already running"})
         
-        if not SELENIUM_AVAILABLE:
-            return json.dumps({"status": "error", "message": "Selenium not installed"})
-        
         try:
             config = json.loads(config_json)
             mode = config.get('mode', 'authenticated')
             cookies = config.get('cookies', {})
+            # Continue an interrupted export from its journal
+            resume = bool(config.get('resume', False))
             
             # Update export settings from config
             if 'settings' in config:
                 self.export_settings.update(config['settings'])
             
+            # The HTTP engine only covers the follows list
+            needs_browser = mode != 'authenticated' or self.export_settings.get('scrapeEngine') == 'selenium'
+            if needs_browser and not SELENIUM_AVAILABLE:
+                return json.dumps({"status": "error", "message": "Selenium not installed"})
+            
             # Update output directory if provided
             if 'outputDirectory' in config:
                 custom_output = config['outputDirectory']
@@ -86,7 +142,7 @@ class BackendAPI(QObject):
             
             # Start export thread
             self.is_running = True
-            thread = threading.Thread(target=self._export_worker, args=(mode, cookies), daemon=True)
+            thread = threading.Thread(target=self._export_worker, args=(mode, cookies, resume), daemon=True)
             thread.start()
             
             return json.dumps({"status": "started", "mode": mode})
@@ -94,52 +150,188 @@ class BackendAPI(QObject):
         except Exception as e:
             return json.dumps({"status": "error", "message": str(e)})
     
-    def _export_worker(self, mode, cookies):
+    def _export_worker(self, mode, cookies, resume=False):
         """Worker thread for export"""
+        xml_writer = None
+        journal = None
         try:
-            # Step 1: Scraping (0-25%)
             self._emit_log(0, 1, f"Starting {mode} mode export...", "info")
-            self._emit_log(0, 1, "Initializing Chrome browser...", "info")
             
-            manga_list = self._scrape_mangapark(mode, cookies)
+            self.page_ready.reset_stats()
+            self.scrape_stats = {}
+            self.pipeline_counts = {"scraped": 0, "enriched": 0}
+            self.mal_calls_saved = 0
+            self.mal_cache.ttl = self.export_settings.get('malCacheDays', 30) * 86400
+            self.mal_cache.reset_stats()
+            self.mal_limiter = jikan_limiter(self.export_settings.get('rateLimit'))
+            self.mal_limiter.reset_stats()
+            self.retry_policy = RetryPolicy.from_settings(self.export_settings, self.mal_limiter)
+            
+            os.makedirs(self.output_dir, exist_ok=True)
+            
+            # Pages and MAL results are journaled as they complete
+            journal = ExportJournal(self.output_dir)
+            state = journal.replay(mode) if resume else None
+            if state:
+                journal.reopen()
+                self._emit_log(0, 1, f"♻️ Resuming: {len(state['scraped'])} titles scraped, {len(state['resolved'])} already on MAL", "info")
+            else:
+                if resume:
+                    self._emit_log(0, 1, "No unfinished export to resume, starting over", "info")
+                journal.start(mode)
+                state = {"scraped": [], "last_page": {}, "scrape_done": False, "resolved": {}}
+            
+            # Delta sync against the follows list of the previous export
+            delta = None
+            if mode == 'authenticated':
+                # One snapshot per account: another account's library is not a baseline
+                snapshot = LibrarySnapshot(self.output_dir, session_account(cookies)).load()
+                age = snapshot.full_scan_age_days()
+                early_stop = (self.export_settings.get('deltaSync', True) and age is not None
+                              and age < float(self.export_settings.get('fullSyncDays', 7)))
+                delta = DeltaSync(snapshot, int(self.export_settings.get('deltaStopAfter', 40)), early_stop)
+                if delta.early_stop:
+                    self._emit_log(0, 1, f"🔄 Delta sync against {len(snapshot)} known titles", "info")
+                elif len(snapshot):
+                    self._emit_log(0, 1, f"🔄 Full scan of your follows ({len(snapshot)} known titles)", "info")
+            
+            export_format = self.export_settings.get('exportFormat', 'MAL XML + HTML')
+            include_unmatched = self.export_settings.get('includeUnmatched', True)
+            xml_path = None
+            html_path = None
+            json_path = None
+            if export_format in ['MAL XML + HTML', 'MAL XML Only']:
+                xml_path = os.path.join(self.output_dir, "mangapark_to_mal.xml")
+                xml_writer = MALXMLWriter(xml_path)
+            
+            # Steps 1-2 (0-60%): scraping, MAL lookups and XML writing run
+            # concurrently, titles of page 1 are looked up while page 2 loads
+            # One record per MangaPark title ID
+            seen = set(title_key(m) for m in state["scraped"])
+            enriched_list = []
+            library = []
+            filtered = [0]
+            
+            def scrape(emit):
+                def on_records(records, page, engine):
+                    # An HTTP run that failed halfway is redone on the browser
+                    new = [m for m in records if title_key(m) not in seen]
+                    seen.update(title_key(m) for m in new)
+                    journal.page(page, engine, new)
+                    self.pipeline_counts["scraped"] += len(new)
+                    emit(new)
+                    # True ends paging
+                    return delta.observe(new) if delta else False
+                
+                # Journaled titles go first, the scrape continues after the last journaled page
+                scraped = state["scraped"]
+                self.pipeline_counts["scraped"] = len(scraped)
+                for i in range(0, len(scraped), 50):
+                    emit(scraped[i:i + 50])
+                stop = delta.observe(scraped) if delta else False
+                if not state["scrape_done"] and not stop:
+                    self._scrape_mangapark(mode, cookies, on_records=on_records, resume_pages=state["last_page"])
+                    journal.scrape_done()
+                if self.pipeline_counts["scraped"]:
+                    self._emit_log(25, 1, f"✅ Found {self.pipeline_counts['scraped']} manga", "success")
+            
+            def enrich(batch):
+                # Titles resolved before the interruption or known from the
+                # previous export skip the lookup
+                reused = {}
+                for manga in batch:
+                    key = title_key(manga)
+                    record = state["resolved"].get(key) or (delta.prior(manga) if delta else None)
+                    if record:
+                        reused[key] = record
+                todo = [m for m in batch if title_key(m) not in reused]
+                fresh = {}
+                if todo:
+                    enriched = self._enrich_with_mal(todo)
+                    if enriched:
+                        journal.resolved(enriched)
+                    fresh = {title_key(m): m for m in enriched}
+                self.pipeline_counts["enriched"] += len(batch) - len(todo)
+                records = []
+                for manga in batch:
+                    key = title_key(manga)
+                    record = reused.get(key) or fresh.get(key)
+                    if record:
+                        records.append(record)
+                return records
             
-            if not manga_list:
+            def write(batch):
+                for manga in batch:
+                    library.append(manga)
+                    if not include_unmatched and manga['mal_id'] == '0':
+                        filtered[0] += 1
+                        continue
+                    enriched_list.append(manga)
+                    if xml_writer:
+                        xml_writer.add(manga)
+            
+            pipeline = Pipeline(
+                ("scrape", scrape),
+                [("enrich", enrich), ("write", write)],
+                depth=max(1, int(self.export_settings.get('pipelineDepth', 4)))
+            )
+            pipeline_stats = pipeline.run()
+            
+            if not self.pipeline_counts["scraped"]:
                 self._emit_log(0, 1, "No manga found!", "error")
-                self.is_running = False
                 return
             
-            self._emit_log(25, 1, f"✅ Found {len(manga_list)} manga", "success")
+            if self.scrape_stats.get("duplicates"):
+                self._emit_log(60, 1, f"🧹 {self.scrape_stats['duplicates']} duplicate and chapter links collapsed onto their series", "info")
             
-            # Step 2: Enriching (25-60%)
-            self._emit_log(25, 2, "Searching MAL database for IDs...", "info")
-            enriched_list = self._enrich_with_mal(manga_list)
+            removed = []
+            if delta:
+                # Removals are only known when paging reached the last page
+                delta.scrape_finished(self.scrape_stats.get("reached_end"))
+                # The rest of the list is unchanged since the snapshot
+                carried = delta.carried_over()
+                if carried:
+                    if delta.stopped_early:
+                        self._emit_log(60, 1, f"⏭️ Stopped paging after {delta.known_run} known titles, {len(carried)} carried over", "info")
+                    else:
+                        self._emit_log(60, 1, f"📄 Page limit reached, {len(carried)} titles carried over from the last export", "info")
+                    write(carried)
+                removed = delta.removed()
+                if delta.known:
+                    self._emit_log(60, 1, f"🆕 {len(delta.added)} new, {len(removed)} unfollowed since last export", "info")
+                for manga in removed[:20]:
+                    self._emit_log(60, 1, f"➖ Unfollowed: {manga['title'][:50]}", "info")
             
-            # Filter unmatched if setting disabled
-            if not self.export_settings.get('includeUnmatched', True):
-                original_count = len(enriched_list)
-                enriched_list = [m for m in enriched_list if m['mal_id'] != '0']
-                filtered = original_count - len(enriched_list)
-                if filtered > 0:
-                    self._emit_log(58, 2, f"⚠️ Filtered out {filtered} unmatched manga", "info")
+            cache_stats = self.mal_cache.stats()
+            retry_stats = self.retry_policy.stats()
+            if retry_stats['retries']:
+                self._emit_log(60, 2, f"🔁 {retry_stats['retries']} MAL retries ({retry_stats['throttled']} rate-limited, {retry_stats['requeued']} requeued)", "info")
+            if cache_stats['cache_hits']:
+                self._emit_log(60, 2, f"⚡ {cache_stats['cache_hits']} MAL lookups served from cache ({cache_stats['cache_hit_rate']:.0%})", "info")
+            if self.mal_calls_saved:
+                self._emit_log(60, 2, f"🔗 {self.mal_calls_saved} duplicate titles shared a lookup", "info")
+            if filtered[0]:
+                self._emit_log(60, 2, f"⚠️ Filtered out {filtered[0]} unmatched manga", "info")
             
             found = sum(1 for m in enriched_list if m['mal_id'] != '0')
             self._emit_log(60, 2, f"✅ Matched {found}/{len(enriched_list)} manga on MAL", "success")
+            self._emit_log(60, 2, f"⏱️ Pipeline {pipeline_stats['wall_seconds']:.1f}s (stages {pipeline_stats['serial_seconds']:.1f}s run back to back)", "info")
             
             # Step 3: Generating Files (60-80%)
-            os.makedirs(self.output_dir, exist_ok=True)
-            
-            export_format = self.export_settings.get('exportFormat', 'MAL XML + HTML')
-            xml_path = None
-            html_path = None
-            json_path = None
-            
-            # Generate files based on format setting
-            if export_format in ['MAL XML + HTML', 'MAL XML Only']:
+            if xml_writer:
                 self._emit_log(60, 3, "Generating MAL XML export...", "info")
-                xml_path = os.path.join(self.output_dir, "mangapark_to_mal.xml")
-                self._generate_mal_xml(enriched_list, xml_path)
+                xml_writer.close()
+                xml_writer = None
                 self._emit_log(70, 3, "✅ XML file created", "success")
             
+            delta_xml_path = None
+            if xml_path and delta and delta.known and self.export_settings.get('deltaXml', True):
+                new_titles = [m for m in library if delta.is_new(m)]
+                delta_xml_path = os.path.join(self.output_dir, "mangapark_to_mal_delta.xml")
+                self._generate_mal_xml(new_titles, delta_xml_path)
+                self._emit_log(70, 3, f"✅ Delta XML with {len(new_titles)} new titles created", "success")
+            
+            # HTML and JSON carry totals and a sorted list, so they are written at the end
             if export_format in ['MAL XML + HTML', 'HTML Only']:
                 self._emit_log(70, 3, "Generating HTML visualization...", "info")
                 html_path = os.path.join(self.output_dir, "manga_list.html")
@@ -154,6 +346,8 @@ class BackendAPI(QObject):
             
             # Step 4: Complete (80-100%)
             self._emit_log(90, 4, "Saving files...", "info")
+            if delta:
+                delta.snapshot.save(library, full_scan=delta.complete)
             self._emit_log(100, 4, "🎉 Export completed successfully!", "success")
             
             # Emit completion
@@ -166,214 +360,414 @@ class BackendAPI(QObject):
                 "json_path": json_path if json_path else "",
                 "format": export_format
             }
+            result.update(cache_stats)
+            result["retry_stats"] = retry_stats
+            result["mal_calls_saved"] = self.mal_calls_saved
+            result["page_ready"] = self.page_ready.stats()
+            result["scrape_stats"] = self.scrape_stats
+            result["pipeline_stats"] = pipeline_stats
+            result["peak_rss_mb"] = self.scrape_stats.get("memory", {}).get("peak_rss_mb")
+            result["mirror"] = self.mirrors.stats()
+            result["resumed"] = bool(state["scraped"] or state["resolved"])
+            if delta:
+                result["delta"] = {
+                    "known": delta.known,
+                    "added": len(delta.added),
+                    "removed": [{"title": m["title"], "url": m["url"]} for m in removed],
+                    "stopped_early": delta.stopped_early,
+                    "delta_xml_path": delta_xml_path or ""
+                }
+            journal.complete()
             self.exportComplete.emit(result)
             
+        except AuthError as e:
+            self._emit_log(0, 1, f"🔒 {e}", "error")
         except Exception as e:
             self._emit_log(0, 0, f"❌ Error: {str(e)}", "error")
             import traceback
             traceback.print_exc()
         finally:
+            if xml_writer:
+                xml_writer.abort()
+            if journal:
+                journal.close()
             self.is_running = False
     
-    def _scrape_mangapark(self, mode, cookies):
-        """Scrape MangaPark for manga list"""
-        self._emit_log(5, 1, "Starting browser...", "info")
-        
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--log-level=3")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
-        
-        driver = webdriver.Chrome(options=options)
-        results = []
-        seen = set()
+    def _scrape_mangapark(self, mode, cookies, on_records=None, resume_pages=None):
+        """
+        Scrape MangaPark for manga list
+        
+        Args:
+            on_records: Optional callback(records, page, engine) receiving titles as pages come in
+            resume_pages: Engine -> last page already scraped
+        """
+        if mode == 'authenticated':
+            return self._scrape_follows(cookies, on_records, resume_pages or {})
         
+        self._select_profile(cookies)
+        if self.driver_pool.idle_count():
+            self._emit_log(5, 1, "Reusing warm browser...", "info")
+        else:
+            self._emit_log(5, 1, "Starting browser...", "info")
+        
+        replay = self._page_archive('replayPages')
+        record = self._page_archive('recordPages')
+        server = ReplayServer(replay).start() if replay else None
+        base_url = server.base_url if server else self._site_url()
+        
+        governor = self._memory_governor()
+        net_filter = self._network_filter()
+        driver = self.driver_pool.acquire()
         try:
-            if mode == 'authenticated':
-                # Authenticated mode
-                self._emit_log(10, 1, "Loading your follows list...", "info")
-                driver.get("https://mangapark.io/my/follows")
-                
-                # Add cookies
-                for name, value in cookies.items():
-                    if value:
-                        driver.add_cookie({"name": name, "value": value, "domain": ".mangapark.io"})
-                
-                driver.refresh()
-                time.sleep(3)
-                
-                page = 1
-                while page <= 10:  # Max 10 pages
-                    progress = 10 + (page * 1)
-                    self._emit_log(progress, 1, f"Scraping page {page}...", "info")
-                    
-                    url = f"https://mangapark.io/my/follows?page={page}"
-                    driver.get(url)
-                    time.sleep(4)
-                    
-                    soup = BeautifulSoup(driver.page_source, "html.parser")
-                    links = soup.select("a[href*='/title/']")
-                    
-                    count = 0
-                    for a in links:
-                        href = a.get("href", "")
-                        title = a.get_text(strip=True)
-                        
-                        if not title or "/title/" not in href:
-                            continue
-                        
-                        full_url = href if href.startswith("http") else "https://mangapark.io" + href
-                        key = (title, full_url)
-                        
-                        if key not in seen:
-                            seen.add(key)
-                            results.append({"title": title, "url": full_url})
-                            count += 1
-                    
-                    if count == 0:
-                        break
-                    
-                    page += 1
-                    
-            else:
-                # Public mode
-                self._emit_log(10, 1, "Loading latest manga...", "info")
-                driver.get("https://mangapark.io/latest")
-                time.sleep(3)
-                
-                # Scroll to load more
-                for i in range(5):
-                    progress = 10 + (i * 2)
-                    self._emit_log(progress, 1, f"Loading content ({i+1}/5)...", "info")
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(2)
-                
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-                links = soup.select("a[href*='/title/']")
-                
-                for a in links:
-                    href = a.get("href", "")
-                    title = a.get_text(strip=True)
-                    
-                    if not title or "/title/" not in href:
-                        continue
-                    
-                    full_url = href if href.startswith("http") else "https://mangapark.io" + href
-                    key = (title, full_url)
-                    
-                    if key not in seen:
-                        seen.add(key)
-                        results.append({"title": title, "url": full_url})
+            net_filter.apply(driver)
+            # Public mode
+            self._emit_log(10, 1, "Loading latest manga...", "info")
+            driver.get(f"{base_url}/latest")
+            self.page_ready.wait(driver)
+            
+            # Scroll to load more
+            for i in range(5):
+                progress = 10 + (i * 2)
+                self._emit_log(progress, 1, f"Loading content ({i+1}/5)...", "info")
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                # Lazy-loaded cards are in once the DOM settles again
+                self.page_ready.wait(driver)
+                governor.page_loaded(driver)
+                if governor.over_memory(driver):
+                    # A restart would lose the scrolled-in cards, keep what is loaded
+                    self._emit_log(progress, 1, "⚠️ Browser memory limit reached, stopping the scroll", "info")
+                    break
             
+            if record:
+                record.record(f"{base_url}/latest", driver.page_source)
+            link_stats = {}
+            extract = lambda driver: extract_links(driver, base_url=base_url, mode=self.export_settings.get('linkExtraction', 'script'), stats=link_stats)
+            links = net_filter.wrap(extract, self.page_ready)(driver)
+            results = [{"title": title, "url": url} for title, url in links]
+            self.scrape_stats = {
+                "engine": "public",
+                "duplicates": link_stats.get("duplicates", 0),
+                "memory": governor.stats(),
+                "network": net_filter.stats()
+            }
+            self._log_network(20, self.scrape_stats["network"])
+            
+            if on_records:
+                on_records(results, 1, "public")
             return results
             
         finally:
-            driver.quit()
+            # Cookies and storage are wiped before the browser goes back to the pool
+            if governor.over_memory(driver):
+                governor.recycled(driver)
+                self.driver_pool.discard(driver)
+            else:
+                self.driver_pool.release(driver)
+            if server:
+                server.stop()
+    
+    def _site_url(self):
+        """Base URL of the MangaPark mirror to scrape (the fastest one, unless pinned by the mirror setting)"""
+        setting = self.export_settings.get('mirror', 'auto')
+        self.mirrors.pin(None if setting in ('', 'auto') else setting)
+        site = self.mirrors.select()
+        if not self.mirrors.pinned:
+            results = self.mirrors.results()
+            up = [r for r in results.values() if r["ok"]]
+            latency = results.get(site, {}).get("latency")
+            timing = f"{latency * 1000:.0f} ms, " if latency is not None else ""
+            self._emit_log(5, 1, f"🌐 Using {site.split('://', 1)[1]} ({timing}{len(up)}/{len(results)} mirrors up)", "info")
+        return site
+    
+    def _mirror_failover(self, url, error):
+        """ShardedScraper on_error: move to the next mirror when a page load timed out"""
+        if not is_network_error(error):
+            return False
+        failed = site_of(url)
+        site = self.mirrors.failover(failed)
+        if site == failed:
+            return False
+        self._emit_log(12, 1, f"🌐 {failed} is not responding, switching to {site}", "info")
+        return True
+    
+    def _launch_browser(self):
+        """Pool factory: Chrome on the current account's persistent profile, if enabled"""
+        # Network events are logged for per-page transfer stats
+        if self.profile_account:
+            shards = max(1, int(self.export_settings.get('scrapeShards', 3)))
+            return launch_with_profile(self.profile_store, self.profile_account, network_log=True, slots=shards)
+        return launch_chrome(network_log=True)
+    
+    def _select_profile(self, cookies):
+        """Point new browsers at the account's persistent profile (persistentProfile setting)"""
+        account = account_id(cookies) if self.export_settings.get('persistentProfile') else None
+        if account != self.profile_account:
+            # Warm browsers were launched on another profile
+            self.profile_account = account
+            self.driver_pool.clear_idle()
+        if account:
+            self.profile_store.max_bytes = int(self.export_settings.get('profileMaxMB', 300)) * 1024 * 1024
+            freed = self.profile_store.prune()
+            if freed:
+                self._emit_log(5, 1, f"🗂️ Pruned {freed / 1024 / 1024:.0f} MB of browser profiles", "info")
+    
+    def _memory_governor(self):
+        """MemoryGovernor with the browserMemoryMB/recyclePages settings"""
+        return MemoryGovernor(
+            max_rss_mb=int(self.export_settings.get('browserMemoryMB', 1024)),
+            max_pages=int(self.export_settings.get('recyclePages', 40))
+        )
+    
+    def _network_filter(self):
+        """NetworkFilter with the blockResources setting"""
+        return NetworkFilter(parse_rules(self.export_settings.get('blockResources', '')))
+    
+    def _log_network(self, percent, network):
+        """Blocked requests and transfer per page of a browser scrape"""
+        if network["fell_back"]:
+            self._emit_log(percent, 1, "⚠️ Links were missing with resources blocked, pages were loaded in full", "info")
+        if network["pages"]:
+            self._emit_log(percent, 1, f"🚫 {network['blocked']} requests blocked, {network['bytes_per_page'] / 1024:.0f} KB transferred per page", "info")
+    
+    def _page_archive(self, setting):
+        """PageArchive of the recordPages/replayPages folder, None when the setting is empty"""
+        path = self.export_settings.get(setting)
+        return PageArchive(path) if path else None
+    
+    def _scrape_follows(self, cookies, on_records=None, resume_pages=None):
+        """Scrape the follows list over HTTP, falling back to the browser path"""
+        resume_pages = resume_pages or {}
+        def tagged(engine):
+            # Page sizes differ between engines, so resume points are kept per engine
+            if on_records is None:
+                return None
+            return lambda records, page: on_records(records, page, engine)
+        
+        engine = self.export_settings.get('scrapeEngine', 'auto')
+        if engine != 'selenium':
+            try:
+                return self._scrape_follows_http(cookies, tagged("http"), resume_pages.get("http", 0) + 1)
+            except AuthError:
+                # A browser with the same cookies would not be logged in either
+                raise
+            except EngineError as e:
+                if not SELENIUM_AVAILABLE:
+                    raise
+                self._emit_log(8, 1, f"⚠️ HTTP engine failed ({e}), falling back to browser", "info")
+        return self._scrape_follows_browser(cookies, tagged("selenium"), resume_pages.get("selenium", 0) + 1)
+    
+    def _scrape_follows_http(self, cookies, on_records=None, start_page=1):
+        """Page through the follows list without a browser"""
+        self._emit_log(5, 1, "Fetching your follows list (no browser)...", "info")
+        
+        def on_page(page, count, total):
+            progress = min(24, 10 + page // 4)
+            of_total = f"/{total}" if total else ""
+            self._emit_log(progress, 1, f"Page {page}{of_total}: {count} titles", "info")
+        
+        replay = self._page_archive('replayPages')
+        site = self.mirrors.current if replay else self._site_url()
+        started = time.monotonic()
+        http = MangaParkHTTPEngine(
+            cookies,
+            base_url=site,
+            session=ReplaySession(replay) if replay else None,
+            timeout=float(self.export_settings.get('requestTimeout', 30)),
+            max_pages=int(self.export_settings.get('maxPages', 100)),
+            archive=self._page_archive('recordPages'),
+            mirrors=None if replay else self.mirrors
+        )
+        results = http.scrape(on_page=on_page, on_records=on_records, start_page=start_page)
+        if not results and start_page == 1:
+            # A changed response shape parses to nothing rather than failing
+            raise EngineError("no titles in the response")
+        elapsed = time.monotonic() - started
+        self.scrape_stats = {
+            "engine": "http",
+            "requests": http.requests,
+            "wall_seconds": round(elapsed, 2),
+            "duplicates": http.duplicates,
+            "reached_end": http.reached_end
+        }
+        self._emit_log(24, 1, f"⏱️ {http.requests} requests in {elapsed:.1f}s", "info")
+        if http.base_url != site:
+            self._emit_log(24, 1, f"🌐 {site} stopped responding, finished on {http.base_url}", "info")
+        return results
+    
+    def _scrape_follows_browser(self, cookies, on_records=None, start_page=1):
+        """Scrape the follows list, spreading pages over several browsers"""
+        shards = max(1, int(self.export_settings.get('scrapeShards', 3)))
+        max_pages = int(self.export_settings.get('maxPages', 100))
+        pool_size = self.driver_pool.size
+        self.driver_pool.size = max(pool_size, shards)
+        
+        replay = self._page_archive('replayPages')
+        record = self._page_archive('recordPages')
+        
+        # Cookies are checked over HTTP while Chrome starts
+        timeout = float(self.export_settings.get('requestTimeout', 30))
+        probe = None if replay else AuthProbe(cookies, base_url=self._site_url(), timeout=min(5, timeout))
+        
+        self._select_profile(cookies)
+        if self.driver_pool.idle_count():
+            self._emit_log(5, 1, "Reusing warm browser...", "info")
+        else:
+            self._emit_log(5, 1, "Starting browser...", "info")
+        
+        # Browsers launch in the background; bad cookies abort before any page load
+        self.driver_pool.warm()
+        try:
+            checked = probe is not None and probe.check()
+        except Exception:
+            self.driver_pool.resize(pool_size)
+            raise
+        if checked:
+            self._emit_log(8, 1, f"🔑 Session checked in {probe.seconds:.1f}s", "info")
+        
+        # Recorded pages are served by a local stand-in instead of MangaPark
+        server = ReplayServer(replay).start() if replay else None
+        if server:
+            page_url = server.base_url + "/my/follows?page={page}"
+        else:
+            # Read on every load, so a mirror failover applies to the next page
+            page_url = lambda page: f"{self.mirrors.current}/my/follows?page={page}"
+        
+        net_filter = self._network_filter()
+        
+        def prepare(driver):
+            # Blocking and cookies are set up before the first load of each
+            # browser, so its first page is already logged in
+            net_filter.apply(driver)
+            # A mirror that hangs fails the load instead of stalling the shard
+            driver.set_page_load_timeout(timeout)
+            if not server:
+                # Every mirror gets the cookies: a failover keeps the session
+                bootstrap_session(driver, cookies, self.mirrors.current, mirrors=self.mirrors.mirrors)
+        
+        def on_page(page, count, elapsed, shard):
+            progress = min(24, 10 + page // 4)
+            self._emit_log(progress, 1, f"Page {page}: {count} links in {elapsed:.2f}s (browser {shard + 1})", "info")
+        
+        self._emit_log(10, 1, "Loading your follows list...", "info")
+        link_stats = {}
+        # Links resolve against the mirror (or replay server) the page came from
+        site = lambda: server.base_url if server else self.mirrors.current
+        extract = lambda driver: extract_links(driver, base_url=site(), mode=self.export_settings.get('linkExtraction', 'script'), stats=link_stats)
+        if record:
+            extract = recording_extract(record, extract)
+        extract = net_filter.wrap(extract, self.page_ready)
+        scraper = ShardedScraper(
+            self.driver_pool,
+            prepare,
+            extract,
+            page_url,
+            shards=shards,
+            max_pages=max_pages,
+            page_ready=self.page_ready,
+            on_page=on_page,
+            on_records=on_records,
+            start_page=start_page,
+            governor=self._memory_governor(),
+            on_error=None if server else self._mirror_failover
+        )
+        try:
+            results, self.scrape_stats = scraper.scrape()
+        finally:
+            if server:
+                server.stop()
+            # The extra shard browsers are quit, one stays warm for the next export
+            self.driver_pool.resize(pool_size)
+        self.scrape_stats["engine"] = "selenium"
+        self.scrape_stats["duplicates"] += link_stats.get("duplicates", 0)
+        self.scrape_stats["network"] = net_filter.stats()
+        self.scrape_stats["profile"] = "persistent" if self.profile_account else "throwaway"
+        
+        stats = self.scrape_stats
+        self._emit_log(24, 1, f"⏱️ {stats['pages']} pages on {stats['shards']} browsers in {stats['wall_seconds']:.1f}s (serial {stats['serial_seconds']:.1f}s, {stats['speedup']:.1f}x)", "info")
+        self._log_network(24, stats["network"])
+        self._emit_log(24, 1, f"🗂️ First page in {stats['first_page_seconds']:.1f}s ({stats['profile']} browser profile)", "info")
+        memory = stats["memory"]
+        if memory["peak_rss_mb"] is not None or memory["recycles"]:
+            peak = f"peaked at {memory['peak_rss_mb']:.0f} MB" if memory["peak_rss_mb"] is not None else "not measured"
+            self._emit_log(24, 1, f"🧠 Browser memory {peak}, {memory['recycles']} browser restarts", "info")
+        return results
     
     def _enrich_with_mal(self, manga_list):
-        """Enrich manga list with MAL IDs"""
-        enriched = []
-        total = len(manga_list)
-        found_count = 0
-        
-        for idx, manga in enumerate(manga_list, 1):
-            title = manga["title"]
-            
-            # Skip chapter titles
-            if title.lower().startswith(("chapter", "ch.", "vol.")):
-                continue
-            
-            # Progress calculation
-            progress = 25 + int((idx / total) * 35)
-            self._emit_log(progress, 2, f"[{idx}/{total}] {title[:50]}...", "info")
-            
-            mal_id, mal_title, score = self._search_mal(title)
-            
-            if mal_id:
-                enriched.append({
-                    "title": title,
-                    "url": manga["url"],
-                    "mal_id": mal_id,
-                    "mal_title": mal_title,
-                    "score": score
-                })
-                found_count += 1
+        """Enrich manga list with MAL IDs (called once per scraped batch)"""
+        # Chapter links were collapsed onto their series at extraction, so
+        # every entry is a distinct series
+        titles = [m["title"] for m in manga_list]
+        total = len(titles)
+        matches = [(None, None, 0)] * total
+        counts = self.pipeline_counts
+        
+        # Offline dump first: confident matches need no network call
+        online = list(range(total))
+        dump_path = self.export_settings.get('malDumpPath')
+        if dump_path:
+            if os.path.exists(dump_path):
+                index = load_index(dump_path)
+                online = []
+                for i, title in enumerate(titles):
+                    match = index.resolve(title)
+                    if match[0]:
+                        matches[i] = match
+                    else:
+                        online.append(i)
+                counts["enriched"] += total - len(online)
+                self._emit_log(self._enrich_progress(), 2, f"📚 Resolved {total - len(online)}/{total} offline ({len(index)} titles in dump)", "info")
             else:
-                enriched.append({
-                    "title": title,
-                    "url": manga["url"],
-                    "mal_id": "0",
-                    "mal_title": "",
-                    "score": 0
-                })
-            
-            time.sleep(1)  # Rate limit
+                self._emit_log(25, 2, f"⚠️ MAL dump not found: {dump_path}", "info")
+        
+        def on_result(index, title, match):
+            counts["enriched"] += 1
+            self._emit_log(self._enrich_progress(), 2, f"[{counts['enriched']}/{counts['scraped']}] {title[:50]}...", "info")
+        
+        if online:
+            # Lookups overlap on one pooled connection; throttled titles are requeued by the client
+            client = JikanClient(
+                cache=self.mal_cache,
+                retry_policy=self.retry_policy,
+                max_in_flight=self.mal_limiter.per_second or 1
+            )
+            resolved = asyncio.run(client.resolve_many([titles[i] for i in online], on_result=on_result))
+            for i, match in zip(online, resolved):
+                matches[i] = match
+            self.mal_calls_saved += client.calls_saved
         
-        return enriched
+        return [self._mal_record(manga, *match) for manga, match in zip(manga_list, matches)]
     
-    def _search_mal(self, title):
-        """Search MAL for manga"""
-        try:
-            url = "https://api.jikan.moe/v4/manga"
-            params = {"q": title, "limit": 5}
-            resp = requests.get(url, params=params, timeout=10)
-            
-            if resp.status_code == 429:
-                time.sleep(2)
-                return None, None, 0
-            
-            if resp.status_code != 200:
-                return None, None, 0
-            
-            data = resp.json()
-            results = data.get("data", [])
-            
-            if not results:
-                return None, None, 0
-            
-            best_match = None
-            best_score = 0
-            
-            for manga in results:
-                mal_title = manga.get("title", "")
-                ratio = SequenceMatcher(None, title.lower(), mal_title.lower()).ratio()
-                
-                if ratio > best_score:
-                    best_score = ratio
-                    best_match = manga
-            
-            if best_match and best_score > 0.6:
-                return str(best_match["mal_id"]), best_match["title"], best_score
-            
-            return None, None, 0
-            
-        except:
-            return None, None, 0
+    def _enrich_progress(self):
+        """25-60% band, against the titles scraped so far (never moves backwards)"""
+        counts = self.pipeline_counts
+        progress = 25 + int((counts["enriched"] / max(counts["scraped"], 1)) * 35)
+        counts["progress"] = max(counts.get("progress", 25), progress)
+        return counts["progress"]
+    
+    def _mal_record(self, manga, mal_id, mal_title, score):
+        """Build an enriched manga entry (mal_id "0" when unmatched)"""
+        if mal_id:
+            return {
+                "title": manga["title"],
+                "url": manga["url"],
+                "mal_id": mal_id,
+                "mal_title": mal_title,
+                "score": score
+            }
+        return {
+            "title": manga["title"],
+            "url": manga["url"],
+            "mal_id": "0",
+            "mal_title": "",
+            "score": 0
+        }
     
     def _generate_mal_xml(self, manga_list, output_path):
         """Generate MAL XML export"""
-        root = ET.Element("myanimelist")
-        
-        myinfo = ET.SubElement(root, "myinfo")
-        ET.SubElement(myinfo, "user_name").text = "mangapark_export"
-        ET.SubElement(myinfo, "user_export_type").text = "2"
-        ET.SubElement(myinfo, "user_total_manga").text = str(len(manga_list))
-        
+        writer = MALXMLWriter(output_path)
         for m in manga_list:
-            if m["mal_id"] != "0":
-                entry = ET.SubElement(root, "manga")
-                ET.SubElement(entry, "manga_mangadb_id").text = m["mal_id"]
-                ET.SubElement(entry, "manga_title").text = m["title"]
-                ET.SubElement(entry, "my_status").text = "Plan to Read"
-        
-        tree = ET.ElementTree(root)
-        tree.write(output_path, encoding="utf-8", xml_declaration=True)
+            writer.add(m)
+        writer.close()
     
     def _generate_html(self, manga_list, output_path):
         """Generate HTML visualization"""
@@ -919,6 +1313,7 @@ def main():
     
     window = MainWindow()
     window.show()
+    app.aboutToQuit.connect(window.api.driver_pool.close)
     
     sys.exit(app.exec())
 
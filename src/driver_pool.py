@@ -0,0 +1,263 @@
+"""
+Chrome WebDriver pool
+Keeps headless browsers warm between exports, resetting session state between jobs
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    SELENIUM_AVAILABLE = True
+except ImportError:
+    SELENIUM_AVAILABLE = False
+
+
+def chrome_options(headless=True, network_log=False):
+    """
+    Chrome options shared by every scraper
+
+    Args:
+        network_log: Keep DevTools network events in the performance log
+            (read by NetworkFilter for per-page transfer stats)
+    """
+    options = Options()
+    if headless:
+        options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--log-level=3")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    if network_log:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    return options
+
+
+def launch_chrome(network_log=False):
+    """Start a headless Chrome with the shared options"""
+    return webdriver.Chrome(options=chrome_options(network_log=network_log))
+
+
+class DriverPool:
+    """
+    Pool of pre-launched browsers
+
+    Drivers are health-checked on checkout and reset on return (cookies,
+    storage, extra tabs). The HTTP cache is kept so repeat exports reuse
+    static assets. Drivers idle longer than idle_timeout are quit, not
+    replaced: the next acquire() launches a browser when one is needed.
+    """
+
+    def __init__(self, size=1, idle_timeout=600, factory=launch_chrome):
+        """
+        Args:
+            size: Browsers kept warm
+            idle_timeout: Seconds before an idle browser is quit
+            factory: Callable returning a new WebDriver
+        """
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._idle = []  # (driver, last_used)
+        self._launching = 0
+        self._in_use = 0
+        self._closed = False
+        self._reaper = None
+        self.launched = 0
+        self.reused = 0
+        self.recycled = 0
+
+    def warm(self):
+        """Launch browsers up to the pool size in the background"""
+        def fill():
+            while True:
+                with self._lock:
+                    if self._closed or len(self._idle) + self._in_use + self._launching >= self.size:
+                        return
+                    self._launching += 1
+                try:
+                    driver = self._launch()
+                except Exception as e:
+                    print(f"[WARN] Could not pre-launch Chrome: {e}")
+                    driver = None
+                with self._ready:
+                    self._launching -= 1
+                    self._ready.notify_all()
+                if driver is None:
+                    return
+                self._put(driver)
+
+        threading.Thread(target=fill, daemon=True).start()
+        self._start_reaper()
+
+    def idle_count(self):
+        with self._lock:
+            return len(self._idle)
+
+    def acquire(self):
+        """Check out a healthy browser, launching one if none is warm"""
+        while True:
+            with self._ready:
+                # A browser being pre-launched is still faster than a new one
+                while not self._idle and self._launching:
+                    self._ready.wait(timeout=60)
+                driver = self._idle.pop()[0] if self._idle else None
+                self._in_use += 1
+            if driver is None:
+                try:
+                    return self._launch()
+                except Exception:
+                    self._checked_in()
+                    raise
+            if self._healthy(driver):
+                with self._lock:
+                    self.reused += 1
+                return driver
+            self._checked_in()
+            self._quit(driver)
+
+    def release(self, driver):
+        """Return a browser to the pool after wiping its session state"""
+        self._checked_in()
+        try:
+            self._reset(driver)
+        except Exception:
+            self._quit(driver)
+            return
+        self._put(driver)
+
+    def discard(self, driver):
+        """Drop a browser that should not be reused"""
+        self._checked_in()
+        self._quit(driver)
+
+    @contextmanager
+    def driver(self):
+        """with pool.driver() as driver: ... (returned to the pool afterwards)"""
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def resize(self, size):
+        """Change the pool size, quitting idle browsers past it"""
+        with self._lock:
+            self.size = size
+            extra, self._idle = self._idle[size:], self._idle[:size]
+        for driver, _ in extra:
+            self._quit(driver)
+
+    def clear_idle(self):
+        """Quit the warm browsers (launched with settings that no longer apply), returns how many"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver, _ in idle:
+            self._quit(driver)
+        return len(idle)
+
+    def close(self):
+        """Quit every pooled browser"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for driver, _ in idle:
+            self._quit(driver)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "launched": self.launched,
+                "reused": self.reused,
+                "recycled": self.recycled,
+                "idle": len(self._idle)
+            }
+
+    def _launch(self):
+        driver = self.factory()
+        with self._lock:
+            self.launched += 1
+        return driver
+
+    def _checked_in(self):
+        with self._lock:
+            self._in_use -= 1
+
+    def _put(self, driver):
+        with self._ready:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append((driver, time.monotonic()))
+                self._ready.notify_all()
+                started = True
+            else:
+                started = False
+        if started:
+            # Idle browsers are reaped even if the pool was never warmed
+            self._start_reaper()
+            return
+        self._quit(driver)
+
+    @staticmethod
+    def _healthy(driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(driver):
+        # Extra tabs opened during the job
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        try:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            pass  # about:blank or a page without storage access
+        # Cookies of every domain, not just the current page's
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        try:
+            # Unread network events would pile up in chromedriver
+            driver.get_log("performance")
+        except Exception:
+            pass  # performance log not enabled
+        driver.get("about:blank")
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _start_reaper(self):
+        def reap():
+            while True:
+                time.sleep(min(60, self.idle_timeout / 2))
+                with self._lock:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    stale = [d for d, used in self._idle if now - used > self.idle_timeout]
+                    self._idle = [(d, used) for d, used in self._idle if now - used <= self.idle_timeout]
+                    self.recycled += len(stale)
+                for driver in stale:
+                    self._quit(driver)
+
+        # Checked and set together: concurrent callers start one reaper
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=reap, daemon=True)
+        self._reaper.start()
@@ -0,0 +1,111 @@
+"""
+Export checkpoint journal
+Append-only JSONL record of scraped pages and resolved titles, replayed to resume a crashed export
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+from follows_parser import link_key
+
+
+JOURNAL_NAME = "export_journal.jsonl"
+
+
+class ExportJournal:
+    """
+    One JSON event per line, flushed to disk as it happens
+
+    Events:
+        start        mode of the export
+        page         new records of a follows page, with the engine that fetched it
+        scrape_done  every page is in
+        resolved     enriched records of a batch of MAL lookups
+        complete     files written, nothing left to resume
+
+    A line cut short by a crash is ignored on replay.
+    """
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, JOURNAL_NAME)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def start(self, mode):
+        """Begin a fresh journal, discarding the previous one"""
+        self.close()
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._write({"event": "start", "mode": mode, "time": datetime.now().isoformat()})
+
+    def reopen(self):
+        """Keep appending to the existing journal (resume)"""
+        self.close()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def page(self, page, engine, records):
+        self._write({"event": "page", "page": page, "engine": engine, "records": records})
+
+    def scrape_done(self):
+        self._write({"event": "scrape_done"})
+
+    def resolved(self, records):
+        self._write({"event": "resolved", "records": records})
+
+    def complete(self):
+        self._write({"event": "complete"})
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _write(self, event):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def replay(self, mode):
+        """
+        State of an unfinished export
+
+        Args:
+            mode: Mode of the export about to resume; another mode's journal is not reused
+
+        Returns:
+            None if there is nothing to resume, else a dict with
+            scraped (records in order), last_page (engine -> last page),
+            scrape_done, resolved (link_key -> enriched record)
+        """
+        if not os.path.exists(self.path):
+            return None
+        state = {"scraped": [], "last_page": {}, "scrape_done": False, "resolved": {}}
+        started = False
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break  # torn last line
+                kind = event.get("event")
+                if kind == "start":
+                    if event.get("mode") != mode:
+                        return None
+                    started = True
+                elif kind == "page":
+                    state["scraped"].extend(event["records"])
+                    engine = event.get("engine")
+                    state["last_page"][engine] = max(state["last_page"].get(engine, 0), event["page"])
+                elif kind == "scrape_done":
+                    state["scrape_done"] = True
+                elif kind == "resolved":
+                    for record in event["records"]:
+                        state["resolved"][link_key(record["url"])] = record
+                elif kind == "complete":
+                    return None
+        return state if started else None
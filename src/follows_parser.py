@@ -0,0 +1,344 @@
+"""
+Follows page parsing
+Extracts (title, url) pairs for the manga links on a rendered MangaPark page
+
+Links are read either in the browser (execute_script, the default) or by
+parsing HTML with the fastest parser backend installed (selectolax, lxml,
+then html.parser).
+
+    python src/follows_parser.py page.html [...]          in-browser vs parser parity
+    python src/follows_parser.py --bench [page.html ...]  pages/s and peak memory per backend
+"""
+
+import re
+
+from bs4 import BeautifulSoup
+
+from page_ready import TITLE_LINK_SELECTOR
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser  # selectolax < 0.3.13, Modest engine
+        SELECTOLAX_AVAILABLE = True
+    except ImportError:
+        SELECTOLAX_AVAILABLE = False
+
+try:
+    import lxml  # noqa: F401 (BeautifulSoup's "lxml" tree builder)
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+# /title/<id>-slug, optionally followed by a chapter path
+_TITLE_PATH = re.compile(r"/title/(\d+)([^/?#]*)(/[^?#]*)?")
+
+
+def parse_title_id(url):
+    """Numeric MangaPark title ID of a /title/<id>-slug URL, None if there is none"""
+    match = _TITLE_PATH.search(url or "")
+    return match.group(1) if match else None
+
+
+def link_key(url):
+    """Dedupe key of a link: its title ID, the URL itself when it has none"""
+    return parse_title_id(url) or url
+
+
+def collapse_links(links, stats=None):
+    """
+    One link per MangaPark title ID, in order of first appearance
+
+    Cover, title and chapter anchors of a series share its ID. The first
+    anchor pointing at the title page itself names the series and its URL
+    is cut to /title/<id>-slug; chapter anchors (/title/<id>-slug/c12...)
+    never name it, so a series only reached through chapter links is
+    dropped.
+
+    Args:
+        links: (title, url) pairs
+        stats: Optional dict whose "duplicates" count is increased by the
+            number of links collapsed or dropped
+
+    Returns:
+        List of (title, url)
+    """
+    order = []
+    named = {}
+    for title, url in links:
+        match = _TITLE_PATH.search(url)
+        key = match.group(1) if match else url
+        if key not in named:
+            order.append(key)
+            named[key] = None
+        if named[key] is None and not (match and match.group(3) not in (None, "/")):
+            named[key] = (title, url[:match.end(2)] if match else url)
+    collapsed = [named[key] for key in order if named[key] is not None]
+    if stats is not None:
+        stats["duplicates"] = stats.get("duplicates", 0) + len(links) - len(collapsed)
+    return collapsed
+
+
+class SoupBackend:
+    """BeautifulSoup with a given tree builder ("html.parser" or "lxml")"""
+
+    def __init__(self, builder):
+        self.name = builder
+        self.builder = builder
+
+    def links(self, html, selector):
+        """(text, href) of every element matching selector, text as get_text(strip=True)"""
+        soup = BeautifulSoup(html, self.builder)
+        return [(a.get_text(strip=True), a.get("href") or "") for a in soup.select(selector)]
+
+    def item_links(self, html, item_selector, link_selector):
+        """(text, href) of the first link_selector match inside each item_selector element"""
+        soup = BeautifulSoup(html, self.builder)
+        links = []
+        for item in soup.select(item_selector):
+            a = item.select_one(link_selector)
+            if a is not None:
+                links.append((a.get_text(strip=True), a.get("href") or ""))
+        return links
+
+
+class SelectolaxBackend:
+    """selectolax (Lexbor, or Modest on old versions), no Python tree at all"""
+
+    name = "selectolax"
+
+    def links(self, html, selector):
+        tree = HTMLParser(html)
+        return [
+            (node.text(deep=True, separator="", strip=True), node.attributes.get("href") or "")
+            for node in tree.css(selector)
+        ]
+
+    def item_links(self, html, item_selector, link_selector):
+        tree = HTMLParser(html)
+        links = []
+        seen = set()
+        for item in tree.css(item_selector):
+            # A group selector yields an element once per part it matches
+            if item.mem_id in seen:
+                continue
+            seen.add(item.mem_id)
+            node = item.css_first(link_selector)
+            if node is not None:
+                links.append((node.text(deep=True, separator="", strip=True), node.attributes.get("href") or ""))
+        return links
+
+
+def available_backends():
+    """Installed backends, fastest first"""
+    backends = []
+    if SELECTOLAX_AVAILABLE:
+        backends.append(SelectolaxBackend())
+    if LXML_AVAILABLE:
+        backends.append(SoupBackend("lxml"))
+    backends.append(SoupBackend("html.parser"))
+    return backends
+
+
+_default_backend = None
+
+
+def default_backend():
+    """Fastest installed backend, picked once per process"""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = available_backends()[0]
+    return _default_backend
+
+
+def get_backend(name=None):
+    """Backend by name ("selectolax", "lxml", "html.parser"), default when None or unavailable"""
+    for backend in available_backends():
+        if backend.name == name:
+            return backend
+    return default_backend()
+
+
+def title_links(html, base_url="https://mangapark.io", backend=None, stats=None):
+    """
+    Title links of a page, in document order
+
+    Returns:
+        List of (title, absolute_url), one per series (see collapse_links);
+        links without text are skipped
+    """
+    links = []
+    for title, href in (backend or default_backend()).links(html, TITLE_LINK_SELECTOR):
+        if not title or "/title/" not in href:
+            continue
+        links.append((title, href if href.startswith("http") else base_url + href))
+    return collapse_links(links, stats)
+
+
+# Mirrors title_links(): raw href attribute, text nodes stripped and joined
+# like BeautifulSoup's get_text(strip=True)
+_LINKS_JS = """
+var out = [];
+document.querySelectorAll(arguments[0]).forEach(function (a) {
+    var href = a.getAttribute('href') || '';
+    if (href.indexOf('/title/') === -1) { return; }
+    var walker = document.createTreeWalker(a, NodeFilter.SHOW_TEXT);
+    var parts = [];
+    while (walker.nextNode()) {
+        var text = walker.currentNode.nodeValue.trim();
+        if (text) { parts.push(text); }
+    }
+    var title = parts.join('');
+    if (title) { out.push([title, href]); }
+});
+return out;
+"""
+
+
+def title_links_in_browser(driver, base_url="https://mangapark.io", stats=None):
+    """Same as title_links(), computed in the page so only the pairs cross the wire"""
+    pairs = driver.execute_script(_LINKS_JS, TITLE_LINK_SELECTOR) or []
+    return collapse_links([
+        (title, href if href.startswith("http") else base_url + href)
+        for title, href in pairs
+    ], stats)
+
+
+def extract_links(driver, base_url="https://mangapark.io", mode="script", stats=None):
+    """
+    Title links of the page loaded in a driver
+
+    Args:
+        mode: "script" (in-browser, falls back to parsing on error) or "soup"
+        stats: Optional dict counting collapsed "duplicates"
+    """
+    if mode == "script":
+        try:
+            return title_links_in_browser(driver, base_url, stats)
+        except Exception:
+            pass
+    return title_links(driver.page_source, base_url, stats=stats)
+
+
+def parity_check(driver, base_url="https://mangapark.io"):
+    """
+    Compare in-browser extraction with the BeautifulSoup path on the current page
+
+    Needs a live browser; tests/test_follows_parser.py runs the same check on
+    recorded pages in headless Chrome or Node.js.
+
+    Returns:
+        Dict with both counts, whether the lists are identical, and the differences
+    """
+    script = title_links_in_browser(driver, base_url)
+    soup = title_links(driver.page_source, base_url)
+    return {
+        "script": len(script),
+        "soup": len(soup),
+        "identical": script == soup,
+        "missing": [link for link in soup if link not in script],
+        "extra": [link for link in script if link not in soup]
+    }
+
+
+def _synthetic_follows_page(count=36):
+    """Stand-in follows page when no recorded pages are given"""
+    cards = "".join(
+        f'<div class="group flex"><a href="/title/{n}-en-title-{n}"><img src="/c/{n}.jpg"></a>'
+        f'<div><h3><a class="link" href="/title/{n}-en-title-{n}"><span>Title {n}</span></a></h3>'
+        f'<a href="/title/{n}-en-title-{n}/c{n}">Chapter {n}</a><span>1 hour ago</span></div></div>'
+        for n in range(count)
+    )
+    nav = "".join(f'<a href="/my/follows?page={p}">{p}</a>' for p in range(1, 11))
+    return f"<html><head><script>var x = 1;</script></head><body><main>{cards}</main><nav>{nav}</nav></body></html>"
+
+
+def _peak_memory_kb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
+
+
+def _bench_one(name, paths, rounds):
+    """Child process: parse every page `rounds` times with one backend"""
+    import json
+    import time
+
+    pages = [open(p, encoding="utf-8").read() for p in paths] if paths else [_synthetic_follows_page()]
+    backend = get_backend(name)
+    title_links(pages[0], backend=backend)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            title_links(html, backend=backend)
+    elapsed = time.perf_counter() - started
+    after = _peak_memory_kb()
+    print(json.dumps({
+        "backend": backend.name,
+        "pages_per_s": rounds * len(pages) / elapsed,
+        "peak_rss_mb": after / 1024 if after else None
+    }))
+
+
+def _benchmark(paths, rounds=50):
+    """Run each backend in its own process so peak memory is not shared"""
+    import json
+    import subprocess
+    import sys
+
+    print(f"{len(paths) or 1} page(s) x {rounds} rounds, default backend: {default_backend().name}")
+    for backend in available_backends():
+        out = subprocess.run(
+            [sys.executable, __file__, "--bench-one", backend.name, str(rounds)] + paths,
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        memory = f"peak RSS {result['peak_rss_mb']:.1f} MB" if result["peak_rss_mb"] else "peak RSS n/a"
+        print(f"  {result['backend']:<12} {result['pages_per_s']:8.1f} pages/s  {memory}")
+
+
+def _parity(paths):
+    import os
+    import time
+    from selenium import webdriver
+    from driver_pool import chrome_options
+
+    driver = webdriver.Chrome(options=chrome_options())
+    try:
+        for path in paths:
+            driver.get("file://" + os.path.abspath(path))
+            result = parity_check(driver)
+
+            started = time.perf_counter()
+            title_links_in_browser(driver)
+            script_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            title_links(driver.page_source)
+            soup_ms = (time.perf_counter() - started) * 1000
+
+            status = "OK" if result["identical"] else "MISMATCH"
+            print(f"{status} {path}: {result['script']} links "
+                  f"(script {script_ms:.1f} ms, page_source + parse {soup_ms:.1f} ms)")
+            for link in result["missing"]:
+                print(f"  missing: {link}")
+            for link in result["extra"]:
+                print(f"  extra:   {link}")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    import sys
+
+    args = sys.argv[1:]
+    if args[:1] == ["--bench-one"]:
+        _bench_one(args[1], args[3:], int(args[2]))
+    elif args[:1] == ["--bench"]:
+        _benchmark(args[1:])
+    else:
+        _parity(args)
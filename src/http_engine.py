@@ -0,0 +1,318 @@
+"""
+Browserless MangaPark follows engine
+Pages through the follows list with the GraphQL endpoint the MangaPark frontend uses
+
+Run `python src/http_engine.py` to exercise the engine against a local
+stand-in server serving recorded responses.
+"""
+
+import requests
+
+from follows_parser import collapse_links
+from sharded_scraper import PageMerger
+
+
+DEFAULT_BASE_URL = "https://mangapark.io"
+GRAPHQL_PATH = "/apo/"
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/129.0 Safari/537.36"
+)
+
+# Same operation the /my/follows page sends; only the fields we use are selected
+FOLLOWS_QUERY = """
+query get_user_libList($select: UserLibList_Select) {
+  get_user_libList(select: $select) {
+    paging { total pages page }
+    items { data { id name urlPath } }
+  }
+}
+"""
+
+
+class EngineError(Exception):
+    """The HTTP engine cannot be used (endpoint changed, not logged in...)"""
+
+
+class AuthError(EngineError):
+    """
+    MangaPark explicitly says the session is not logged in; no other engine will do better
+
+    Only raised on a clear logged-out answer: a refused request or an
+    empty response may be a bot check the browser gets through.
+    """
+
+
+# GraphQL error messages that only an anonymous session gets
+_LOGIN_ERRORS = ("login", "log in", "logged in", "sign in", "signin", "not authenticated",
+                 "unauthenticated", "unauthorized")
+
+
+def login_error(body):
+    """Message of a GraphQL error saying the session is not logged in, None for anything else"""
+    if not isinstance(body, dict):
+        return None
+    for error in body.get("errors") or ():
+        message = str(error.get("message", "")) if isinstance(error, dict) else str(error)
+        if any(word in message.lower() for word in _LOGIN_ERRORS):
+            return message
+    return None
+
+
+def graphql_archive_url(url, payload):
+    """URL a follows GraphQL request is recorded under (its page is in the POST body)"""
+    select = (payload.get("variables") or {}).get("select") or {}
+    return f"{url}?follows_page={select.get('page', 1)}"
+
+
+def _find_comics(node, found):
+    """Collect {"name", "urlPath"} nodes anywhere in a GraphQL response, in order"""
+    if isinstance(node, dict):
+        if isinstance(node.get("name"), str) and "/title/" in str(node.get("urlPath", "")):
+            found.append(node)
+            return
+        for value in node.values():
+            _find_comics(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            _find_comics(value, found)
+
+
+def _find_paging(node):
+    if isinstance(node, dict):
+        paging = node.get("paging")
+        if isinstance(paging, dict) and paging.get("pages"):
+            return paging
+        for value in node.values():
+            found = _find_paging(value)
+            if found:
+                return found
+    elif isinstance(node, list):
+        for value in node:
+            found = _find_paging(value)
+            if found:
+                return found
+    return None
+
+
+class MangaParkHTTPEngine:
+    """Follows scraper on plain HTTP requests (no browser)"""
+
+    def __init__(self, cookies=None, base_url=DEFAULT_BASE_URL, session=None,
+                 timeout=30, max_pages=100, archive=None, mirrors=None):
+        """
+        Args:
+            cookies: Dict with at least skey and tfv (ignored if session carries them)
+            base_url: Site root; point it at a local server to replay recorded responses
+            session: Optional requests.Session to reuse (its headers are left untouched)
+            timeout: Per-request timeout in seconds
+            max_pages: Upper bound of pages fetched
+            archive: Optional PageArchive every response is recorded to
+            mirrors: Optional MirrorSelector; a page that times out or gets a
+                5xx is fetched again from the next mirror
+        """
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.archive = archive
+        self.mirrors = mirrors
+        if session is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+        self.session = session
+        # Sent with each request: a shared session keeps its own headers
+        self.headers = {"Accept": "application/json"}
+        self._use_site(base_url)
+        for name, value in (cookies or {}).items():
+            if value:
+                self.session.cookies.set(name, value)
+        self.requests = 0
+        self.duplicates = 0
+        self.reached_end = False  # the last scrape() went past the last page
+
+    def _use_site(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.headers.update({
+            "Origin": self.base_url,
+            "Referer": f"{self.base_url}/my/follows"
+        })
+
+    def _fail_over(self):
+        """Move to the next mirror, False when there is none"""
+        if self.mirrors is None:
+            return False
+        site = self.mirrors.failover(self.base_url)
+        if site == self.base_url:
+            return False
+        print(f"[WARN] {self.base_url} is not responding, switching to {site}")
+        self._use_site(site)
+        return True
+
+    def query(self, query, variables):
+        """
+        One GraphQL request to the current mirror
+
+        Returns:
+            The response's "data" dict
+
+        Raises:
+            AuthError: MangaPark explicitly says the session is not logged in
+            EngineError: Anything else: blocked (bot checks answer 403 to
+                non-browser clients too), unexpected status, GraphQL errors,
+                or no data at all; a browser may still get through
+        """
+        payload = {"query": query, "variables": variables}
+        try:
+            resp = self.session.post(self.base_url + GRAPHQL_PATH, json=payload, headers=self.headers,
+                                     timeout=self.timeout)
+        except requests.RequestException as e:
+            if isinstance(e, (requests.Timeout, requests.ConnectionError)) and self._fail_over():
+                return self.query(query, variables)
+            raise EngineError(f"Request failed: {e}") from e
+        self.requests += 1
+        if self.archive is not None:
+            url = graphql_archive_url(self.base_url + GRAPHQL_PATH, payload)
+            self.archive.record(url, resp.text, "application/json", resp.status_code)
+
+        try:
+            body = resp.json()
+        except ValueError:
+            body = None
+        message = login_error(body)
+        if message:
+            raise AuthError(f"MangaPark says the session is not logged in ({message}), check skey/tfv")
+        if resp.status_code >= 500 and self._fail_over():
+            return self.query(query, variables)
+        if resp.status_code in (401, 403):
+            raise EngineError(f"Request refused (status {resp.status_code}), possibly a bot check")
+        if resp.status_code != 200:
+            raise EngineError(f"Unexpected status {resp.status_code}")
+        if not isinstance(body, dict):
+            raise EngineError("Response is not JSON, the endpoint may have changed")
+
+        if body.get("errors"):
+            message = body["errors"][0].get("message", "unknown error")
+            raise EngineError(f"GraphQL error: {message}")
+        data = body.get("data")
+        if not isinstance(data, dict) or all(v is None for v in data.values()):
+            # Logged out, or the query no longer matches the schema: only a browser can tell
+            raise EngineError("Empty response (not logged in, or the query changed)")
+        return data
+
+    def fetch_page(self, page):
+        """
+        One page of follows
+
+        Returns:
+            (links, total_pages): links as (title, url) pairs, total_pages None if not reported
+
+        Raises:
+            AuthError: MangaPark says the session is not logged in
+            EngineError: Unexpected status or response, GraphQL errors
+        """
+        data = self.query(FOLLOWS_QUERY, {"select": {"type": "follow", "page": page}})
+
+        comics = []
+        _find_comics(data, comics)
+        links = []
+        for comic in comics:
+            path = comic["urlPath"]
+            url = path if path.startswith("http") else self.base_url + path
+            links.append((comic["name"].strip(), url))
+        paging = _find_paging(data)
+        stats = {}
+        links = collapse_links(links, stats)
+        self.duplicates += stats["duplicates"]
+        return links, (int(paging["pages"]) if paging else None)
+
+    def scrape(self, on_page=None, on_records=None, start_page=1):
+        """
+        Fetch every follows page
+
+        Args:
+            on_page: Optional callback(page, link_count, total_pages)
+            on_records: Optional callback(records, page) with each page's new records,
+                returning True stops paging after that page
+            start_page: First page fetched (resuming an interrupted scrape)
+
+        Returns:
+            List of {"title", "url"} in follows order, deduped like the browser path
+        """
+        merger = PageMerger(start_page)
+        results = []
+        total = None
+        page = start_page
+        self.reached_end = False
+        while page <= min(total or self.max_pages, self.max_pages):
+            links, reported = self.fetch_page(page)
+            total = total or reported
+            records = merger.add(page, links)
+            if on_page:
+                on_page(page, len(links), total)
+            stop = bool(records and on_records and on_records(records, page))
+            results.extend(records)
+            if stop:
+                break
+            if merger.done or (total and page >= total):
+                self.reached_end = True
+                break
+            page += 1
+        self.duplicates += merger.duplicates
+        return results
+
+
+def _replay_demo(pages=3, per_page=4):
+    """Run the engine against a local server replaying canned GraphQL pages"""
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    def response(page):
+        items = [
+            {"data": {"id": str(n), "name": f"Title {n}", "urlPath": f"/title/{n}-en-title-{n}"}}
+            for n in range((page - 1) * per_page, page * per_page)
+        ] if page <= pages else []
+        return {"data": {"get_user_libList": {
+            "paging": {"total": pages * per_page, "pages": pages, "page": page},
+            "items": items
+        }}}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if "skey=" not in self.headers.get("Cookie", ""):
+                data = json.dumps({"errors": [{"message": "Please login first"}], "data": None}).encode()
+            else:
+                data = json.dumps(response(body["variables"]["select"]["page"])).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        started = time.perf_counter()
+        engine = MangaParkHTTPEngine({"skey": "demo", "tfv": "1"}, base_url=base_url)
+        results = engine.scrape()
+        elapsed = time.perf_counter() - started
+        print(f"{len(results)} titles in {engine.requests} requests ({elapsed * 1000:.0f} ms)")
+        assert len(results) == pages * per_page
+
+        try:
+            MangaParkHTTPEngine({}, base_url=base_url).scrape()
+        except AuthError as e:
+            print(f"Without cookies: {e}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    _replay_demo()
@@ -0,0 +1,176 @@
+"""
+Jikan search client
+One pooled keep-alive session, bounded in-flight requests and asyncio batch resolution
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+from mal_cache import normalize_title
+from rate_limiter import jikan_limiter
+from retry_policy import RetryPolicy, ThrottledError
+from similarity import MATCH_THRESHOLD, best_candidate
+
+
+JIKAN_SEARCH_URL = "https://api.jikan.moe/v4/manga"
+NO_MATCH = (None, None, 0)
+
+USER_AGENT = "MangaParkExporter/3.0 (+https://github.com/N3uralCreativity/MangaParkExporter-)"
+
+
+def pooled_session(pool_size=8):
+    """requests.Session keeping up to pool_size connections alive per host"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "application/json"})
+    return session
+
+
+_shared_session = None
+_shared_lock = threading.Lock()
+
+
+def shared_session():
+    """Process-wide pooled session, so every MAL lookup reuses the same TLS connections"""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = pooled_session()
+        return _shared_session
+
+
+def best_match(title, candidates, fields=("title",), threshold=MATCH_THRESHOLD):
+    """
+    Pick the candidate whose title variants are most similar to `title`
+
+    Returns:
+        (mal_id, mal_title, score), or NO_MATCH when nothing beats the threshold
+    """
+    index, score = best_candidate(
+        title, [[manga.get(field) for field in fields] for manga in candidates], threshold
+    )
+    if index is None:
+        return NO_MATCH
+    best = candidates[index]
+    return str(best["mal_id"]), best.get("title", ""), score
+
+
+class JikanClient:
+    """MAL search through Jikan with cache, rate limit and retry integration"""
+
+    def __init__(self, cache=None, retry_policy=None, session=None, max_in_flight=4,
+                 matcher=best_match, max_requeue_rounds=2):
+        """
+        Args:
+            cache: Optional MALCache consulted before the network
+            retry_policy: RetryPolicy (defaults to one on the shared Jikan limiter)
+            session: requests.Session to reuse (defaults to the shared pooled one)
+            max_in_flight: Upper bound of concurrent requests
+            matcher: Function(title, candidates) -> (mal_id, mal_title, score)
+            max_requeue_rounds: Extra passes for titles that stay rate limited
+        """
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy(limiter=jikan_limiter())
+        self.session = session or shared_session()
+        self.max_in_flight = max_in_flight
+        self.matcher = matcher
+        self.max_requeue_rounds = max_requeue_rounds
+        self.calls_saved = 0
+
+    def candidates(self, title):
+        """
+        Jikan search results for a title (blocking)
+
+        Returns:
+            (candidates, from_cache), candidates is None on API errors
+
+        Raises:
+            ThrottledError: Still rate limited after every retry
+        """
+        if self.cache is not None:
+            cached = self.cache.get(title)
+            if cached is not None:
+                return cached["candidates"], True
+
+        params = {"q": title, "limit": 5}
+        resp = self.retry_policy.get(JIKAN_SEARCH_URL, session=self.session, params=params)
+        if resp.status_code != 200:
+            return None, False
+        return resp.json().get("data", []), False
+
+    def search(self, title):
+        """Resolve one title (blocking), returns (mal_id, mal_title, score)"""
+        results, from_cache = self.candidates(title)
+        if results is None:
+            return NO_MATCH
+
+        match = self.matcher(title, results)
+        if self.cache is not None and not from_cache:
+            chosen = {"mal_id": match[0], "title": match[1], "score": match[2]} if match[0] else None
+            self.cache.put(title, results, chosen)
+        return match
+
+    async def resolve_many(self, titles, on_result=None):
+        """
+        Resolve a batch of titles concurrently
+
+        Titles that normalize to the same key are looked up once and share
+        the result; calls_saved counts the lookups skipped that way.
+
+        Args:
+            titles: Titles to look up
+            on_result: Optional callback(index, title, match) as each title completes
+
+        Returns:
+            List of (mal_id, mal_title, score) in the same order as titles
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results = [NO_MATCH] * len(titles)
+
+        # Single flight: one lookup per normalized title, fanned out to its duplicates
+        groups = {}
+        for index, title in enumerate(titles):
+            groups.setdefault(normalize_title(title), []).append(index)
+        self.calls_saved = len(titles) - len(groups)
+
+        def finish(leader, match):
+            for index in groups[normalize_title(titles[leader])]:
+                results[index] = match
+                if on_result:
+                    on_result(index, titles[index], match)
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+
+            async def resolve(index):
+                async with semaphore:
+                    try:
+                        match = await loop.run_in_executor(executor, self.search, titles[index])
+                    except ThrottledError as e:
+                        return e.retry_after or 0.0
+                    except Exception:
+                        match = NO_MATCH
+                finish(index, match)
+                return None
+
+            pending = [indexes[0] for indexes in groups.values()]
+            for round_num in range(self.max_requeue_rounds + 1):
+                waits = await asyncio.gather(*(resolve(i) for i in pending))
+                throttled = [i for i, wait in zip(pending, waits) if wait is not None]
+                if not throttled:
+                    break
+                if round_num == self.max_requeue_rounds:
+                    for index in throttled:
+                        finish(index, NO_MATCH)
+                    break
+                # Requeue throttled titles once the API allows it again
+                self.retry_policy.record_requeue(len(throttled))
+                await asyncio.sleep(max(w for w in waits if w is not None))
+                pending = throttled
+
+        return results
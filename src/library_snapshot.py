@@ -0,0 +1,203 @@
+"""
+Library snapshot
+Last exported follows list keyed by MangaPark title ID, for delta syncs
+"""
+
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from follows_parser import link_key
+
+
+SNAPSHOT_NAME = "library_snapshot.json"
+SNAPSHOT_PATTERN = "library_snapshot_{account}.json"
+
+# Snapshots of other sessions kept next to the current one
+KEEP_SNAPSHOTS = 5
+
+
+def session_account(cookies):
+    """
+    Snapshot owner of a session: a hash of its skey cookie
+
+    tfv survives switching accounts in the same browser, skey does not, so
+    two accounts never share a snapshot. A new login starts a fresh one
+    (its first export is a full scan without delta). The cookie value
+    itself is not written to disk.
+    """
+    skey = cookies.get("skey") if cookies else None
+    if not skey:
+        return "anonymous"
+    return hashlib.sha1(str(skey).encode("utf-8")).hexdigest()[:12]
+
+
+def title_key(manga):
+    """MangaPark title ID of a record, its URL when the URL has none"""
+    return link_key(manga["url"])
+
+
+class LibrarySnapshot:
+    """
+    Enriched records of the previous export, in follows order
+
+    `full_scan` is the time of the last export that paged through the whole
+    list; only such an export can tell which titles were unfollowed.
+    """
+
+    def __init__(self, output_dir, account=None):
+        """
+        Args:
+            output_dir: Folder of the export files
+            account: session_account() of the cookies; each account has its own snapshot
+        """
+        self.output_dir = output_dir
+        name = SNAPSHOT_PATTERN.format(account=account) if account else SNAPSHOT_NAME
+        self.path = os.path.join(output_dir, name)
+        self.titles = {}  # title key -> enriched record
+        self.full_scan = None
+
+    def load(self):
+        """Read the snapshot if there is one, returns self"""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.titles = {title_key(m): m for m in data.get("titles", [])}
+                self.full_scan = data.get("full_scan")
+            except (ValueError, KeyError, OSError) as e:
+                print(f"[WARN] Ignoring unreadable snapshot {self.path}: {e}")
+                self.titles = {}
+        return self
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __contains__(self, key):
+        return key in self.titles
+
+    def get(self, key):
+        return self.titles.get(key)
+
+    def full_scan_age_days(self):
+        """Days since the last full scan, None if there never was one"""
+        if not self.full_scan:
+            return None
+        return (datetime.now() - datetime.fromisoformat(self.full_scan)).total_seconds() / 86400
+
+    def save(self, records, full_scan):
+        """
+        Replace the snapshot with the current library
+
+        Args:
+            records: Enriched records in follows order
+            full_scan: Whether the whole follows list was scraped this run
+        """
+        now = datetime.now().isoformat()
+        data = {
+            "updated": now,
+            "full_scan": now if full_scan else self.full_scan,
+            "titles": records
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.titles = {title_key(m): m for m in records}
+        self.full_scan = data["full_scan"]
+        self._prune()
+
+    def _prune(self):
+        """Drop the snapshots of the least recently exported sessions"""
+        others = [p for p in glob.glob(os.path.join(self.output_dir, SNAPSHOT_PATTERN.format(account="*")))
+                  if os.path.abspath(p) != os.path.abspath(self.path)]
+        others.sort(key=os.path.getmtime, reverse=True)
+        for path in others[KEEP_SNAPSHOTS:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class DeltaSync:
+    """
+    One export compared with the previous snapshot
+
+    Known titles keep their MAL match, so only new titles are looked up.
+    With early_stop, paging ends once stop_after known titles in a row went
+    by; titles further down the list are carried over from the snapshot and
+    unfollowed titles cannot be detected, which is left to the next full scan.
+    The same goes for a scrape cut short by the page limit: only one that
+    reached the last follows page (see scrape_finished()) reports removals.
+    """
+
+    def __init__(self, snapshot, stop_after=40, early_stop=True):
+        """
+        Args:
+            snapshot: Loaded LibrarySnapshot
+            stop_after: Known titles in a row that end paging
+            early_stop: False forces a full scan
+        """
+        self.snapshot = snapshot
+        self.known = len(snapshot)
+        self.stop_after = stop_after
+        self.early_stop = early_stop and len(snapshot) > 0
+        self.known_run = 0
+        self.seen = set()
+        self.added = set()
+        self.stopped_early = False
+        self.complete = False
+
+    def observe(self, records):
+        """
+        Track scraped records in follows order
+
+        Returns:
+            True once paging can stop
+        """
+        for manga in records:
+            key = title_key(manga)
+            self.seen.add(key)
+            if key in self.snapshot:
+                self.known_run += 1
+            else:
+                self.known_run = 0
+                self.added.add(key)
+        if self.early_stop and self.known_run >= self.stop_after:
+            self.stopped_early = True
+        return self.stopped_early
+
+    def scrape_finished(self, reached_end):
+        """
+        Record how paging ended
+
+        Args:
+            reached_end: The scrape went past the last follows page (False
+                when it hit the page limit, or when that is unknown)
+        """
+        self.complete = bool(reached_end) and not self.stopped_early
+
+    def prior(self, manga):
+        """Previous MAL match of a known title (with the current title and URL), None otherwise"""
+        record = self.snapshot.get(title_key(manga))
+        if not record or record.get("mal_id", "0") == "0":
+            # New, or unmatched last time: worth another lookup
+            return None
+        return {**record, "title": manga["title"], "url": manga["url"]}
+
+    def is_new(self, manga):
+        return title_key(manga) in self.added
+
+    def carried_over(self):
+        """Snapshot titles past the point where paging stopped, in snapshot order"""
+        if self.complete:
+            return []
+        return [m for key, m in self.snapshot.titles.items() if key not in self.seen]
+
+    def removed(self):
+        """Titles unfollowed since the snapshot (empty unless the whole list was scraped)"""
+        if not self.complete:
+            return []
+        return [m for key, m in self.snapshot.titles.items() if key not in self.seen]
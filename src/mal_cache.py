@@ -0,0 +1,170 @@
+"""
+Persistent MAL lookup cache
+SQLite-backed store of MAL search results keyed by normalized title
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".mangapark_exporter")
+DEFAULT_CACHE_PATH = os.path.join(DEFAULT_CACHE_DIR, "mal_cache.sqlite3")
+
+# Only the fields used for matching are kept, full Jikan entries are several KB each
+CANDIDATE_FIELDS = ("mal_id", "title", "title_english", "title_japanese", "title_synonyms")
+
+
+def normalize_title(title):
+    """Normalize a title for cache keys (case, accents, punctuation, whitespace)"""
+    if not title:
+        return ""
+    text = unicodedata.normalize("NFKC", title).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def slim_candidate(manga):
+    """Keep only the matching fields of a MAL search result"""
+    return {field: manga[field] for field in CANDIDATE_FIELDS if manga.get(field)}
+
+
+class MALCache:
+    """Thread-safe SQLite cache of MAL search candidates and chosen matches"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_days=30, negative_ttl_days=3, max_entries=50000):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: SQLite file location
+            ttl_days: Lifetime of entries that have candidates
+            negative_ttl_days: Lifetime of entries where MAL returned nothing
+            max_entries: Least recently used entries are evicted above this size
+        """
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS lookups (
+                source TEXT NOT NULL,
+                key TEXT NOT NULL,
+                title TEXT,
+                candidates TEXT NOT NULL,
+                match TEXT,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (source, key)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lookups_accessed ON lookups (accessed_at)")
+        self._conn.commit()
+
+    def get(self, title, source="jikan"):
+        """
+        Look up a title
+
+        Returns:
+            Dict with candidates and match, or None on miss/expiry
+        """
+        key = normalize_title(title)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT candidates, match, created_at FROM lookups WHERE source = ? AND key = ?",
+                (source, key)
+            ).fetchone()
+
+            if row is not None:
+                candidates = json.loads(row[0])
+                ttl = self.ttl if candidates else self.negative_ttl
+                if now - row[2] <= ttl:
+                    self._conn.execute(
+                        "UPDATE lookups SET accessed_at = ? WHERE source = ? AND key = ?",
+                        (now, source, key)
+                    )
+                    self._conn.commit()
+                    self.hits += 1
+                    return {
+                        "candidates": candidates,
+                        "match": json.loads(row[1]) if row[1] else None
+                    }
+                self._conn.execute("DELETE FROM lookups WHERE source = ? AND key = ?", (source, key))
+                self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, title, candidates, match=None, source="jikan"):
+        """Store the raw candidates and the chosen match for a title"""
+        key = normalize_title(title)
+        if not key:
+            return
+        now = time.time()
+        payload = json.dumps([slim_candidate(c) for c in candidates], ensure_ascii=False)
+        chosen = json.dumps(match, ensure_ascii=False) if match else None
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO lookups
+                   (source, key, title, candidates, match, created_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (source, key, title, payload, chosen, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used rows above max_entries (lock held)"""
+        count = self._conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM lookups WHERE rowid IN "
+                "(SELECT rowid FROM lookups ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+
+    def purge_expired(self):
+        """Delete every expired entry, returns number removed"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM lookups WHERE (candidates != '[]' AND created_at < ?) "
+                "OR (candidates = '[]' AND created_at < ?)",
+                (now - self.ttl, now - self.negative_ttl)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def reset_stats(self):
+        """Reset hit/miss counters (call at the start of each export)"""
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Hit/miss counters for the current run"""
+        lookups = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,60 @@
+"""
+MAL XML writer
+Writes matched entries as they arrive instead of building the whole tree in memory
+"""
+
+import os
+import shutil
+import xml.etree.ElementTree as ET
+
+
+class MALXMLWriter:
+    """
+    Incremental MAL import file
+
+    Entries are appended to a .part file as records arrive; close() writes
+    the header (which carries the total count) followed by the entries.
+    The result is byte-identical to building the tree with ElementTree.
+    """
+
+    def __init__(self, path, user_name="mangapark_export"):
+        self.path = path
+        self.user_name = user_name
+        self.total = 0
+        self.matched = 0
+        self._part_path = path + ".part"
+        self._part = open(self._part_path, "w", encoding="utf-8")
+
+    def add(self, manga):
+        """Count a record and write it if it has a MAL id"""
+        self.total += 1
+        if manga["mal_id"] == "0":
+            return
+        entry = ET.Element("manga")
+        ET.SubElement(entry, "manga_mangadb_id").text = manga["mal_id"]
+        ET.SubElement(entry, "manga_title").text = manga["title"]
+        ET.SubElement(entry, "my_status").text = "Plan to Read"
+        self._part.write(ET.tostring(entry, encoding="unicode"))
+        self.matched += 1
+
+    def close(self):
+        """Write the final file and remove the .part file"""
+        self._part.close()
+        myinfo = ET.Element("myinfo")
+        ET.SubElement(myinfo, "user_name").text = self.user_name
+        ET.SubElement(myinfo, "user_export_type").text = "2"
+        ET.SubElement(myinfo, "user_total_manga").text = str(self.total)
+
+        with open(self.path, "w", encoding="utf-8") as out:
+            out.write("<?xml version='1.0' encoding='utf-8'?>\n<myanimelist>")
+            out.write(ET.tostring(myinfo, encoding="unicode"))
+            with open(self._part_path, encoding="utf-8") as part:
+                shutil.copyfileobj(part, out)
+            out.write("</myanimelist>")
+        os.remove(self._part_path)
+
+    def abort(self):
+        """Drop the partial output"""
+        self._part.close()
+        if os.path.exists(self._part_path):
+            os.remove(self._part_path)
@@ -0,0 +1,123 @@
+"""
+Browser memory governor
+Samples Chrome's memory through the driver's process tree and says when a browser should be recycled
+
+psutil is listed in requirements.txt but stays optional: without it there is
+no memory reading, browsers are recycled on page count alone and a warning
+says the memory limit is not enforced.
+"""
+
+import threading
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def browser_rss(driver):
+    """
+    Resident memory of a WebDriver's browser
+
+    Chrome runs as children of the chromedriver process (browser, GPU,
+    one renderer per site...), so the whole tree is summed. Pages shared
+    between processes are counted once per process, which overstates the
+    real footprint: limits should be set with that in mind.
+
+    Returns:
+        Bytes, None when psutil is missing or the process tree cannot be read
+    """
+    if not PSUTIL_AVAILABLE:
+        return None
+    process = getattr(getattr(driver, "service", None), "process", None)
+    pid = getattr(process, "pid", None)
+    if pid is None:
+        return None
+    try:
+        root = psutil.Process(pid)
+        tree = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for proc in tree:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass  # exited between listing and reading
+    return total
+
+
+class MemoryGovernor:
+    """
+    Memory and page budget of the browsers of one scrape
+
+    page_loaded() is called after every page a browser reads; before it
+    loads the next one, needs_recycle() tells whether to swap it for a
+    fresh browser (which must be logged in again). Thread-safe, so shards
+    can share one governor.
+    """
+
+    def __init__(self, max_rss_mb=1024, max_pages=40, measure=browser_rss):
+        """
+        Args:
+            max_rss_mb: Browser memory that triggers a recycle (0 disables the check)
+            max_pages: Pages one browser loads before it is recycled (0 disables the check)
+            measure: Callable(driver) -> bytes or None
+        """
+        self.max_rss = int(max_rss_mb) * 1024 * 1024
+        self.max_pages = int(max_pages)
+        self.measure = measure
+        if self.max_rss and measure is browser_rss and not PSUTIL_AVAILABLE:
+            print(f"[WARN] psutil is not installed, the {int(max_rss_mb)} MB browser memory limit "
+                  f"is not enforced (pip install psutil)")
+        self._lock = threading.Lock()
+        self._drivers = {}  # id(driver) -> {"pages", "rss"}
+        self.peak_rss = 0
+        self.samples = 0
+        self.recycles = 0
+
+    def page_loaded(self, driver):
+        """Count a page and sample the browser's memory, returns the reading in bytes (or None)"""
+        try:
+            rss = self.measure(driver)
+        except Exception:
+            rss = None
+        with self._lock:
+            state = self._drivers.setdefault(id(driver), {"pages": 0, "rss": None})
+            state["pages"] += 1
+            state["rss"] = rss
+            if rss is not None:
+                self.samples += 1
+                self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def over_memory(self, driver):
+        """Whether the last reading of a browser was over the memory limit"""
+        with self._lock:
+            state = self._drivers.get(id(driver))
+        return bool(self.max_rss and state and state["rss"] is not None and state["rss"] >= self.max_rss)
+
+    def needs_recycle(self, driver):
+        """Whether a browser crossed the memory or page budget"""
+        with self._lock:
+            state = self._drivers.get(id(driver))
+        if not state:
+            return False
+        return self.over_memory(driver) or bool(self.max_pages and state["pages"] >= self.max_pages)
+
+    def recycled(self, driver):
+        """Forget a browser that was quit"""
+        with self._lock:
+            self._drivers.pop(id(driver), None)
+            self.recycles += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "peak_rss_mb": round(self.peak_rss / 1024 / 1024, 1) if self.samples else None,
+                "memory_samples": self.samples,
+                "recycles": self.recycles,
+                "max_rss_mb": self.max_rss // (1024 * 1024),
+                "max_pages_per_browser": self.max_pages
+            }
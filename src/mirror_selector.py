@@ -0,0 +1,180 @@
+"""
+Mirror selector
+Probes the MangaPark domains concurrently, picks the fastest healthy one and fails over when it stops answering
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from http_engine import USER_AGENT
+
+
+# Domains serving the same site and accounts; the first one is used when no probe succeeds
+MIRRORS = (
+    "https://mangapark.io",
+    "https://mangapark.net",
+    "https://mangapark.com",
+    "https://mangapark.org",
+    "https://mangapark.me"
+)
+
+
+def site_of(url):
+    """scheme://host of a URL"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def is_network_error(error):
+    """Whether an exception means the site did not answer (as opposed to a scraping failure)"""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    # Selenium: TimeoutException, or net::ERR_* from a failed navigation
+    return "Timeout" in type(error).__name__ or "net::ERR_" in str(error)
+
+
+def probe_mirror(base_url, timeout=4, session=None):
+    """
+    Time one request to a mirror's home page
+
+    Only the headers are waited for. Redirects are not followed: a mirror
+    redirecting elsewhere would not keep the cookies set for its domain.
+
+    Returns:
+        Dict of url, ok, status, latency (seconds, None on failure), error
+    """
+    result = {"url": base_url, "ok": False, "status": None, "latency": None, "error": None}
+    started = time.monotonic()
+    try:
+        resp = (session or requests).get(base_url + "/", headers={"User-Agent": USER_AGENT},
+                                         timeout=timeout, allow_redirects=False, stream=True)
+        resp.close()
+    except requests.RequestException as e:
+        result["error"] = type(e).__name__
+        return result
+    result["latency"] = round(time.monotonic() - started, 3)
+    result["status"] = resp.status_code
+    result["ok"] = 200 <= resp.status_code < 300
+    return result
+
+
+class MirrorSelector:
+    """
+    Current mirror of the scrapers
+
+    select() probes every mirror at once (results are kept for ttl
+    seconds) and moves to the lowest-latency healthy one. failover() is
+    called when a request to the current mirror times out mid-run: the
+    mirror is marked down and the next best one becomes current. A pinned
+    mirror is never probed nor left.
+    """
+
+    def __init__(self, mirrors=MIRRORS, ttl=300, timeout=4, probe=probe_mirror):
+        """
+        Args:
+            mirrors: Base URLs of the known mirrors, in fallback order
+            ttl: Seconds probe results are reused for
+            timeout: Per-probe timeout in seconds
+            probe: Callable(base_url, timeout) -> probe_mirror() style dict
+        """
+        self.mirrors = tuple(dict.fromkeys(m.rstrip("/") for m in mirrors))
+        self.ttl = ttl
+        self.timeout = timeout
+        self.probe = probe
+        self.current = self.mirrors[0]
+        self.pinned = None
+        self.failovers = 0
+        self._results = {}
+        self._probed_at = None
+        self._lock = threading.Lock()
+
+    def pin(self, base_url):
+        """Always use base_url (None goes back to automatic selection)"""
+        with self._lock:
+            self.pinned = base_url.rstrip("/") if base_url else None
+            if self.pinned:
+                self.current = self.pinned
+
+    def results(self, force=False):
+        """Probe results by mirror, probing again once they are older than ttl"""
+        with self._lock:
+            fresh = self._probed_at is not None and time.monotonic() - self._probed_at < self.ttl
+            if fresh and not force:
+                return dict(self._results)
+        with ThreadPoolExecutor(max_workers=len(self.mirrors)) as executor:
+            probed = list(executor.map(lambda url: self.probe(url, self.timeout), self.mirrors))
+        with self._lock:
+            self._results = {r["url"]: r for r in probed}
+            self._probed_at = time.monotonic()
+            return dict(self._results)
+
+    def select(self, force=False):
+        """
+        Move to the fastest healthy mirror
+
+        Returns:
+            Base URL of the current mirror (unchanged when pinned or when no mirror answered)
+        """
+        if self.pinned:
+            return self.pinned
+        healthy = self._ranked(self.results(force))
+        with self._lock:
+            if healthy:
+                self.current = healthy[0]
+            return self.current
+
+    def failover(self, failed):
+        """
+        Leave a mirror that stopped answering
+
+        Args:
+            failed: Base URL the failing request went to
+
+        Returns:
+            Base URL of the current mirror: another one if there was a
+            healthy alternative (or another caller already moved on),
+            `failed` itself if there is nowhere to go
+        """
+        failed = failed.rstrip("/")
+        with self._lock:
+            if self.pinned or failed != self.current:
+                return self.current
+            entry = self._results.setdefault(failed, {"url": failed, "status": None, "latency": None})
+            entry.update({"ok": False, "error": "failed during export"})
+            candidates = self._ranked(self._results)
+            # Mirrors never probed are still worth a try
+            candidates += [m for m in self.mirrors if m not in self._results]
+            if not candidates:
+                return self.current
+            self.current = candidates[0]
+            self.failovers += 1
+            return self.current
+
+    @staticmethod
+    def _ranked(results):
+        up = [r for r in results.values() if r["ok"]]
+        return [r["url"] for r in sorted(up, key=lambda r: r["latency"])]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "current": self.current,
+                "pinned": bool(self.pinned),
+                "failovers": self.failovers,
+                "probes": [dict(r) for r in self._results.values()]
+            }
+
+
+if __name__ == "__main__":
+    selector = MirrorSelector()
+    started = time.monotonic()
+    best = selector.select()
+    print(f"Probed {len(selector.mirrors)} mirrors in {time.monotonic() - started:.2f}s")
+    for result in sorted(selector.results().values(), key=lambda r: (not r["ok"], r["latency"] or 0)):
+        latency = f"{result['latency'] * 1000:5.0f} ms" if result["latency"] is not None else "   --   "
+        print(f"  {result['url']:<24} {latency}  {result['status'] or result['error']}")
+    print(f"Selected {best}")
@@ -0,0 +1,211 @@
+"""
+Network filter
+Blocks page resources the scrapers never read (images, fonts, ads) through DevTools and measures what each page transfers
+
+Only anchors are read from the follows and latest pages, so covers, fonts
+and third-party scripts are pure download and render time. Blocking is a
+list of URL patterns handed to Chrome (Network.setBlockedURLs): requests
+are cancelled before they leave the browser. Per-page transfer stats come
+from the performance log, which the browser must be launched with
+(launch_chrome(network_log=True)).
+
+Benchmark full against lean loads of a page on a local Chrome:
+
+    python src/network_filter.py URL [rounds]
+"""
+
+import json
+import threading
+
+
+# Network.setBlockedURLs patterns, "*" matches any run of characters
+RULE_SETS = {
+    "images": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.bmp*", "*.ico*", "*.svg*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*", "*.wav*"],
+    "fonts": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*", "*fonts.googleapis.com*", "*fonts.gstatic.com*"],
+    "third_party": [
+        "*googletagmanager.com*", "*google-analytics.com*", "*googlesyndication.com*",
+        "*doubleclick.net*", "*adservice.google.*", "*facebook.net*", "*connect.facebook.*",
+        "*cloudflareinsights.com*", "*hotjar.com*", "*disqus.com*", "*disquscdn.com*",
+        "*histats.com*", "*yandex.ru/metrika*", "*mc.yandex.*", "*adsterra*", "*popads.net*",
+        "*propellerads*", "*exoclick.com*", "*juicyads.com*"
+    ]
+}
+
+DEFAULT_RULES = ("images", "media", "fonts", "third_party")
+
+
+def parse_rules(value):
+    """Rule set names from a setting ("images,fonts" or a list), unknown names are dropped"""
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(name.strip() for name in value or () if name.strip() in RULE_SETS)
+
+
+class NetworkFilter:
+    """
+    Blocked URL patterns and per-page network stats of one scrape
+
+    apply() is called on every browser before its first page (blocking
+    survives navigation but not a browser restart); wrap() decorates the
+    extract function so each page's transfer stats are read after it
+    loads. Until one filtered page has yielded links, an empty page is
+    reloaded without blocking; if that finds links the filter turns
+    itself off for the rest of the scrape.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, extra_patterns=()):
+        """
+        Args:
+            rules: Names of RULE_SETS to block, empty for full page loads
+            extra_patterns: Additional Network.setBlockedURLs patterns
+        """
+        self.rules = tuple(rules)
+        self.patterns = [p for name in self.rules for p in RULE_SETS[name]] + list(extra_patterns)
+        self.enabled = bool(self.patterns)
+        self.verified = False  # a filtered page produced links
+        self.fell_back = False
+        self.pages = []
+        self._blocking = set()  # id() of browsers with the patterns installed
+        self._lock = threading.Lock()
+
+    def apply(self, driver):
+        """Install (or, when disabled, clear) the blocked patterns on a browser"""
+        driver.execute_cdp_cmd("Network.enable", {})
+        self._block(driver, self.enabled)
+        # Events of earlier navigations would be counted against the first page
+        read_network_log(driver)
+
+    def _block(self, driver, on):
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns if on else []})
+        with self._lock:
+            if on:
+                self._blocking.add(id(driver))
+            else:
+                self._blocking.discard(id(driver))
+
+    def _reload_unfiltered(self, driver, page_ready):
+        self._block(driver, False)
+        driver.refresh()
+        if page_ready:
+            page_ready.wait(driver)
+
+    def wrap(self, extract, page_ready=None):
+        """
+        extract(driver) with per-page stats and the fall back to full loading
+
+        Args:
+            page_ready: PageReady waited on after a reload without blocking
+        """
+        def wrapped(driver):
+            if not self.enabled and id(driver) in self._blocking:
+                # Another browser found out the filter breaks extraction
+                self._reload_unfiltered(driver, page_ready)
+            links = extract(driver)
+            self._record(driver, len(links))
+            if links or not self.enabled or self.verified:
+                if links and self.enabled:
+                    self.verified = True
+                return links
+            # Nothing found on a filtered page: is the filter to blame?
+            self._reload_unfiltered(driver, page_ready)
+            links = extract(driver)
+            self._record(driver, len(links))
+            if links:
+                self.enabled = False
+                self.fell_back = True
+            else:
+                # A genuinely empty page (past the end of the list)
+                self._block(driver, True)
+            return links
+        return wrapped
+
+    def _record(self, driver, link_count):
+        stats = read_network_log(driver)
+        if stats is None:
+            return
+        stats.update({"url": driver.current_url, "links": link_count})
+        with self._lock:
+            self.pages.append(stats)
+
+    def stats(self):
+        with self._lock:
+            pages = list(self.pages)
+        total = sum(p["bytes"] for p in pages)
+        return {
+            "rules": list(self.rules),
+            "enabled": self.enabled,
+            "fell_back": self.fell_back,
+            "pages": len(pages),
+            "bytes": total,
+            "bytes_per_page": round(total / len(pages)) if pages else None,
+            "requests": sum(p["requests"] for p in pages),
+            "blocked": sum(p["blocked"] for p in pages),
+            "per_page": pages
+        }
+
+
+def read_network_log(driver):
+    """
+    Drain the browser's performance log
+
+    Returns:
+        Dict of bytes (transferred over the wire), requests and blocked
+        since the last read, None when the performance log is not enabled
+    """
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+    stats = {"bytes": 0, "requests": 0, "blocked": 0}
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            stats["requests"] += 1
+        elif method == "Network.loadingFinished":
+            stats["bytes"] += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and (
+                params.get("blockedReason") or "BLOCKED_BY_CLIENT" in params.get("errorText", "")):
+            stats["blocked"] += 1
+    return stats
+
+
+def _benchmark(url, rounds=3):
+    """Load a page with and without blocking on a local Chrome, cold cache each time"""
+    import time
+    from driver_pool import launch_chrome
+    from page_ready import PageReady
+
+    for label, rules in (("full", ()), ("lean", DEFAULT_RULES)):
+        net_filter = NetworkFilter(rules)
+        seconds = []
+        for _ in range(rounds):
+            driver = launch_chrome(network_log=True)
+            try:
+                net_filter.apply(driver)
+                driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+                started = time.perf_counter()
+                driver.get(url)
+                PageReady().wait(driver)
+                seconds.append(time.perf_counter() - started)
+                net_filter._record(driver, 0)
+            finally:
+                driver.quit()
+        stats = net_filter.stats()
+        print(f"  {label:<5} {min(seconds):6.2f}s best of {rounds}  "
+              f"{stats['bytes_per_page'] / 1e6:6.2f} MB/page  "
+              f"{stats['requests'] // rounds} requests, {stats['blocked'] // rounds} blocked")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    _benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 3)
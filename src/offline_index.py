@@ -0,0 +1,129 @@
+"""
+Offline MAL title index
+Resolves titles against a local MAL manga dump without touching the network
+"""
+
+import csv
+import json
+import os
+
+from jikan_client import MATCH_THRESHOLD, NO_MATCH
+from mal_cache import normalize_title
+from title_matcher import TrigramMatcher
+
+
+# Column names accepted in CSV dumps
+ID_COLUMNS = ("mal_id", "id", "manga_id")
+SYNONYM_COLUMNS = ("title_synonyms", "synonyms")
+
+
+def _split_synonyms(value):
+    """Synonyms come as a JSON list, a list, or a "|"/";" separated string"""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [v for v in value if v]
+    value = value.strip()
+    if value.startswith("["):
+        try:
+            return [v for v in json.loads(value) if v]
+        except ValueError:
+            pass
+    separator = "|" if "|" in value else ";"
+    return [v.strip() for v in value.split(separator) if v.strip()]
+
+
+def _entry_from_row(row):
+    """Normalize a dump row (Jikan-style or flat CSV) into an index entry"""
+    mal_id = next((row[c] for c in ID_COLUMNS if row.get(c)), None)
+    title = row.get("title") or ""
+    if not mal_id or not title:
+        return None
+    synonyms = []
+    for column in SYNONYM_COLUMNS:
+        synonyms.extend(_split_synonyms(row.get(column)))
+    # Jikan "titles": [{"type": "Default", "title": ...}, ...]
+    for item in row.get("titles") or []:
+        if isinstance(item, dict) and item.get("title"):
+            synonyms.append(item["title"])
+    return {
+        "mal_id": str(mal_id),
+        "title": title,
+        "title_english": row.get("title_english") or "",
+        "title_synonyms": synonyms
+    }
+
+
+class OfflineMALIndex:
+    """In-memory index of MAL titles, English titles and synonyms"""
+
+    def __init__(self, entries):
+        self.entries = [entry for entry in entries if entry is not None]
+        self.exact = {}
+
+        for position, entry in enumerate(self.entries):
+            for variant in self.variants(entry):
+                key = normalize_title(variant)
+                if key:
+                    self.exact.setdefault(key, position)
+
+        # Fuzzy lookups only score the entries sharing the most trigrams
+        self.matcher = TrigramMatcher((entry, self.variants(entry)) for entry in self.entries)
+
+    @staticmethod
+    def variants(entry):
+        return [entry["title"], entry["title_english"]] + entry["title_synonyms"]
+
+    @classmethod
+    def load(cls, path):
+        """
+        Build the index from a JSON or CSV dump
+
+        JSON may be a list of entries or a Jikan-style {"data": [...]} object.
+        CSV needs an id column (mal_id/id) and title, optionally title_english
+        and synonyms.
+        """
+        if path.lower().endswith(".csv"):
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                rows = list(csv.DictReader(f))
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            rows = data.get("data", []) if isinstance(data, dict) else data
+        return cls(_entry_from_row(row) for row in rows)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def resolve(self, title, threshold=MATCH_THRESHOLD):
+        """
+        Match a title offline
+
+        Returns:
+            (mal_id, mal_title, score), or NO_MATCH when the index is not confident
+        """
+        key = normalize_title(title)
+        if not key:
+            return NO_MATCH
+
+        position = self.exact.get(key)
+        if position is not None:
+            entry = self.entries[position]
+            return entry["mal_id"], entry["title"], 1.0
+
+        entry, score = self.matcher.match(title, threshold)
+        if entry is None:
+            return NO_MATCH
+        return entry["mal_id"], entry["title"], score
+
+
+_loaded = {}
+
+
+def load_index(path):
+    """Load a dump once per process, reloading when the file changes"""
+    mtime = os.path.getmtime(path)
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        _loaded[path] = (mtime, OfflineMALIndex.load(path))
+    return _loaded[path][1]
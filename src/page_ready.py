@@ -0,0 +1,133 @@
+"""
+Page readiness detection
+Waits for title links and a stable DOM instead of sleeping a fixed time per page
+"""
+
+import threading
+import time
+
+
+TITLE_LINK_SELECTOR = "a[href*='/title/']"
+
+# One round trip per poll: link count, DOM size, spinner and document state
+_SNAPSHOT_JS = """
+return [
+    document.querySelectorAll(arguments[0]).length,
+    document.getElementsByTagName('*').length,
+    document.getElementsByClassName('loading-spinner').length,
+    document.readyState
+];
+"""
+
+
+class PageReady:
+    """
+    Readiness waiter with a timeout learned from recent pages
+
+    A page is ready once it has matching links, no loading spinner and its
+    DOM has not changed for `settle` seconds. A page that finished loading
+    without any link (e.g. past the last follows page) is ready after
+    `empty_settle` seconds of quiet. One waiter can be shared by the
+    shard threads: the learned timeout and the stats are updated under a
+    lock.
+    """
+
+    def __init__(self, selector=TITLE_LINK_SELECTOR, min_timeout=5.0, max_timeout=30.0,
+                 settle=0.3, empty_settle=1.5, poll=0.1, alpha=0.3, factor=4.0):
+        """
+        Args:
+            selector: CSS selector of the content that marks a loaded page
+            min_timeout / max_timeout: Bounds of the adaptive timeout
+            settle: Seconds the DOM must stay unchanged once links are present
+            empty_settle: Same, for a loaded page without links
+            poll: Polling interval in seconds
+            alpha: EWMA weight of the latest time-to-ready
+            factor: Timeout as a multiple of the EWMA
+        """
+        self.selector = selector
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.settle = settle
+        self.empty_settle = empty_settle
+        self.poll = poll
+        self.alpha = alpha
+        self.factor = factor
+        self.ewma = None
+        self.timings = []
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        """Current timeout: a multiple of recent load times, within bounds"""
+        with self._lock:
+            ewma = self.ewma
+        if ewma is None:
+            return self.max_timeout
+        return max(self.min_timeout, min(self.max_timeout, ewma * self.factor))
+
+    def wait(self, driver, timeout=None):
+        """
+        Block until the current page is ready or the timeout expires
+
+        Returns:
+            (seconds_to_ready, link_count), seconds is None on timeout
+        """
+        timeout = timeout or self.timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        last = None
+        stable_since = started
+        links = 0
+
+        while True:
+            now = time.monotonic()
+            try:
+                links, elements, spinners, state = driver.execute_script(_SNAPSHOT_JS, self.selector)
+            except Exception:
+                # Navigation in progress, the document is being replaced
+                links, elements, spinners, state = 0, 0, 1, "loading"
+
+            snapshot = (links, elements, spinners, state)
+            if snapshot != last:
+                last = snapshot
+                stable_since = now
+            quiet = now - stable_since
+
+            if state == "complete" and not spinners:
+                if (links and quiet >= self.settle) or (not links and quiet >= self.empty_settle):
+                    return self._record(now - started), links
+
+            if now >= deadline:
+                with self._lock:
+                    self.timeouts += 1
+                return None, links
+            time.sleep(self.poll)
+
+    def _record(self, elapsed):
+        with self._lock:
+            self.timings.append(elapsed)
+            if self.ewma is None:
+                self.ewma = elapsed
+            else:
+                self.ewma = self.alpha * elapsed + (1 - self.alpha) * self.ewma
+        return elapsed
+
+    def stats(self):
+        """Time-to-ready summary for the pages waited on so far"""
+        with self._lock:
+            timings = list(self.timings)
+            timeouts = self.timeouts
+        if not timings:
+            return {"pages": 0, "timeouts": timeouts}
+        return {
+            "pages": len(timings),
+            "avg_ready": round(sum(timings) / len(timings), 3),
+            "max_ready": round(max(timings), 3),
+            "timeouts": timeouts
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.timings = []
+            self.timeouts = 0
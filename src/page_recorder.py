@@ -0,0 +1,252 @@
+"""
+Recorded pages
+Saves fetched follows/latest pages (gzip, indexed by URL) and replays them without MangaPark
+
+Record by setting recordPages (desktop) or RECORD_DIR (export script) to
+a folder. Replay with replayPages, or benchmark an archive offline:
+
+    python src/page_recorder.py ARCHIVE_DIR [rounds]
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from http_engine import graphql_archive_url
+
+
+INDEX_NAME = "index.json"
+
+
+def archive_key(url):
+    """Path and query of a URL: recordings replay on any host"""
+    parts = urlsplit(url)
+    return parts.path + ("?" + parts.query if parts.query else "")
+
+
+class PageArchive:
+    """
+    Folder of gzip-compressed responses with a JSON index
+
+    index.json maps archive_key(url) to the file name, original URL,
+    content type, status and recording time. A URL recorded twice keeps
+    the latest response.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.index = {}
+        index_path = os.path.join(path, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, url):
+        return archive_key(url) in self.index
+
+    def record(self, url, body, content_type="text/html", status=200):
+        """Save one response body (str) and update the index"""
+        key = archive_key(url)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".gz"
+        data = gzip.compress(body.encode("utf-8"))
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, name), "wb") as f:
+                f.write(data)
+            self.index[key] = {
+                "file": name,
+                "url": url,
+                "content_type": content_type,
+                "status": status,
+                "bytes": len(body),
+                "recorded": datetime.now().isoformat()
+            }
+            tmp_path = os.path.join(self.path, INDEX_NAME + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.index, f, indent=1)
+            os.replace(tmp_path, os.path.join(self.path, INDEX_NAME))
+
+    def get(self, url):
+        """
+        Returns:
+            (body, entry) for a recorded URL, None if it was never recorded
+        """
+        entry = self.index.get(archive_key(url))
+        if entry is None:
+            return None
+        with open(os.path.join(self.path, entry["file"]), "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8"), entry
+
+    def pages(self, content_type="text/html"):
+        """(url, body) of every recorded response of a content type, in URL order"""
+        for key in sorted(self.index):
+            entry = self.index[key]
+            if entry["content_type"] == content_type:
+                yield entry["url"], self.get(key)[0]
+
+
+def recording_extract(archive, extract):
+    """Wrap an extract(driver) function so every page it reads is recorded first"""
+    def wrapped(driver):
+        archive.record(driver.current_url, driver.page_source)
+        return extract(driver)
+    return wrapped
+
+
+class ReplayResponse:
+    """The part of requests.Response the scrapers use"""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class ReplaySession:
+    """
+    requests.Session stand-in answering from an archive
+
+    GraphQL posts are looked up by the key the HTTP engine recorded them
+    under; unrecorded URLs get a 404.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.headers = {}
+        self.cookies = _NoCookies()
+
+    def get(self, url, **kwargs):
+        return self._respond(url)
+
+    def post(self, url, json=None, **kwargs):
+        return self._respond(graphql_archive_url(url, json or {}))
+
+    def _respond(self, url):
+        found = self.archive.get(url)
+        if found is None:
+            return ReplayResponse(404, "")
+        body, entry = found
+        return ReplayResponse(entry["status"], body)
+
+
+class _NoCookies:
+    def set(self, name, value):
+        pass
+
+
+class ReplayServer:
+    """
+    Local HTTP stand-in serving an archive, for a real browser or client
+
+        with ReplayServer(archive) as server:
+            driver.get(server.base_url + "/my/follows?page=1")
+    """
+
+    def __init__(self, archive, port=0):
+        self.archive = archive
+        self.port = port
+        self.base_url = None
+        self.hits = 0
+        self.misses = 0
+        self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._serve(self.path)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    payload = {}
+                self._serve(graphql_archive_url(self.path, payload))
+
+            def _serve(self, url):
+                found = replay.archive.get(url)
+                if found is None:
+                    replay.misses += 1
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                replay.hits += 1
+                body, entry = found
+                data = body.encode("utf-8")
+                self.send_response(entry["status"])
+                self.send_header("Content-Type", entry["content_type"] + "; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _benchmark(path, rounds=20):
+    """Parser throughput on the recorded HTML pages and a replayed HTTP-engine pagination"""
+    import time
+    from follows_parser import available_backends, title_links
+    from http_engine import MangaParkHTTPEngine
+
+    archive = PageArchive(path)
+    pages = list(archive.pages())
+    print(f"{len(archive)} recorded responses, {len(pages)} HTML pages in {path}")
+
+    if pages:
+        total_bytes = sum(len(body) for _, body in pages)
+        for backend in available_backends():
+            started = time.perf_counter()
+            for _ in range(rounds):
+                links = sum(len(title_links(body, backend=backend)) for _, body in pages)
+            elapsed = time.perf_counter() - started
+            print(f"  {backend.name:<12} {rounds * len(pages) / elapsed:8.1f} pages/s  "
+                  f"{rounds * total_bytes / elapsed / 1e6:6.1f} MB/s  {links} links per pass")
+
+    if any(entry["content_type"] == "application/json" for entry in archive.index.values()):
+        with ReplayServer(archive) as server:
+            started = time.perf_counter()
+            engine = MangaParkHTTPEngine({"skey": "replay", "tfv": "replay"}, base_url=server.base_url)
+            results = engine.scrape()
+            elapsed = time.perf_counter() - started
+        print(f"  http engine  {len(results)} titles, {engine.requests} requests "
+              f"in {elapsed * 1000:.0f} ms over the local stand-in")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    _benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 20)
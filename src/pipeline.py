@@ -0,0 +1,187 @@
+"""
+Streaming export pipeline
+Runs scraping, MAL enrichment and file writing as concurrent stages joined by bounded queues
+"""
+
+import queue
+import threading
+import time
+
+
+_END = object()
+
+
+class PipelineAborted(Exception):
+    """Raised inside a stage once another stage has failed"""
+
+
+class Pipeline:
+    """
+    Source and stages each run in their own thread
+
+    Batches (e.g. the new titles of one follows page) flow through queues
+    holding at most `depth` batches, so a stage that gets ahead blocks
+    instead of piling up work: wall time tends to the slowest stage rather
+    than the sum of all of them, and memory stays bounded by the queues.
+    The first exception raised by any stage stops the others and is
+    re-raised by run().
+    """
+
+    def __init__(self, source, stages, depth=4):
+        """
+        Args:
+            source: (name, fn(emit)), fn calls emit(batch) for every batch it produces
+            stages: List of (name, fn(batch)); each return value is passed to the
+                next stage (falsy values are dropped), the last one is ignored
+            depth: Batches buffered between two stages
+        """
+        self.source = source
+        self.stages = stages
+        self.depth = depth
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._error = None
+        self.busy = {}
+        self.items = {}
+
+    def run(self):
+        """
+        Run every stage to completion
+
+        Returns:
+            Stats dict: wall and per-stage busy seconds, items per stage
+
+        Raises:
+            The first exception raised by a stage
+        """
+        names = [self.source[0]] + [name for name, _ in self.stages]
+        self.busy = dict.fromkeys(names, 0.0)
+        self.items = dict.fromkeys(names, 0)
+        self._stop.clear()
+        self._error = None
+        queues = [queue.Queue(maxsize=self.depth) for _ in self.stages]
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=self._run_source, args=(queues[0],), daemon=True)]
+        for i, (name, fn) in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(queues) else None
+            threads.append(threading.Thread(
+                target=self._run_stage, args=(name, fn, queues[i], outbox), daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.monotonic() - started
+
+        if self._error is not None:
+            raise self._error
+
+        serial = sum(self.busy.values())
+        return {
+            "wall_seconds": round(wall, 2),
+            "serial_seconds": round(serial, 2),
+            "overlap": round(serial / wall, 2) if wall else 1.0,
+            "depth": self.depth,
+            "stages": [
+                {"stage": name, "seconds": round(self.busy[name], 2), "items": self.items[name]}
+                for name in names
+            ]
+        }
+
+    def _run_source(self, outbox):
+        name, fn = self.source
+        blocked = [0.0]
+
+        def emit(batch):
+            if not batch:
+                return
+            waited = time.monotonic()
+            self._put(outbox, batch)
+            # Time spent waiting on a full queue is not work
+            blocked[0] += time.monotonic() - waited
+            self.items[name] += len(batch)
+
+        started = time.monotonic()
+        try:
+            fn(emit)
+            self._put(outbox, _END)
+        except PipelineAborted:
+            pass
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self.busy[name] = time.monotonic() - started - blocked[0]
+
+    def _run_stage(self, name, fn, inbox, outbox):
+        try:
+            while True:
+                batch = self._get(inbox)
+                if batch is _END:
+                    if outbox is not None:
+                        self._put(outbox, _END)
+                    return
+                started = time.monotonic()
+                result = fn(batch)
+                self.busy[name] += time.monotonic() - started
+                self.items[name] += len(batch)
+                if outbox is not None and result:
+                    self._put(outbox, result)
+        except PipelineAborted:
+            pass
+        except Exception as e:
+            self._fail(e)
+
+    def _put(self, q, item):
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q):
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _fail(self, error):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+
+def _simulation(pages=8, page_seconds=0.2, title_seconds=0.03, per_page=6, depth=2):
+    """Compare sequential stages with the pipeline on simulated latencies"""
+    def scrape(emit):
+        for page in range(pages):
+            time.sleep(page_seconds)
+            emit([f"Title {page}-{n}" for n in range(per_page)])
+
+    def enrich(batch):
+        time.sleep(title_seconds * len(batch))
+        return batch
+
+    written = []
+
+    def write(batch):
+        time.sleep(0.01)
+        written.extend(batch)
+
+    sequential = pages * (page_seconds + title_seconds * per_page + 0.01)
+    stats = Pipeline(("scrape", scrape), [("enrich", enrich), ("write", write)], depth=depth).run()
+    print(f"{len(written)} titles, sequential {sequential:.2f}s, pipeline {stats['wall_seconds']:.2f}s "
+          f"(overlap {stats['overlap']:.2f}x)")
+    for stage in stats["stages"]:
+        print(f"  {stage['stage']:<8} busy {stage['seconds']:.2f}s  {stage['items']} items")
+
+
+if __name__ == "__main__":
+    _simulation()
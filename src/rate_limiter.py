@@ -0,0 +1,123 @@
+"""
+Token-bucket rate limiting
+Shared limiters so every MAL lookup path stays within the API budget
+"""
+
+import threading
+import time
+
+
+# Published Jikan v4 limits
+JIKAN_PER_SECOND = 3
+JIKAN_PER_MINUTE = 60
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens/second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def reserve(self, now):
+        """
+        Take one token, going into debt if the bucket is empty
+
+        Returns:
+            Seconds to wait before the reserved token may be used
+        """
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Combination of token buckets (e.g. per-second and per-minute budgets)
+
+    Only the reservation happens under the lock, callers sleep outside of it
+    so concurrent workers overlap their network latency.
+    """
+
+    def __init__(self, per_second=None, per_minute=None):
+        self._lock = threading.Lock()
+        self.per_second = None
+        self.per_minute = None
+        self.buckets = []
+        self.waited = 0.0
+        self.acquired = 0
+        self.set_rate(per_second, per_minute)
+
+    def set_rate(self, per_second=None, per_minute=None):
+        """Rebuild the buckets if the budgets changed"""
+        with self._lock:
+            if (per_second, per_minute) == (self.per_second, self.per_minute):
+                return
+            self.per_second = per_second
+            self.per_minute = per_minute
+            self.buckets = []
+            if per_second:
+                self.buckets.append(TokenBucket(per_second, max(1, per_second)))
+            if per_minute:
+                self.buckets.append(TokenBucket(per_minute / 60.0, per_minute))
+
+    def reserve(self):
+        """Reserve a slot, returns the delay in seconds before it may be used"""
+        with self._lock:
+            now = time.monotonic()
+            delay = max([bucket.reserve(now) for bucket in self.buckets] or [0.0])
+            self.acquired += 1
+            self.waited += delay
+            return delay
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def reset_stats(self):
+        self.waited = 0.0
+        self.acquired = 0
+
+    def stats(self):
+        return {
+            "requests": self.acquired,
+            "throttled_seconds": round(self.waited, 2)
+        }
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_limiter(name, per_second=None, per_minute=None):
+    """
+    Process-wide limiter for an API, created on first use
+
+    Passing budgets for an existing limiter updates it in place.
+    """
+    with _shared_lock:
+        limiter = _shared.get(name)
+        if limiter is None:
+            limiter = _shared[name] = RateLimiter(per_second, per_minute)
+        elif per_second or per_minute:
+            limiter.set_rate(per_second, per_minute)
+        return limiter
+
+
+def jikan_limiter(per_second=None):
+    """Shared limiter for api.jikan.moe (3 req/s and 60 req/min by default)"""
+    with _shared_lock:
+        existing = _shared.get("jikan")
+    if existing is not None and not per_second:
+        return existing
+    per_second = min(per_second or JIKAN_PER_SECOND, JIKAN_PER_SECOND)
+    return shared_limiter("jikan", per_second, JIKAN_PER_MINUTE)
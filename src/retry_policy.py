@@ -0,0 +1,194 @@
+"""
+Retry policy for Jikan/MAL requests
+Honors Retry-After, backs off exponentially with jitter and caps total retry time
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ThrottledError(Exception):
+    """Raised when a request is still rate limited after every retry"""
+
+    def __init__(self, url, retry_after=None):
+        super().__init__(f"Rate limited by {url}")
+        self.url = url
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Retry-After header as seconds (accepts delta-seconds or an HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Retries throttled and transient failures, counting attempts per request"""
+
+    def __init__(self, max_retries=3, timeout=30, base_delay=1.0, max_delay=30.0,
+                 max_total=120.0, limiter=None):
+        """
+        Args:
+            max_retries: Retries after the first attempt
+            timeout: Per-attempt request timeout in seconds
+            base_delay: First backoff delay, doubled on each retry
+            max_delay: Upper bound of a single backoff delay
+            max_total: Upper bound of the time spent retrying one request
+            limiter: Optional RateLimiter acquired before every attempt
+        """
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_total = max_total
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @classmethod
+    def from_settings(cls, settings, limiter=None):
+        """Build a policy from the app's maxRetries/requestTimeout settings"""
+        return cls(
+            max_retries=int(settings.get('maxRetries', 3)),
+            timeout=float(settings.get('requestTimeout', 30)),
+            limiter=limiter
+        )
+
+    def backoff(self, retry, retry_after=None):
+        """Delay before the given retry (1-based): Retry-After, else exponential with jitter"""
+        if retry_after is not None:
+            return min(retry_after, self.max_total)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def get(self, url, session=None, **kwargs):
+        """
+        GET with retries
+
+        Returns:
+            The final response (possibly a non-retryable error status)
+
+        Raises:
+            ThrottledError: Still 429 after every retry or past max_total
+            requests.RequestException: Network failure on the last attempt
+        """
+        http = session or requests
+        kwargs.setdefault("timeout", self.timeout)
+        deadline = time.monotonic() + self.max_total
+        attempt = 0
+
+        while True:
+            attempt += 1
+            if self.limiter is not None:
+                self.limiter.acquire()
+
+            error = None
+            response = None
+            try:
+                response = http.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            if error is None and response.status_code not in RETRYABLE_STATUS:
+                self._record(attempt)
+                return response
+
+            retry_after = None
+            if response is not None:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    with self._lock:
+                        self.throttled += 1
+
+            delay = self.backoff(attempt, retry_after)
+            out_of_time = time.monotonic() + delay > deadline
+            if attempt > self.max_retries or out_of_time:
+                self._record(attempt, failed=True)
+                if response is not None and response.status_code == 429:
+                    raise ThrottledError(url, retry_after or delay)
+                if error is not None:
+                    raise error
+                return response
+
+            time.sleep(delay)
+
+    def _record(self, attempts, failed=False):
+        with self._lock:
+            self.attempts[attempts] += 1
+            if failed:
+                self.gave_up += 1
+
+    def record_requeue(self, count):
+        with self._lock:
+            self.requeued += count
+
+    def reset_stats(self):
+        with self._lock:
+            self.attempts = Counter()
+            self.throttled = 0
+            self.gave_up = 0
+            self.requeued = 0
+
+    def stats(self):
+        """Per-attempt counts, e.g. {"1": 120, "2": 4} requests succeeded/ended on that attempt"""
+        with self._lock:
+            return {
+                "attempts": {str(k): v for k, v in sorted(self.attempts.items())},
+                "retries": sum((k - 1) * v for k, v in self.attempts.items()),
+                "throttled": self.throttled,
+                "gave_up": self.gave_up,
+                "requeued": self.requeued
+            }
+
+
+def process_with_requeue(items, handle, policy=None, max_rounds=2, on_requeue=None):
+    """
+    Call handle(item) for every item, requeueing the ones that raise ThrottledError
+
+    Throttled items are retried in later rounds, after waiting for the longest
+    Retry-After seen, instead of being dropped.
+
+    Returns:
+        Items still throttled after max_rounds requeues
+    """
+    pending = list(items)
+    for round_num in range(max_rounds + 1):
+        throttled = []
+        wait = 0.0
+        for item in pending:
+            try:
+                handle(item)
+            except ThrottledError as e:
+                throttled.append(item)
+                wait = max(wait, e.retry_after or 0.0)
+
+        if not throttled or round_num == max_rounds:
+            return throttled
+
+        if policy is not None:
+            policy.record_requeue(len(throttled))
+        if on_requeue:
+            on_requeue(throttled, wait)
+        time.sleep(wait)
+        pending = throttled
+    return []
@@ -0,0 +1,69 @@
+"""
+Session bootstrap
+Logs a browser in by setting the MangaPark cookies through DevTools before its first navigation
+"""
+
+from urllib.parse import urlsplit
+
+from http_engine import DEFAULT_BASE_URL
+
+
+def cookie_domain(base_url):
+    """Cookie domain of a site root: the host and its subdomains (the bare host for IPs and localhost)"""
+    host = urlsplit(base_url).hostname
+    return host if host.replace(".", "").isdigit() or "." not in host else "." + host
+
+
+def cdp_cookies(cookies, base_url=DEFAULT_BASE_URL):
+    """
+    Network.setCookies parameters for a cookie dict
+
+    Args:
+        cookies: Dict of cookie name -> value; empty values are skipped
+        base_url: Site root the cookies belong to (its host and subdomains)
+
+    Returns:
+        List of CDP CookieParam dicts
+    """
+    secure = urlsplit(base_url).scheme == "https"
+    domain = cookie_domain(base_url)
+    params = []
+    for name, value in cookies.items():
+        if not value:
+            continue
+        params.append({
+            "name": name,
+            "value": str(value),
+            "domain": domain,
+            "path": "/",
+            "secure": secure
+        })
+    return params
+
+
+def bootstrap_session(driver, cookies, base_url=DEFAULT_BASE_URL, mirrors=()):
+    """
+    Put the session cookies in a browser without loading a page
+
+    driver.add_cookie() only works for the domain currently loaded, which
+    costs an unauthenticated load of the site and a refresh. DevTools sets
+    cookies for any domain from about:blank, so the first navigation is
+    already logged in. A browser restored from a profile that holds the
+    cookies simply gets them overwritten with the same values.
+
+    Args:
+        driver: Chrome WebDriver (any page, typically about:blank)
+        cookies: Dict of cookie name -> value (skey, tfv, theme, wd...)
+        base_url: Site root the cookies are set for
+        mirrors: Other site roots getting the same cookies, so the browser
+            stays logged in after a mirror failover
+
+    Returns:
+        Number of cookies set
+    """
+    params = []
+    for url in dict.fromkeys((base_url,) + tuple(mirrors)):
+        params.extend(cdp_cookies(cookies, url))
+    if params:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+    return len(params)
@@ -0,0 +1,330 @@
+"""
+Sharded follows scraping
+Fetches follows pages on several browsers at once and merges them in page order
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from follows_parser import link_key
+from page_ready import PageReady
+
+
+# Highest ?page=N among the pagination links of the current page
+_PAGE_COUNT_JS = """
+var max = 0;
+document.querySelectorAll("a[href*='page=']").forEach(function (a) {
+    var m = a.href.match(/[?&]page=(\\d+)/);
+    if (m) { max = Math.max(max, parseInt(m[1], 10)); }
+});
+return max;
+"""
+
+
+def estimate_page_count(driver):
+    """Page count from the pagination on the current page, None if there is none"""
+    try:
+        count = driver.execute_script(_PAGE_COUNT_JS)
+    except Exception:
+        return None
+    return int(count) if count else None
+
+
+class PageMerger:
+    """
+    Incremental merge_pages()
+
+    Pages may arrive in any order; a page's new records are released as soon
+    as every page before it is in, so they can be processed while later pages
+    are still loading.
+    """
+
+    def __init__(self, first_page=1):
+        self._pending = {}
+        self._next = first_page
+        self._seen = set()
+        self.done = False
+        self.duplicates = 0  # links of a series already released by an earlier page
+        self.last_page = first_page - 1  # last page merged
+
+    def add(self, page, links):
+        """
+        Returns:
+            List of {"title", "url"} dicts released by this page (possibly empty)
+        """
+        self._pending[page] = links
+        released = []
+        while not self.done and self._next in self._pending:
+            released.extend(self._take(self._next))
+            self._next += 1
+        return released
+
+    def flush(self):
+        """Release pages still waiting behind a missing one, in page order"""
+        released = []
+        for page in sorted(self._pending):
+            if self.done:
+                break
+            released.extend(self._take(page))
+        self._pending.clear()
+        return released
+
+    def _take(self, page):
+        new = []
+        self.last_page = max(self.last_page, page)
+        for title, url in self._pending.pop(page):
+            key = link_key(url)
+            if key in self._seen:
+                self.duplicates += 1
+            else:
+                self._seen.add(key)
+                new.append({"title": title, "url": url})
+        if not new:
+            # Past the end of the list
+            self.done = True
+        return new
+
+
+def merge_pages(pages):
+    """
+    Merge per-page links in page order with a global dedupe on the title ID
+
+    Stops at the first page that adds nothing new, like the serial loop.
+
+    Args:
+        pages: Dict of page number -> list of (title, url)
+
+    Returns:
+        List of {"title", "url"} dicts
+    """
+    merger = PageMerger(min(pages, default=1))
+    results = []
+    for page in sorted(pages):
+        results.extend(merger.add(page, pages[page]))
+    return results + merger.flush()
+
+
+class ShardedScraper:
+    """
+    Splits follows pages across N browsers
+
+    Page 1 is loaded first to estimate the page count from its pagination,
+    which decides how many shards are worth starting. Shards then pull page
+    numbers from a shared counter, so a slow page does not hold up a whole
+    range. The estimate is only a hint (pagination may show a window of
+    pages): the first page adding no new title ends the run.
+    """
+
+    def __init__(self, pool, prepare, extract, page_url, shards=3, max_pages=100,
+                 page_ready=None, on_page=None, on_records=None, start_page=1, governor=None,
+                 on_error=None):
+        """
+        Args:
+            pool: DriverPool the shard browsers are checked out from
+            prepare: Function(driver) that logs a fresh browser in (cookies)
+            extract: Function(driver) -> list of (title, url) on the current page
+            page_url: URL template with a {page} placeholder, or a function(page) -> URL
+                (read on every load, so the site can change mid-run)
+            shards: Browsers used in parallel
+            max_pages: Upper bound of pages fetched
+            page_ready: PageReady shared by the shards
+            on_page: Optional callback(page, link_count, seconds, shard)
+            on_records: Optional callback(records, last_page) with merged records as
+                soon as every earlier page is in (called in page order); returning
+                True stops paging after last_page
+            start_page: First page fetched (resuming an interrupted scrape)
+            governor: Optional MemoryGovernor; a browser over its budget is quit
+                and replaced by a freshly prepared one before its next page
+            on_error: Optional callback(url, error) for a page load that raised;
+                returning True (e.g. it moved to another mirror) reloads the page
+                right away
+        """
+        self.pool = pool
+        self.prepare = prepare
+        self.extract = extract
+        self.page_url = page_url
+        self.shards = max(1, shards)
+        self.max_pages = max_pages
+        self.page_ready = page_ready or PageReady()
+        self.on_page = on_page
+        self.on_records = on_records
+        self.start_page = max(1, start_page)
+        self.governor = governor
+        self.on_error = on_error
+        self._merger = PageMerger(self.start_page)
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def _fetch(self, driver, page, shard):
+        started = time.monotonic()
+        url = self._url(page)
+        try:
+            driver.get(url)
+        except Exception as e:
+            if not (self.on_error and self.on_error(url, e)):
+                raise
+            driver.get(self._url(page))
+        self.page_ready.wait(driver)
+        links = self.extract(driver)
+        elapsed = time.monotonic() - started
+        if self.governor:
+            self.governor.page_loaded(driver)
+        if self.on_page:
+            self.on_page(page, len(links), elapsed, shard)
+        return links, elapsed
+
+    def _url(self, page):
+        return self.page_url(page) if callable(self.page_url) else self.page_url.format(page=page)
+
+    def _recycle(self, driver):
+        """Quit a browser and check out a logged-in replacement (the old one is gone even on failure)"""
+        self.governor.recycled(driver)
+        self.pool.discard(driver)
+        driver = self.pool.acquire()
+        try:
+            self.prepare(driver)
+        except Exception:
+            self.pool.discard(driver)
+            raise
+        return driver
+
+    def _return(self, driver):
+        if self.governor and self.governor.over_memory(driver):
+            # A bloated browser is not worth keeping warm
+            self.governor.recycled(driver)
+            self.pool.discard(driver)
+        else:
+            self.pool.release(driver)
+
+    def _release(self, page, links, state=None):
+        # Called with the lock held so records go out in page order
+        records = self._merger.add(page, links)
+        stop = bool(records and self.on_records and self.on_records(records, self._merger.last_page))
+        if stop:
+            self._merger.done = True
+            self._stopped = True
+        if self._merger.done and state is not None:
+            # last_page added nothing new (or the caller stopped there): the
+            # serial loop would not have gone further
+            state["limit"] = min(state["limit"], self._merger.last_page)
+        return stop
+
+    def scrape(self):
+        """
+        Returns:
+            (results, stats): merged {"title", "url"} records and timing stats
+        """
+        started = time.monotonic()
+        pages = {}
+        page_times = {}
+        shard_stats = [{"shard": i, "pages": 0, "seconds": 0.0} for i in range(self.shards)]
+
+        start = self.start_page
+        first = self.pool.acquire()
+        try:
+            self.prepare(first)
+            links, elapsed = self._fetch(first, start, 0)
+        except Exception:
+            self.pool.release(first)
+            raise
+        # Browser launch (if none was warm) included
+        first_page_seconds = time.monotonic() - started
+        self._merger = PageMerger(start)
+        self._stopped = False
+        pages[start] = links
+        page_times[start] = elapsed
+        self._release(start, links)
+        shard_stats[0]["pages"] += 1
+        shard_stats[0]["seconds"] += elapsed
+
+        estimated = estimate_page_count(first)
+        limit = self.max_pages if links and not self._merger.done else start
+        state = {"next": start + 1, "limit": limit}
+        failed = []
+        shards = self.shards
+        if estimated:
+            shards = max(1, min(shards, estimated - start))
+
+        def run(shard, driver):
+            try:
+                if driver is None:
+                    driver = self.pool.acquire()
+                    self.prepare(driver)
+                while True:
+                    with self._lock:
+                        page = state["next"]
+                        if page > state["limit"]:
+                            return
+                        state["next"] += 1
+                    if self.governor and self.governor.needs_recycle(driver):
+                        try:
+                            driver = self._recycle(driver)
+                        except Exception:
+                            driver = None
+                            with self._lock:
+                                failed.append(page)
+                            raise
+                    try:
+                        links, elapsed = self._fetch(driver, page, shard)
+                    except Exception:
+                        with self._lock:
+                            failed.append(page)
+                        raise
+                    with self._lock:
+                        pages[page] = links
+                        page_times[page] = elapsed
+                        shard_stats[shard]["pages"] += 1
+                        shard_stats[shard]["seconds"] += elapsed
+                        self._release(page, links, state)
+                        if not links:
+                            # Nothing exists past an empty page
+                            state["limit"] = min(state["limit"], page)
+            finally:
+                if driver is not None:
+                    self._return(driver)
+
+        if limit > start:
+            with ThreadPoolExecutor(max_workers=shards) as executor:
+                futures = [executor.submit(run, i, first if i == 0 else None) for i in range(shards)]
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"[WARN] Scrape shard failed: {e}")
+        else:
+            self._return(first)
+
+        # Pages lost with a failed shard are fetched again on one browser
+        retry = sorted(p for p in failed if p <= state["limit"])
+        if retry:
+            with self.pool.driver() as driver:
+                self.prepare(driver)
+                for page in retry:
+                    pages[page], page_times[page] = self._fetch(driver, page, 0)
+                    self._release(page, pages[page], state)
+        if not self._merger.done:
+            records = self._merger.flush()
+            if records and self.on_records:
+                self.on_records(records, self._merger.last_page)
+
+        wall = time.monotonic() - started
+        serial = sum(page_times.values())
+        stats = {
+            "shards": shards,
+            "pages": len(pages),
+            "estimated_pages": estimated,
+            "first_page_seconds": round(first_page_seconds, 2),
+            "duplicates": self._merger.duplicates,
+            # Past the last page: not stopped by on_records nor by max_pages
+            "reached_end": self._merger.done and not self._stopped,
+            "wall_seconds": round(wall, 2),
+            "serial_seconds": round(serial, 2),
+            "speedup": round(serial / wall, 2) if wall else 1.0,
+            "per_shard": [
+                {**s, "seconds": round(s["seconds"], 2)} for s in shard_stats[:shards]
+            ]
+        }
+        if self.governor:
+            stats["memory"] = self.governor.stats()
+        return merge_pages({p: links for p, links in pages.items() if p <= state["limit"]}), stats
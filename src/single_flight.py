@@ -0,0 +1,66 @@
+"""
+Single-flight lookups
+Titles that normalize to the same key share one request for the whole run
+"""
+
+import threading
+
+from mal_cache import normalize_title
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent and repeated calls for the same key into one
+
+    The first caller for a key runs the function, callers arriving while it
+    is in flight wait for its result, later callers get the stored result.
+    Failed calls are forgotten so a requeued title can try again.
+    """
+
+    def __init__(self, key=normalize_title):
+        self.key = key
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.saved = 0
+
+    def do(self, title, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per key, returning its (shared) result"""
+        key = self.key(title)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self._calls.pop(key, None)
+                raise
+            finally:
+                call.done.set()
+            with self._lock:
+                self.calls += 1
+            return call.result
+
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        with self._lock:
+            self.saved += 1
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {"network_calls": self.calls, "calls_saved": self.saved}
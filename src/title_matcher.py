@@ -0,0 +1,164 @@
+"""
+Trigram title matcher
+Character-trigram inverted index for candidate retrieval before fuzzy scoring
+
+Run `python src/title_matcher.py` for a lookups/second benchmark at
+10k, 100k and 1M catalog sizes.
+"""
+
+from array import array
+from collections import Counter, defaultdict
+
+from mal_cache import normalize_title
+from similarity import MATCH_THRESHOLD, score_matrix
+
+
+# Grams present in more than this share of the catalog carry little signal
+STOP_GRAM_RATIO = 0.05
+
+# Postings scanned per lookup before the remaining (common) grams are skipped
+SCAN_BUDGET = 20000
+MIN_GRAMS = 4
+
+
+def trigrams(key):
+    """Character trigrams of a normalized title, padded so short titles still match"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramMatcher:
+    """
+    Inverted index from trigrams to title variants
+
+    Each catalog item carries several variants (title, English title,
+    synonyms). Lookups rank variants by shared-gram count and run the full
+    similarity score only on the top k.
+    """
+
+    def __init__(self, items, top_k=20):
+        """
+        Args:
+            items: Iterable of (payload, [variant, ...])
+            top_k: Candidates scored per lookup
+        """
+        self.top_k = top_k
+        self.payloads = []
+        self.variant_owner = array("I")
+        self.variant_text = []
+        self.variant_grams = array("H")
+        postings = defaultdict(lambda: array("I"))
+
+        for payload, variants in items:
+            owner = len(self.payloads)
+            self.payloads.append(payload)
+            for variant in dict.fromkeys(v for v in variants if v):
+                key = normalize_title(variant)
+                if not key:
+                    continue
+                variant_id = len(self.variant_text)
+                grams = trigrams(key)
+                self.variant_owner.append(owner)
+                self.variant_text.append(variant.lower())
+                self.variant_grams.append(min(len(grams), 65535))
+                for gram in grams:
+                    postings[gram].append(variant_id)
+
+        self.postings = dict(postings)
+        self.stop_size = max(1000, int(len(self.variant_text) * STOP_GRAM_RATIO))
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def candidates(self, query, k=None):
+        """
+        Top-k variant ids by shared trigrams (normalized by the variant's gram count)
+
+        Returns:
+            List of (variant_id, shared_grams)
+        """
+        key = normalize_title(query)
+        if not key:
+            return []
+        grams = sorted((self.postings[g] for g in trigrams(key) if g in self.postings), key=len)
+        # Skip stop-grams unless they are all we have
+        selective = [p for p in grams if len(p) <= self.stop_size] or grams[:1]
+
+        # Rarest grams first, stopping once the scan budget is spent
+        counts = Counter()
+        scanned = 0
+        for used, posting in enumerate(selective):
+            if used >= MIN_GRAMS and scanned + len(posting) > SCAN_BUDGET:
+                break
+            scanned += len(posting)
+            counts.update(posting)
+
+        # Shortlist by raw overlap, then rank by overlap relative to both lengths
+        k = k or self.top_k
+        query_grams = len(grams)
+        ranked = sorted(
+            counts.most_common(k * 4),
+            key=lambda item: item[1] / (query_grams + self.variant_grams[item[0]] - item[1]),
+            reverse=True
+        )
+        return ranked[:k]
+
+    def match(self, query, threshold=MATCH_THRESHOLD):
+        """
+        Best catalog item for a query
+
+        Returns:
+            (payload, score) or (None, 0) when nothing beats the threshold
+        """
+        variant_ids = [variant_id for variant_id, _ in self.candidates(query)]
+        scores = score_matrix([query], [self.variant_text[v] for v in variant_ids])[0]
+        best_owner = None
+        best_score = 0
+        for variant_id, score in zip(variant_ids, scores):
+            if score > best_score:
+                best_score = score
+                best_owner = self.variant_owner[variant_id]
+
+        if best_owner is not None and best_score > threshold:
+            return self.payloads[best_owner], best_score
+        return None, 0
+
+    def match_many(self, queries, threshold=MATCH_THRESHOLD):
+        """Batch version of match(), results in query order"""
+        return [self.match(query, threshold) for query in queries]
+
+
+def _benchmark(sizes=(10_000, 100_000, 1_000_000), queries=500):
+    """Print build time and lookups/second for synthetic catalogs"""
+    import random
+    import time
+
+    rng = random.Random(42)
+    syllables = ["ka", "shi", "no", "ri", "yu", "ma", "to", "ken", "sei", "ou", "dan", "hime",
+                 "level", "up", "dragon", "sword", "the", "of", "hero", "night", "love", "academy"]
+
+    def make_title():
+        return " ".join("".join(rng.choice(syllables) for _ in range(rng.randint(1, 3)))
+                        for _ in range(rng.randint(2, 5)))
+
+    for size in sizes:
+        catalog = [make_title() for _ in range(size)]
+        started = time.perf_counter()
+        matcher = TrigramMatcher((i, [title]) for i, title in enumerate(catalog))
+        build = time.perf_counter() - started
+
+        # Queries are catalog titles with a typo, so a correct hit is known
+        picks = [rng.randrange(size) for _ in range(queries)]
+        probes = [catalog[i][:-1] + "x" for i in picks]
+        started = time.perf_counter()
+        results = matcher.match_many(probes)
+        elapsed = time.perf_counter() - started
+
+        hits = sum(1 for pick, (payload, _) in zip(picks, results) if payload == pick)
+        print(f"{size:>9,} titles | build {build:6.1f}s | "
+              f"{queries / elapsed:8.0f} lookups/s | recall {hits / queries:.1%}")
+
+
+if __name__ == "__main__":
+    import sys
+    _benchmark(tuple(int(s) for s in sys.argv[1:]) or (10_000, 100_000, 1_000_000))
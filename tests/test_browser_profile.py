@@ -0,0 +1,84 @@
+"""
+Browser profile tests
+Checks profile slots are exclusive across processes and prune() leaves held slots alone
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+from browser_profile import LOCK_NAME, ProfileStore
+
+
+# Another app instance: claims a slot, reports it, holds it until stdin closes
+_HOLDER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from browser_profile import ProfileStore
+store = ProfileStore(sys.argv[2])
+print(store.checkout(sys.argv[3]), flush=True)
+sys.stdin.read()
+"""
+
+
+class ProfileStoreTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.root = self._dir.name
+        self.holders = []
+
+    def tearDown(self):
+        for holder in self.holders:
+            holder.stdin.close()
+            holder.wait(timeout=30)
+            holder.stdout.close()
+        self._dir.cleanup()
+
+    def hold(self, account):
+        """Slot checked out by another process, held until tearDown"""
+        holder = subprocess.Popen([sys.executable, "-c", _HOLDER, SRC, self.root, account],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self.holders.append(holder)
+        return holder.stdout.readline().strip()
+
+    def test_slots_in_one_process(self):
+        store = ProfileStore(self.root)
+        first = store.checkout("acct")
+        second = store.checkout("acct")
+        self.assertNotEqual(first, second)
+        store.checkin(first)
+        self.assertEqual(store.checkout("acct"), first)
+        store.checkin(first)
+        store.checkin(second)
+
+    def test_slot_held_by_another_process(self):
+        held = self.hold("acct")
+        self.assertEqual(os.path.basename(held), "slot-0")
+        store = ProfileStore(self.root)
+        path = store.checkout("acct")
+        store.checkin(path)
+        self.assertEqual(os.path.basename(path), "slot-1")
+
+    def test_prune_skips_slot_held_by_another_process(self):
+        held = self.hold("acct")
+        store = ProfileStore(self.root, max_mb=0)
+        free = store.checkout("other")
+        store.checkin(free)
+        with open(os.path.join(held, "Preferences"), "w") as f:
+            f.write("x" * 1000)
+        store.prune()
+        self.assertTrue(os.path.exists(os.path.join(held, "Preferences")))
+        self.assertTrue(os.path.exists(os.path.join(held, LOCK_NAME)))
+        self.assertFalse(os.path.exists(free))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+"""
+Follows parser tests
+Checks the parser backends and the in-browser extraction (_LINKS_JS) on recorded pages
+
+_LINKS_JS itself runs in headless Chrome when one can be launched, and in
+Node.js (on a minimal DOM built from the page) when node is installed;
+those tests are skipped otherwise.
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+from urllib.parse import quote
+
+from bs4 import BeautifulSoup, Comment, NavigableString
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import follows_parser
+from follows_parser import available_backends, extract_links, parity_check, title_links, title_links_in_browser
+from page_ready import TITLE_LINK_SELECTOR
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_NAMES = ("follows_page.html", "latest_page.html")
+BASE_URL = "https://mangapark.io"
+
+FOLLOWS_PAGE_LINKS = [
+    ("One Piece", "https://mangapark.io/title/10953-en-one-piece"),
+    ("JujutsuKaisen", "https://mangapark.io/title/75577-en-jujutsu-kaisen"),
+    ("Dandadan", "https://mangapark.net/title/341986-en-dandadan"),
+    ("Blue&Lock[Official]", "https://mangapark.io/title/74012-en-blue-lock"),
+    ("Broken", "https://mangapark.io/title/cdn-error")
+]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class ScriptedDriver:
+    """
+    WebDriver stand-in returning precomputed script results
+
+    Only exercises what happens around the script (base_url, collapsing,
+    fallback), the pairs come from the html.parser backend.
+    """
+
+    def __init__(self, html):
+        self.page_source = html
+        self.scripts = 0
+
+    def execute_script(self, script, selector):
+        self.scripts += 1
+        return [[title, href] for title, href in available_backends()[-1].links(self.page_source, selector)]
+
+
+class BrokenDriver(ScriptedDriver):
+    def execute_script(self, script, selector):
+        raise RuntimeError("javascript error")
+
+
+# Runs a WebDriver script body in Node.js: querySelectorAll returns the
+# anchors matched in Python, createTreeWalker walks their text nodes
+_NODE_RUNNER = """
+const input = JSON.parse(require("fs").readFileSync(0, "utf8"));
+function build(node) {
+    if (node.type !== 1) {
+        return {nodeType: node.type, nodeValue: node.value, childNodes: []};
+    }
+    return {
+        nodeType: 1,
+        childNodes: node.children.map(build),
+        getAttribute: function (name) {
+            return Object.prototype.hasOwnProperty.call(node.attrs, name) ? node.attrs[name] : null;
+        }
+    };
+}
+const anchors = input.anchors.map(build);
+globalThis.NodeFilter = {SHOW_TEXT: 4};
+globalThis.document = {
+    querySelectorAll: function (selector) {
+        if (selector !== input.selector) { throw new Error("unexpected selector " + selector); }
+        return anchors;
+    },
+    createTreeWalker: function (root, whatToShow) {
+        const nodes = [];
+        (function walk(node) {
+            node.childNodes.forEach(function (child) {
+                if (child.nodeType === 3 && (whatToShow & 4)) { nodes.push(child); }
+                walk(child);
+            });
+        })(root);
+        let index = -1;
+        return {
+            currentNode: root,
+            nextNode: function () {
+                index += 1;
+                this.currentNode = nodes[index] || this.currentNode;
+                return nodes[index] || null;
+            }
+        };
+    }
+};
+process.stdout.write(JSON.stringify(new Function(input.script)(input.selector)));
+"""
+
+
+def _dom_node(node):
+    if isinstance(node, Comment):
+        return {"type": 8, "value": str(node)}
+    if isinstance(node, NavigableString):
+        return {"type": 3, "value": str(node)}
+    attrs = {name: " ".join(value) if isinstance(value, list) else value for name, value in node.attrs.items()}
+    return {"type": 1, "attrs": attrs, "children": [_dom_node(child) for child in node.children]}
+
+
+class NodeDriver:
+    """WebDriver stand-in executing scripts with Node.js on a minimal DOM of page_source"""
+
+    def __init__(self, html):
+        self.page_source = html
+
+    def execute_script(self, script, selector):
+        anchors = BeautifulSoup(self.page_source, "html.parser").select(selector)
+        payload = {"script": script, "selector": selector, "anchors": [_dom_node(a) for a in anchors]}
+        result = subprocess.run(["node", "-e", _NODE_RUNNER], input=json.dumps(payload),
+                                capture_output=True, text=True, timeout=60, check=True)
+        return json.loads(result.stdout)
+
+
+class ParserBackendsTest(unittest.TestCase):
+    """title_links() on every backend, and extract_links() around a scripted driver"""
+
+    def test_follows_page_links(self):
+        self.assertEqual(title_links(load_fixture("follows_page.html"), BASE_URL), FOLLOWS_PAGE_LINKS)
+
+    def test_chapter_links_do_not_name_a_series(self):
+        links = title_links(load_fixture("latest_page.html"), BASE_URL)
+        self.assertEqual(links, [
+            ("One Piece", "https://mangapark.io/title/10953-en-one-piece"),
+            ("SoloLeveling", "https://mangapark.io/title/12001-en-solo-leveling"),
+            ("Chapter Only", "https://mangapark.io/title/99001-en-chapter-only")
+        ])
+
+    def test_backends_agree(self):
+        for name in FIXTURE_NAMES:
+            html = load_fixture(name)
+            reference_stats = {}
+            reference = title_links(html, BASE_URL, backend=available_backends()[-1], stats=reference_stats)
+            for backend in available_backends():
+                with self.subTest(fixture=name, backend=backend.name):
+                    stats = {}
+                    self.assertEqual(title_links(html, BASE_URL, backend=backend, stats=stats), reference)
+                    self.assertEqual(stats, reference_stats)
+
+    def test_base_url_applies_to_relative_links(self):
+        driver = ScriptedDriver(load_fixture("latest_page.html"))
+        links = extract_links(driver, "https://mangapark.net")
+        self.assertEqual(driver.scripts, 1)
+        self.assertTrue(all(url.startswith("https://mangapark.net/title/") for _, url in links))
+
+    def test_script_error_falls_back_to_parsing(self):
+        html = load_fixture("follows_page.html")
+        self.assertEqual(extract_links(BrokenDriver(html), BASE_URL), title_links(html, BASE_URL))
+
+
+class LinksScriptParityMixin:
+    """_LINKS_JS against title_links(); subclasses provide driver(html)"""
+
+    def test_parity_check(self):
+        for name in FIXTURE_NAMES:
+            with self.subTest(fixture=name):
+                result = parity_check(self.driver(load_fixture(name)), BASE_URL)
+                self.assertTrue(result["identical"], result)
+
+    def test_follows_page_links(self):
+        driver = self.driver(load_fixture("follows_page.html"))
+        self.assertEqual(title_links_in_browser(driver, BASE_URL), FOLLOWS_PAGE_LINKS)
+
+    def test_raw_pairs(self):
+        # Before collapse_links: every titled /title/ anchor, raw href
+        driver = self.driver(load_fixture("latest_page.html"))
+        pairs = driver.execute_script(follows_parser._LINKS_JS, TITLE_LINK_SELECTOR)
+        self.assertEqual([list(pair) for pair in pairs], [
+            ["One Piece", "/title/10953-en-one-piece"],
+            ["Chapter 1120", "/title/10953-en-one-piece/8991234-chapter-1120"],
+            ["SoloLeveling", "/title/12001-en-solo-leveling"],
+            ["Chapter 200", "/title/12001-en-solo-leveling/c200"],
+            ["Chapter 12", "/title/99001-en-chapter-only/c12"],
+            ["Chapter Only", "/title/99001-en-chapter-only"]
+        ])
+
+
+@unittest.skipUnless(shutil.which("node"), "node is not installed")
+class NodeLinksScriptTest(LinksScriptParityMixin, unittest.TestCase):
+    def driver(self, html):
+        return NodeDriver(html)
+
+
+class ChromeLinksScriptTest(LinksScriptParityMixin, unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            from driver_pool import launch_chrome
+            cls.browser = launch_chrome()
+        except Exception as e:
+            raise unittest.SkipTest(f"headless Chrome is not available ({type(e).__name__})")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.browser.quit()
+
+    def driver(self, html):
+        self.browser.get("data:text/html;charset=utf-8," + quote(html))
+        return self.browser
+
+
+class ItemLinksTest(unittest.TestCase):
+    def test_first_link_per_item(self):
+        # Items matched by both selector parts are read once, later anchors are ignored
+        html = load_fixture("latest_page.html")
+        for backend in available_backends():
+            with self.subTest(backend=backend.name):
+                self.assertEqual(backend.item_links(html, ".item, [class*='item']", "a[href*='/title/']"), [
+                    ("", "/title/10953-en-one-piece"),
+                    ("SoloLeveling", "/title/12001-en-solo-leveling"),
+                    ("Chapter 12", "/title/99001-en-chapter-only/c12")
+                ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+HTTP engine tests
+Checks which responses end an export (AuthError) and which leave the browser to try, for the engine and the auth probe
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from auth_probe import probe_session
+from http_engine import AuthError, EngineError, MangaParkHTTPEngine
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, text=""):
+        self.status_code = status_code
+        self.body = body
+        self.text = text
+
+    def json(self):
+        if self.body is None:
+            raise ValueError("not JSON")
+        return self.body
+
+
+class FakeSession:
+    """requests.Session stand-in answering every POST with one response"""
+
+    def __init__(self, response):
+        self.response = response
+        self.headers = {}
+        self.cookies = self
+
+    def set(self, name, value):
+        pass
+
+    def post(self, url, **kwargs):
+        return self.response
+
+
+def fetch(response):
+    engine = MangaParkHTTPEngine({"skey": "a", "tfv": "b"}, session=FakeSession(response))
+    return engine.fetch_page(1)
+
+
+class ErrorClassificationTest(unittest.TestCase):
+    def test_bot_check_is_not_an_auth_error(self):
+        with self.assertRaises(EngineError) as ctx:
+            fetch(FakeResponse(403, text="<html><title>Just a moment...</title></html>"))
+        self.assertNotIsInstance(ctx.exception, AuthError)
+
+    def test_null_data_is_not_an_auth_error(self):
+        with self.assertRaises(EngineError) as ctx:
+            fetch(FakeResponse(200, {"data": {"get_user_libList": None}}))
+        self.assertNotIsInstance(ctx.exception, AuthError)
+
+    def test_explicit_login_error(self):
+        for status in (200, 401):
+            with self.subTest(status=status), self.assertRaises(AuthError):
+                fetch(FakeResponse(status, {"errors": [{"message": "Please login first"}], "data": None}))
+
+    def test_other_graphql_errors(self):
+        with self.assertRaises(EngineError) as ctx:
+            fetch(FakeResponse(200, {"errors": [{"message": "Cannot query field \"items\""}]}))
+        self.assertNotIsInstance(ctx.exception, AuthError)
+
+    def test_links(self):
+        body = {"data": {"get_user_libList": {
+            "paging": {"total": 1, "pages": 1, "page": 1},
+            "items": [{"data": {"id": "1", "name": " One Piece ", "urlPath": "/title/10953-en-one-piece"}}]
+        }}}
+        self.assertEqual(fetch(FakeResponse(200, body)),
+                         ([("One Piece", "https://mangapark.io/title/10953-en-one-piece")], 1))
+
+
+
+class ProbeTest(unittest.TestCase):
+    COOKIES = {"skey": "a", "tfv": "b"}
+
+    def probe(self, response):
+        return probe_session(self.COOKIES, session=FakeSession(response))
+
+    def test_logged_in(self):
+        body = {"data": {"get_user_libList": {"paging": {"total": 30, "pages": 2}}}}
+        self.assertIs(self.probe(FakeResponse(200, body)), True)
+
+    def test_inconclusive_answers(self):
+        for response in (FakeResponse(403, text="<html>Just a moment...</html>"),
+                         FakeResponse(401),
+                         FakeResponse(200, {"data": {"get_user_libList": None}}),
+                         FakeResponse(502)):
+            with self.subTest(status=response.status_code):
+                self.assertIsNone(self.probe(response))
+
+    def test_logged_out(self):
+        with self.assertRaises(AuthError):
+            self.probe(FakeResponse(200, {"errors": [{"message": "Please login first"}], "data": None}))
+        with self.assertRaises(AuthError):
+            probe_session({"skey": "", "tfv": "b"})
+
+
+if __name__ == "__main__":
+    unittest.main()
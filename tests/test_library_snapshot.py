@@ -0,0 +1,64 @@
+"""
+Library snapshot tests
+Checks snapshots are kept per account and removals need a scrape that reached the last page
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from library_snapshot import DeltaSync, LibrarySnapshot, session_account
+
+
+def records(ids):
+    return [{"title": f"Title {i}", "url": f"https://mangapark.io/title/{i}-t", "mal_id": str(100 + i)}
+            for i in ids]
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.output_dir = self._dir.name
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def saved(self, cookies, ids):
+        snapshot = LibrarySnapshot(self.output_dir, session_account(cookies)).load()
+        snapshot.save(records(ids), full_scan=True)
+        return snapshot
+
+    def test_accounts_do_not_share_a_snapshot(self):
+        self.saved({"skey": "alice", "tfv": "browser"}, range(10))
+        other = LibrarySnapshot(self.output_dir, session_account({"skey": "bob", "tfv": "browser"})).load()
+        self.assertEqual(len(other), 0)
+        same = LibrarySnapshot(self.output_dir, session_account({"skey": "alice", "tfv": "browser"})).load()
+        self.assertEqual(len(same), 10)
+
+    def test_complete_scan_reports_removals(self):
+        snapshot = self.saved({"skey": "a"}, range(10))
+        delta = DeltaSync(snapshot, early_stop=False)
+        delta.observe(records(range(1, 10)))
+        delta.scrape_finished(reached_end=True)
+        self.assertEqual([m["title"] for m in delta.removed()], ["Title 0"])
+        self.assertEqual(delta.carried_over(), [])
+
+    def test_capped_scan_carries_titles_over(self):
+        snapshot = self.saved({"skey": "a"}, range(10))
+        delta = DeltaSync(snapshot, early_stop=False)
+        # maxPages cut the list after six titles
+        delta.observe(records(range(6)))
+        delta.scrape_finished(reached_end=False)
+        self.assertEqual(delta.removed(), [])
+        self.assertEqual([m["title"] for m in delta.carried_over()], [f"Title {i}" for i in range(6, 10)])
+        self.assertFalse(delta.complete)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Sharded scraper tests
+Checks where parallel paging stops, with fake browsers serving a scripted follows list
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from sharded_scraper import ShardedScraper
+
+
+def title_page(page, count=3):
+    return [(f"Title {page}-{i}", f"https://mangapark.io/title/{page}{i:02d}-t") for i in range(count)]
+
+
+class FakeDriver:
+    def __init__(self, site):
+        self.site = site
+        self.page = None
+
+    def get(self, url):
+        self.page = int(url.rsplit("=", 1)[1])
+        self.site.record(self.page)
+
+    def execute_script(self, script, *args):
+        return 0  # no pagination links
+
+
+class FakeSite:
+    """Follows pages by number; pages past the last one repeat it, like MangaPark"""
+
+    def __init__(self, last_page, empty_after=False):
+        self.last_page = last_page
+        self.empty_after = empty_after
+        self.fetched = []
+        self._lock = threading.Lock()
+
+    def record(self, page):
+        with self._lock:
+            self.fetched.append(page)
+
+    def links(self, driver):
+        if driver.page > self.last_page:
+            return [] if self.empty_after else title_page(self.last_page)
+        return title_page(driver.page)
+
+
+class FakePool:
+    def __init__(self, site):
+        self.site = site
+
+    def acquire(self):
+        return FakeDriver(self.site)
+
+    def release(self, driver):
+        pass
+
+    def discard(self, driver):
+        pass
+
+
+class InstantReady:
+    def wait(self, driver):
+        return 0.0, 1
+
+
+def scrape(site, shards=3, max_pages=100):
+    scraper = ShardedScraper(
+        FakePool(site),
+        lambda driver: None,
+        site.links,
+        "https://mangapark.io/my/follows?page={page}",
+        shards=shards,
+        max_pages=max_pages,
+        page_ready=InstantReady()
+    )
+    return scraper.scrape()
+
+
+class StopTest(unittest.TestCase):
+    def expected(self, last_page):
+        return [{"title": t, "url": u} for page in range(1, last_page + 1) for t, u in title_page(page)]
+
+    def test_repeated_final_page_stops_paging(self):
+        for shards in (1, 3):
+            with self.subTest(shards=shards):
+                site = FakeSite(last_page=4)
+                results, stats = scrape(site, shards=shards)
+                self.assertEqual(results, self.expected(4))
+                self.assertTrue(stats["reached_end"])
+                # Page 5 repeats page 4; only pages already handed out may still load
+                self.assertLessEqual(max(site.fetched), 5 + shards)
+                self.assertEqual(len(site.fetched), len(set(site.fetched)))
+
+    def test_empty_page_stops_paging(self):
+        site = FakeSite(last_page=3, empty_after=True)
+        results, _ = scrape(site)
+        self.assertEqual(results, self.expected(3))
+        self.assertLessEqual(max(site.fetched), 4 + 3)
+
+    def test_max_pages(self):
+        site = FakeSite(last_page=50)
+        results, stats = scrape(site, max_pages=6)
+        self.assertEqual(results, self.expected(6))
+        self.assertEqual(max(site.fetched), 6)
+        self.assertFalse(stats["reached_end"])
+
+
+if __name__ == "__main__":
+    unittest.main()
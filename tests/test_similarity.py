@@ -0,0 +1,112 @@
+"""
+Similarity tests
+Checks the scores stay SequenceMatcher's, with and without rapidfuzz (and without numpy)
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import importlib
+import os
+import random
+import sys
+import unittest
+from difflib import SequenceMatcher
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import similarity
+
+try:
+    import rapidfuzz  # noqa: F401
+    RAPIDFUZZ_INSTALLED = True
+except ImportError:
+    RAPIDFUZZ_INSTALLED = False
+
+
+def reload_similarity(blocked=()):
+    """similarity re-imported with some modules made unimportable (None in sys.modules)"""
+    with mock.patch.dict(sys.modules, {name: None for name in blocked}):
+        return importlib.reload(similarity)
+
+
+class EngineTest(unittest.TestCase):
+    def tearDown(self):
+        reload_similarity()
+
+    @unittest.skipUnless(RAPIDFUZZ_INSTALLED, "rapidfuzz is not installed")
+    def test_fast_path_without_numpy(self):
+        module = reload_similarity(blocked=("numpy",))
+        with mock.patch.dict(sys.modules, {"numpy": None}):
+            self.assertEqual(module.ENGINE, "rapidfuzz")
+            index, score = module.best_candidate("Solo Leveling", [["Solo Leveling: Ragnarok"], ["Solo Leveling"]])
+            self.assertEqual((index, score), (1, 1.0))
+            self.assertEqual(module.score_matrix(["a", ""], ["a", ""]), [[1.0, 0.0], [0.0, 0.0]])
+
+    def test_difflib_fallback(self):
+        module = reload_similarity(blocked=("rapidfuzz",))
+        self.assertEqual(module.ENGINE, "difflib")
+        index, score = module.best_candidate("Solo Leveling", [["Solo Leveling: Ragnarok"], ["Solo Leveling"]])
+        self.assertEqual((index, score), (1, 1.0))
+        self.assertEqual(module.best_candidate("Berserk", [["Vagabond"]])[0], None)
+
+
+
+def reference_best(query, variant_lists, threshold=similarity.MATCH_THRESHOLD):
+    """The per-pair SequenceMatcher loop best_candidate() replaced"""
+    best, best_score = None, 0
+    for index, variants in enumerate(variant_lists):
+        for variant in variants:
+            if not variant:
+                continue
+            score = SequenceMatcher(None, query.lower(), variant.lower()).ratio()
+            if score > best_score:
+                best, best_score = index, score
+    return (best, best_score) if best is not None and best_score > threshold else (None, best_score)
+
+
+class SequenceMatcherParityTest(unittest.TestCase):
+    ENGINES = (("rapidfuzz", ()), ("difflib", ("rapidfuzz",)))
+
+    def tearDown(self):
+        reload_similarity()
+
+    def engines(self):
+        for name, blocked in self.ENGINES:
+            if name == "rapidfuzz" and not RAPIDFUZZ_INSTALLED:
+                continue
+            yield name, reload_similarity(blocked)
+
+    def test_reordered_words_do_not_match(self):
+        # rapidfuzz's ratio alone scores this pair 0.704
+        for name, module in self.engines():
+            with self.subTest(engine=name):
+                index, score = module.best_candidate("The Beginning After the End", [["The End After the Beginning"]])
+                self.assertIsNone(index)
+                self.assertAlmostEqual(score, 0.481, places=3)
+
+    def test_same_best_match_and_score(self):
+        rng = random.Random(7)
+        words = ["the", "hero", "sword", "level", "dragon", "academy", "villainess", "tower",
+                 "return", "reincarnated", "slime", "knight", "princess", "demon", "king"]
+
+        def title():
+            return " ".join(rng.choice(words) for _ in range(rng.randint(1, 6))).title()
+
+        cases = [(title(), [[title() for _ in range(rng.randint(0, 3))] for _ in range(rng.randint(1, 8))])
+                 for _ in range(300)]
+        for name, module in self.engines():
+            with self.subTest(engine=name):
+                agree = sum(1 for query, lists in cases
+                            if module.best_candidate(query, lists) == reference_best(query, lists))
+                self.assertEqual(agree, len(cases))
+
+    def test_ties_keep_the_earlier_candidate(self):
+        for name, module in self.engines():
+            with self.subTest(engine=name):
+                self.assertEqual(module.best_candidate("Berserk", [["Vagabond"], ["berserk"], ["BERSERK"]]), (1, 1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()